@@ -4,13 +4,25 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserChangeForm
 from django import forms
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.utils import timezone
 from django.shortcuts import redirect
+from django.core.exceptions import PermissionDenied
 from django.template.response import TemplateResponse
-from django.db.models import Sum, Count
+from django.db.models import Q, Sum, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from datetime import datetime, timedelta
-from .models import RestaurantInfo, Reservation, TimeSlot, SpecialDate, Notification, get_restaurant_info
+from .models import RestaurantInfo, Reservation, TimeSlot, SpecialDate, Notification, Customer, get_restaurant_info
+from .utils.export import EXPORT_CONTENT_TYPES, export_reservations_response
+from .utils.search import customer_search_q
+from .utils.customers import record_bulk_status_change
+from .utils.content_versions import bump_version
+from .utils.availability import next_available_label
+from .utils.occupancy import ACTIVE_STATUSES, get_day_occupancy
+from .utils.phone import looks_like_phone, normalize_phone
+import logging
+
+logger = logging.getLogger(__name__)
 
 # IMPORTANT: Clear any existing registrations to prevent duplicates
 from django.contrib.admin.sites import site
@@ -110,7 +122,7 @@ class SimpleRoleCreateForm(forms.ModelForm):
                 manager_group, created = Group.objects.get_or_create(name='Restaurant Manager')
                 user.groups.add(manager_group)
                 self._assign_manager_permissions(user)
-                print(f"✅ Created MANAGER user: {user.username}")
+                logger.info(f"✅ Created MANAGER user: {user.username}")
                 
             elif role == 'staff':
                 user.is_staff = True
@@ -119,14 +131,14 @@ class SimpleRoleCreateForm(forms.ModelForm):
                 staff_group, created = Group.objects.get_or_create(name='Restaurant Staff')
                 user.groups.add(staff_group)
                 self._assign_staff_permissions(user)
-                print(f"✅ Created STAFF user: {user.username}")
+                logger.info(f"✅ Created STAFF user: {user.username}")
             
             else:
                 # No role selected - regular user (no admin access)
                 user.is_staff = False
                 user.is_superuser = False
                 user.user_permissions.clear()
-                print(f"✅ Created REGULAR user: {user.username}")
+                logger.info(f"✅ Created REGULAR user: {user.username}")
             
             user.save()  # Save again after role assignment
         
@@ -138,7 +150,7 @@ class SimpleRoleCreateForm(forms.ModelForm):
         from django.contrib.contenttypes.models import ContentType
         
         try:
-            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             manager_permissions = []
             
             for model_name in restaurant_models:
@@ -150,9 +162,9 @@ class SimpleRoleCreateForm(forms.ModelForm):
                     continue
             
             user.user_permissions.set(manager_permissions)
-            print(f"✅ Assigned {len(manager_permissions)} manager permissions to {user.username}")
+            logger.info(f"✅ Assigned {len(manager_permissions)} manager permissions to {user.username}")
         except Exception as e:
-            print(f"❌ Error assigning manager permissions: {e}")
+            logger.error(f"❌ Error assigning manager permissions: {e}")
     
     def _assign_staff_permissions(self, user):
         """Assign limited permissions to staff"""
@@ -170,7 +182,7 @@ class SimpleRoleCreateForm(forms.ModelForm):
             ))
             
             # View-only permissions for other models
-            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             for model_name in other_models:
                 try:
                     content_type = ContentType.objects.get(app_label='reservations', model=model_name)
@@ -182,9 +194,9 @@ class SimpleRoleCreateForm(forms.ModelForm):
                     continue
             
             user.user_permissions.set(staff_permissions)
-            print(f"✅ Assigned {len(staff_permissions)} staff permissions to {user.username}")
+            logger.info(f"✅ Assigned {len(staff_permissions)} staff permissions to {user.username}")
         except Exception as e:
-            print(f"❌ Error assigning staff permissions: {e}")
+            logger.error(f"❌ Error assigning staff permissions: {e}")
 
 class SimpleRoleForm(UserChangeForm):
     """Simple form with just Manager/Staff choice"""
@@ -313,7 +325,7 @@ class SimpleRoleForm(UserChangeForm):
         
         try:
             # Get all permissions for restaurant models
-            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             
             for model_name in restaurant_models:
                 try:
@@ -327,7 +339,7 @@ class SimpleRoleForm(UserChangeForm):
             user.user_permissions.set(manager_permissions)
             
         except Exception as e:
-            print(f"Error assigning manager permissions: {e}")
+            logger.error(f"Error assigning manager permissions: {e}")
     
     def _assign_staff_permissions(self, user):
         """Assign limited permissions to staff"""
@@ -345,7 +357,7 @@ class SimpleRoleForm(UserChangeForm):
             ))
             
             # View-only permissions for other models
-            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             for model_name in other_models:
                 try:
                     content_type = ContentType.objects.get(app_label='reservations', model=model_name)
@@ -360,7 +372,7 @@ class SimpleRoleForm(UserChangeForm):
             user.user_permissions.set(staff_permissions)
             
         except Exception as e:
-            print(f"Error assigning staff permissions: {e}")
+            logger.error(f"Error assigning staff permissions: {e}")
 
 @admin.register(User)
 class SimpleUserAdmin(admin.ModelAdmin):
@@ -619,7 +631,7 @@ class SimpleUserAdmin(admin.ModelAdmin):
             role = form.cleaned_data.get('role')
             
             if role:
-                print(f"🔄 Updating role for user {obj.username} to {role}")
+                logger.debug(f"🔄 Updating role for user {obj.username} to {role}")
                 
                 # Clear existing groups first
                 obj.groups.clear()
@@ -637,7 +649,7 @@ class SimpleUserAdmin(admin.ModelAdmin):
                     
                     # Assign manager permissions
                     self._assign_manager_permissions(obj)
-                    print(f"✅ User {obj.username} is now MANAGER")
+                    logger.info(f"✅ User {obj.username} is now MANAGER")
                     
                 elif role == 'staff':
                     obj.is_staff = True
@@ -649,7 +661,7 @@ class SimpleUserAdmin(admin.ModelAdmin):
                     
                     # Assign staff permissions
                     self._assign_staff_permissions(obj)
-                    print(f"✅ User {obj.username} is now STAFF")
+                    logger.info(f"✅ User {obj.username} is now STAFF")
                 
                 obj.save()  # Save again after role changes
                 
@@ -663,7 +675,7 @@ class SimpleUserAdmin(admin.ModelAdmin):
         from django.contrib.contenttypes.models import ContentType
         
         try:
-            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            restaurant_models = ['reservation', 'restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             manager_permissions = []
             
             for model_name in restaurant_models:
@@ -675,9 +687,9 @@ class SimpleUserAdmin(admin.ModelAdmin):
                     continue
             
             user.user_permissions.set(manager_permissions)
-            print(f"✅ Assigned {len(manager_permissions)} manager permissions to {user.username}")
+            logger.info(f"✅ Assigned {len(manager_permissions)} manager permissions to {user.username}")
         except Exception as e:
-            print(f"❌ Error assigning manager permissions: {e}")
+            logger.error(f"❌ Error assigning manager permissions: {e}")
     
     def _assign_staff_permissions(self, user):
         """Assign limited permissions to staff"""
@@ -695,7 +707,7 @@ class SimpleUserAdmin(admin.ModelAdmin):
             ))
             
             # View-only permissions for other models
-            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification']
+            other_models = ['restaurantinfo', 'specialdate', 'timeslot', 'notification', 'customer']
             for model_name in other_models:
                 try:
                     content_type = ContentType.objects.get(app_label='reservations', model=model_name)
@@ -707,13 +719,13 @@ class SimpleUserAdmin(admin.ModelAdmin):
                     continue
             
             user.user_permissions.set(staff_permissions)
-            print(f"✅ Assigned {len(staff_permissions)} staff permissions to {user.username}")
+            logger.info(f"✅ Assigned {len(staff_permissions)} staff permissions to {user.username}")
         except Exception as e:
-            print(f"❌ Error assigning staff permissions: {e}")
+            logger.error(f"❌ Error assigning staff permissions: {e}")
 
 # ===== UTILITY FUNCTIONS =====
 
-def get_dashboard_metrics():
+def get_dashboard_metrics(user=None):
     """Get dashboard metrics directly - CASABLANCA TIMEZONE VERSION"""
     # Get current time in Casablanca timezone
     casablanca_now = timezone.localtime(timezone.now())
@@ -721,8 +733,8 @@ def get_dashboard_metrics():
     week_start = today - timedelta(days=today.weekday())
     month_start = today.replace(day=1)
     
-    print(f"🔍 CASABLANCA DEBUG - Current time: {casablanca_now}")
-    print(f"🔍 CASABLANCA DEBUG - Today date: {today}")
+    logger.debug(f"🔍 CASABLANCA DEBUG - Current time: {casablanca_now}")
+    logger.debug(f"🔍 CASABLANCA DEBUG - Today date: {today}")
     
     # Get restaurant instance (single instance)
     restaurant = get_restaurant_info()
@@ -755,7 +767,7 @@ def get_dashboard_metrics():
         'restaurant_capacity': restaurant.capacity,
         
         # Notification metrics
-        'unread_notifications': Notification.objects.filter(is_read=False).count(),
+        'unread_notifications': Notification.get_unread_count(user=user),
         'today_notifications': Notification.objects.filter(created_at__date=today).count(),
     }
     
@@ -776,37 +788,39 @@ def get_correct_daily_time_slots_data(date):
     
     # Get current Casablanca time for debug
     casablanca_now = timezone.localtime(timezone.now())
-    print(f"🔍 ADMIN CHART DEBUG - Casablanca time: {casablanca_now}")
-    print(f"🔍 ADMIN CHART DEBUG - Getting data for date: {date}")
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Casablanca time: {casablanca_now}")
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Getting data for date: {date}")
     
     # Get all reservations for the specified date
     todays_reservations = Reservation.objects.filter(date=date).order_by('time')
     
-    print(f"🔍 ADMIN CHART DEBUG - Found {todays_reservations.count()} reservations")
-    
-    if not todays_reservations.exists():
-        print("🔍 ADMIN CHART DEBUG - No reservations, returning empty data")
-        return {
-            'labels': [],
-            'data': []
-        }
-    
     # Count reservations by actual time - ONLY use actual reservation times
     time_counts = defaultdict(int)
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     for reservation in todays_reservations:
         time_str = reservation.time.strftime('%H:%M')
         time_counts[time_str] += 1
-        print(f"🔍 ADMIN CHART DEBUG - Reservation: {reservation.customer_name} at {time_str} (status: {reservation.status})")
+        if debug:
+            logger.debug(f"🔍 ADMIN CHART DEBUG - Reservation: {reservation.customer_name} at {time_str} (status: {reservation.status})")
+    
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Found {sum(time_counts.values())} reservations")
+    
+    if not time_counts:
+        logger.debug("🔍 ADMIN CHART DEBUG - No reservations, returning empty data")
+        return {
+            'labels': [],
+            'data': []
+        }
     
     # Sort times and prepare data - CRITICAL: Only include times that have reservations
     sorted_times = sorted(time_counts.keys())
     labels = sorted_times
     data = [time_counts[time] for time in sorted_times]
     
-    print(f"🔍 ADMIN CHART DEBUG - Final labels: {labels}")
-    print(f"🔍 ADMIN CHART DEBUG - Final data: {data}")
-    print(f"🔍 ADMIN CHART DEBUG - Time counts: {dict(time_counts)}")
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Final labels: {labels}")
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Final data: {data}")
+    logger.debug(f"🔍 ADMIN CHART DEBUG - Time counts: {dict(time_counts)}")
     
     return {
         'labels': labels,
@@ -819,106 +833,56 @@ def get_available_tables_count(date):
     
     # Debug timezone info
     casablanca_now = timezone.localtime(timezone.now())
-    print(f"🔍 TABLES DEBUG - Casablanca time: {casablanca_now}")
-    print(f"🔍 TABLES DEBUG - Checking availability for date: {date}")
+    logger.debug(f"🔍 TABLES DEBUG - Casablanca time: {casablanca_now}")
+    logger.debug(f"🔍 TABLES DEBUG - Checking availability for date: {date}")
     
-    reservations_count = Reservation.objects.filter(
-        date=date,
-        status__in=['Confirmée', 'En attente']
-    ).count()
+    # Same precomputed numbers as the availability endpoints
+    reservations_count = get_day_occupancy(date).total_reservations
     
     available = max(0, restaurant.number_of_tables - reservations_count)
-    print(f"🔍 TABLES DEBUG - Total tables: {restaurant.number_of_tables}, Reserved: {reservations_count}, Available: {available}")
+    logger.debug(f"🔍 TABLES DEBUG - Total tables: {restaurant.number_of_tables}, Reserved: {reservations_count}, Available: {available}")
     
     return available
 
 def get_peak_hour_today(date):
     """Find the busiest hour for today - CASABLANCA TIMEZONE VERSION"""
     casablanca_now = timezone.localtime(timezone.now())
-    print(f"🔍 PEAK HOUR DEBUG - Casablanca time: {casablanca_now}")
-    print(f"🔍 PEAK HOUR DEBUG - Checking peak hour for date: {date}")
-    
-    peak_hour = Reservation.objects.filter(
-        date=date,
-        status__in=['En attente', 'Confirmée']
-    ).values('time').annotate(
-        total_guests=Sum('number_of_guests')
-    ).order_by('-total_guests').first()
-    
-    if peak_hour and peak_hour['total_guests'] > 0:
-        result = peak_hour['time'].strftime('%H:%M')
-        print(f"🔍 PEAK HOUR DEBUG - Peak hour found: {result} with {peak_hour['total_guests']} guests")
+    logger.debug(f"🔍 PEAK HOUR DEBUG - Casablanca time: {casablanca_now}")
+    logger.debug(f"🔍 PEAK HOUR DEBUG - Checking peak hour for date: {date}")
+    
+    occupancy = get_day_occupancy(date)
+    peak_time = occupancy.busiest_slot()
+    
+    if peak_time:
+        result = peak_time.strftime('%H:%M')
+        logger.debug(f"🔍 PEAK HOUR DEBUG - Peak hour found: {result} with {occupancy.slot_guests[peak_time]} guests")
         return result
     
-    print(f"🔍 PEAK HOUR DEBUG - No peak hour found")
+    logger.debug(f"🔍 PEAK HOUR DEBUG - No peak hour found")
     return None
 
 def get_next_available_slot():
-    """Find next available time slot - CASABLANCA TIMEZONE VERSION"""
+    """Find next available time slot (30 min buffer today) - one grouped query over the week"""
     try:
-        # Use Casablanca timezone
-        casablanca_now = timezone.localtime(timezone.now())
-        current_date = casablanca_now.date()
-        current_time = casablanca_now.time()
-        
-        print(f"🔍 NEXT SLOT DEBUG - Casablanca time: {casablanca_now}")
-        print(f"🔍 NEXT SLOT DEBUG - Current date: {current_date}, Current time: {current_time}")
-        
-        # Look for available slots in the next 7 days
-        for days_ahead in range(7):
-            check_date = current_date + timedelta(days=days_ahead)
-            time_slots = TimeSlot.objects.filter(is_active=True).order_by('time')
-            
-            for slot in time_slots:
-                # If it's today, skip past time slots (with 30min buffer)
-                if days_ahead == 0:
-                    time_with_buffer = (datetime.combine(current_date, current_time) + timedelta(minutes=30)).time()
-                    if slot.time <= time_with_buffer:
-                        print(f"🔍 NEXT SLOT DEBUG - Skipping past slot: {slot.time}")
-                        continue
-                
-                # Count current reservations for this slot
-                reservations_count = Reservation.objects.filter(
-                    date=check_date,
-                    time=slot.time,
-                    status__in=['Confirmée', 'En attente']
-                ).count()
-                
-                print(f"🔍 NEXT SLOT DEBUG - Slot {slot.time} on {check_date}: {reservations_count}/{slot.max_reservations}")
-                
-                # Check if slot is available
-                if reservations_count < slot.max_reservations:
-                    if days_ahead == 0:
-                        result = f"Aujourd'hui {slot.time.strftime('%H:%M')}"
-                    elif days_ahead == 1:
-                        result = f"Demain {slot.time.strftime('%H:%M')}"
-                    else:
-                        result = f"{check_date.strftime('%d/%m')} à {slot.time.strftime('%H:%M')}"
-                    
-                    print(f"🔍 NEXT SLOT DEBUG - Available slot found: {result}")
-                    return result
-        
-        print(f"🔍 NEXT SLOT DEBUG - No available slots found")
-        return "Aucun créneau disponible cette semaine"
-        
+        return next_available_label(lead_minutes=30)
     except Exception as e:
-        print(f"🔍 NEXT SLOT DEBUG - Error: {e}")
+        logger.error(f"❌ Next available slot error: {e}")
         return "Vérification en cours..."
 
 def get_weekly_stats(week_start):
     """Get reservation data for the current week - CASABLANCA TIMEZONE VERSION"""
     casablanca_now = timezone.localtime(timezone.now())
-    print(f"🔍 WEEKLY STATS DEBUG - Casablanca time: {casablanca_now}")
-    print(f"🔍 WEEKLY STATS DEBUG - Week start: {week_start}")
+    logger.debug(f"🔍 WEEKLY STATS DEBUG - Casablanca time: {casablanca_now}")
+    logger.debug(f"🔍 WEEKLY STATS DEBUG - Week start: {week_start}")
     
     data = []
     for i in range(7):
         day = week_start + timedelta(days=i)
         count = Reservation.objects.filter(date=day).count()
         data.append(count)
-        print(f"🔍 WEEKLY STATS DEBUG - Day {day}: {count} reservations")
+        logger.debug(f"🔍 WEEKLY STATS DEBUG - Day {day}: {count} reservations")
     
-    print(f"🔍 WEEKLY STATS DEBUG - Final weekly data: {data}")
+    logger.debug(f"🔍 WEEKLY STATS DEBUG - Final weekly data: {data}")
     return data
 
 def custom_admin_index(request, extra_context=None):
@@ -928,11 +892,11 @@ def custom_admin_index(request, extra_context=None):
         casablanca_now = timezone.localtime(timezone.now())
         today = casablanca_now.date()
         
-        print(f"🔍 DASHBOARD DEBUG - Casablanca time: {casablanca_now}")
-        print(f"🔍 DASHBOARD DEBUG - Today date: {today}")
+        logger.debug(f"🔍 DASHBOARD DEBUG - Casablanca time: {casablanca_now}")
+        logger.debug(f"🔍 DASHBOARD DEBUG - Today date: {today}")
         
         # Get dashboard metrics
-        metrics, chart_data = get_dashboard_metrics()
+        metrics, chart_data = get_dashboard_metrics(user=request.user)
         
         # Recent reservations (last 24 hours) - use Casablanca timezone
         last_24h = casablanca_now - timedelta(hours=24)
@@ -940,12 +904,13 @@ def custom_admin_index(request, extra_context=None):
             created_at__gte=last_24h
         ).order_by('-created_at')[:10]
         
-        print(f"🔍 DASHBOARD DEBUG - Looking for reservations since: {last_24h}")
-        print(f"🔍 DASHBOARD DEBUG - Found {recent_reservations.count()} recent reservations")
+        logger.debug(f"🔍 DASHBOARD DEBUG - Looking for reservations since: {last_24h}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🔍 DASHBOARD DEBUG - Found {recent_reservations.count()} recent reservations")
         
-        # Recent notifications
-        recent_notifications = Notification.objects.filter(
-            is_read=False
+        # Recent notifications (not read yet by this admin)
+        recent_notifications = Notification.objects.unread_for(
+            request.user
         ).order_by('-created_at')[:5]
         
         # Today's schedule
@@ -953,7 +918,8 @@ def custom_admin_index(request, extra_context=None):
             date=today
         ).order_by('time')
         
-        print(f"🔍 DASHBOARD DEBUG - Today's schedule has {todays_schedule.count()} reservations")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🔍 DASHBOARD DEBUG - Today's schedule has {todays_schedule.count()} reservations")
         
         # Get admin context
         app_list = admin.site.get_app_list(request)
@@ -1048,7 +1014,7 @@ def custom_admin_index(request, extra_context=None):
         return response
     
     except Exception as e:
-        print(f"🔍 DASHBOARD DEBUG - Error: {e}")
+        logger.error(f"🔍 DASHBOARD DEBUG - Error: {e}")
         # Fallback to default admin if there's an error
         from django.contrib.admin.sites import AdminSite
         return AdminSite().index(request, extra_context)
@@ -1065,7 +1031,7 @@ def safe_custom_each_context(request):
             context['profile_url'] = f'/admin/auth/user/{request.user.id}/change/'
         return context
     except Exception as e:
-        print(f"Context error: {e}")
+        logger.error(f"Context error: {e}")
         return {}
 
 # Store original method safely
@@ -1073,7 +1039,7 @@ try:
     original_each_context = admin.site.each_context
     admin.site.each_context = lambda request: {**original_each_context(request), **safe_custom_each_context(request)}
 except Exception as e:
-    print(f"Could not override admin context: {e}")
+    logger.warning(f"Could not override admin context: {e}")
 
 # ===== MODEL ADMIN CLASSES =====
 
@@ -1171,8 +1137,8 @@ class NotificationAdmin(admin.ModelAdmin):
     
     # ✅ NEW: Admin read status separate from email tracking
     def admin_read_status(self, obj):
-        """Show if admin has read this notification"""
-        if obj.is_read:
+        """Show if admin has read this notification (handled, or read receipt for this admin)"""
+        if obj.is_read or getattr(obj, 'read_by_user', False):
             return format_html('<span style="color: #28a745;" title="Lu par admin">✅</span>')
         else:
             return format_html('<span style="color: #dc3545; font-weight: bold;" title="Non lu par admin">❌</span>')
@@ -1408,6 +1374,7 @@ class NotificationAdmin(admin.ModelAdmin):
     def mark_as_unread(self, request, queryset):
         """Mark selected messages as unread"""
         count = queryset.filter(is_read=True).update(is_read=False, read_at=None)
+        Notification.objects.mark_unread(queryset, request.user)
         self.message_user(request, f"📩 {count} message(s) marqué(s) comme non lu(s).")
     mark_as_unread.short_description = "● Marquer comme non lu"
     
@@ -1421,17 +1388,30 @@ class NotificationAdmin(admin.ModelAdmin):
     
     # Auto-mark as read when viewing details
     def change_view(self, request, object_id, form_url='', extra_context=None):
-        """Auto-mark message as read when viewing details"""
+        """Auto-mark message as read (for this admin) when viewing details"""
         obj = self.get_object(request, object_id)
-        if obj and not obj.is_read:
-            obj.mark_as_read()
+        if obj and not (obj.is_read or obj.read_by_user):
+            obj.mark_as_read(user=request.user)
             self.message_user(request, f"✅ Notification marquée comme lue: {obj.title}")
         
         return super().change_view(request, object_id, form_url, extra_context)
     
     def get_queryset(self, request):
-        """Optimize queries"""
-        return super().get_queryset(request).select_related('user', 'related_reservation').order_by('-created_at')
+        """Optimize queries - read receipt of the current admin joined in"""
+        return super().get_queryset(request).select_related('user', 'related_reservation').annotate(
+            read_by_user=Notification.objects.read_by(request.user)
+        ).order_by('-created_at')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Title/message or the customer of the linked reservation (same indexed search)"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(
+            Q(title__icontains=term) |
+            Q(message__icontains=term) |
+            Q(related_reservation__in=Reservation.objects.filter(customer_search_q(term)).values('pk'))
+        ), False
     
 class RestaurantInfoAdmin(admin.ModelAdmin):
     """Admin for single restaurant configuration - CASABLANCA TIMEZONE VERSION"""
@@ -1487,21 +1467,21 @@ class ReservationAdmin(admin.ModelAdmin):
     """Admin for reservations - CASABLANCA TIMEZONE VERSION"""
     list_display = [
         'customer_name', 'customer_phone', 'date', 'time', 
-        'number_of_guests', 'status', 'colored_status', 'created_at', 'is_today_reservation'
+        'number_of_guests', 'status', 'colored_status', 'created_at', 'is_today_reservation', 'customer_history'
     ]
     list_filter = ['status', 'date', 'number_of_guests', 'created_at']
     search_fields = ['customer_name', 'customer_phone', 'customer_email']
     list_editable = ['status']
     date_hierarchy = 'date'
     ordering = ['-date', '-time']
-    actions = ['mark_as_confirmed', 'mark_as_cancelled', 'mark_as_completed']
+    actions = ['mark_as_confirmed', 'mark_as_cancelled', 'mark_as_completed', 'export_as_csv', 'export_as_xlsx']
     
     fieldsets = (
         ('Information Client', {
-            'fields': ('customer_name', 'customer_email', 'customer_phone')
+            'fields': ('customer_name', 'customer_email', 'customer_phone', 'customer_history')
         }),
         ('Détails Réservation', {
-            'fields': ('date', 'time', 'number_of_guests', 'status', 'table_number')
+            'fields': ('date', 'time', 'number_of_guests', 'duration', 'status', 'table_number')
         }),
         ('Informations Supplémentaires', {
             'fields': ('special_requests',),
@@ -1514,7 +1494,19 @@ class ReservationAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at', 'confirmed_at', 'cancelled_at']
+    readonly_fields = ['created_at', 'updated_at', 'confirmed_at', 'cancelled_at', 'customer_history']
+    
+    def customer_history(self, obj):
+        """Client history from the Customer counters (joined, no per-row count)"""
+        customer = obj.customer
+        if not customer:
+            return '-'
+        color = '#f44336' if customer.cancelled_reservations >= 2 else '#4caf50' if customer.completed_reservations else '#666'
+        return format_html(
+            '<a href="/admin/reservations/customer/{}/change/" style="color: {};">{}</a>',
+            customer.pk, color, customer.history_display
+        )
+    customer_history.short_description = 'Historique client'
     
     def colored_status(self, obj):
         # Support both French and English status values
@@ -1554,81 +1546,208 @@ class ReservationAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related().order_by('-date', '-time')
+        return qs.select_related('customer').order_by('-date', '-time')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Indexed customer search: phone digits (prefix or ending), name/email words"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(customer_search_q(search_term)), False
     
     def mark_as_confirmed(self, request, queryset):
+        record_bulk_status_change(queryset, 'Confirmée')
         updated = queryset.update(status='Confirmée')
+        bump_version('reservations')
         self.message_user(request, f'{updated} réservations marquées comme confirmées.')
     mark_as_confirmed.short_description = "Marquer comme confirmées"
     
     def mark_as_cancelled(self, request, queryset):
+        record_bulk_status_change(queryset, 'Annulée')
         updated = queryset.update(status='Annulée')
+        bump_version('reservations')
         self.message_user(request, f'{updated} réservations annulées.')
     mark_as_cancelled.short_description = "Annuler les réservations"
     
     def mark_as_completed(self, request, queryset):
+        record_bulk_status_change(queryset, 'Terminée')
         updated = queryset.update(status='Terminée')
+        bump_version('reservations')
         self.message_user(request, f'{updated} réservations marquées comme terminées.')
     mark_as_completed.short_description = "Marquer comme terminées"
+    
+    # ===== EXPORT (streaming, values_list - no model instances, no HTML columns) =====
+    def export_as_csv(self, request, queryset):
+        return export_reservations_response(queryset.order_by('-date', '-time'), 'csv')
+    export_as_csv.short_description = "📄 Exporter en CSV"
+    
+    def export_as_xlsx(self, request, queryset):
+        return export_reservations_response(queryset.order_by('-date', '-time'), 'xlsx')
+    export_as_xlsx.short_description = "📊 Exporter en Excel (XLSX)"
+    
+    def get_urls(self):
+        """Add the export URL (whole changelist with its current filters/search)"""
+        urls = super().get_urls()
+        from django.urls import path
+        custom_urls = [
+            path('export/', self.admin_site.admin_view(self.export_view), name='reservations_reservation_export'),
+        ]
+        return custom_urls + urls
+    
+    def export_view(self, request):
+        """Export what the changelist shows: same filters, search and ordering (?export=csv|xlsx)"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        
+        # The changelist rejects unknown parameters, so take ours out first
+        request.GET = request.GET.copy()
+        export_format = request.GET.pop('export', ['csv'])[0]
+        if export_format not in EXPORT_CONTENT_TYPES:
+            export_format = 'csv'
+        
+        changelist = self.get_changelist_instance(request)
+        return export_reservations_response(changelist.get_queryset(request), export_format)
+
+def get_slot_target_date(request):
+    """Date chosen with the TimeSlot 'Date' filter (?target_date=YYYY-MM-DD), today by default"""
+    today = timezone.localtime(timezone.now()).date()
+    try:
+        return datetime.strptime(request.GET.get('target_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return today
+
+def slot_reservations_subquery(day, aggregate=None):
+    """Correlated COUNT (or another aggregate) of the active reservations of the outer slot on a given day"""
+    counts = Reservation.objects.filter(
+        time=OuterRef('time'),
+        date=day,
+        status__in=ACTIVE_STATUSES
+    ).order_by().values('time').annotate(total=aggregate or Count('id')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+class TimeSlotDateFilter(admin.SimpleListFilter):
+    """Pick the day used by the reservation counts (today and the next 6 days)"""
+    title = 'Date'
+    parameter_name = 'target_date'
+    
+    def lookups(self, request, model_admin):
+        today = timezone.localtime(timezone.now()).date()
+        labels = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
+        choices = []
+        for offset in range(7):
+            day = today + timedelta(days=offset)
+            label = "Aujourd'hui" if offset == 0 else f"{labels[day.weekday()]} {day.strftime('%d/%m')}"
+            choices.append((day.isoformat(), label))
+        return choices
+    
+    def queryset(self, request, queryset):
+        # Only selects the day - the counts are annotated in TimeSlotAdmin.get_queryset
+        return queryset
 
 class TimeSlotAdmin(admin.ModelAdmin):
     """Admin for time slots - CASABLANCA TIMEZONE VERSION"""
-    list_display = ['time', 'max_reservations', 'is_active', 'current_reservations', 'availability_status']
-    list_filter = ['is_active']
+    list_display = ['time', 'max_covers', 'max_reservations', 'is_active', 'current_reservations', 'current_covers', 'availability_status', 'week_capacity']
+    list_filter = [TimeSlotDateFilter, 'is_active']
     ordering = ['time']
-    list_editable = ['max_reservations', 'is_active']
+    list_editable = ['max_covers', 'max_reservations', 'is_active']
     
-    def current_reservations(self, obj):
-        # Use Casablanca timezone
-        casablanca_now = timezone.localtime(timezone.now())
-        today = casablanca_now.date()
-        
-        print(f"🔍 TIMESLOT DEBUG - Casablanca time: {casablanca_now}")
-        print(f"🔍 TIMESLOT DEBUG - Today: {today}")
-        
-        # Support both French and English statuses
-        count = Reservation.objects.filter(
-            time=obj.time,
-            date=today,
-            status__in=['pending', 'confirmed', 'En attente', 'Confirmée']
-        ).count()
+    def get_queryset(self, request):
+        """Counts for the chosen day and its week annotated in the changelist query (no per-row query)"""
+        target_date = get_slot_target_date(request)
+        week_start = target_date - timedelta(days=target_date.weekday())
+        
+        covers = Sum('number_of_guests')
+        annotations = {
+            'reservations_count': slot_reservations_subquery(target_date),
+            'covers_count': slot_reservations_subquery(target_date, covers),
+        }
+        for offset in range(7):
+            annotations[f'week_covers_{offset}'] = slot_reservations_subquery(week_start + timedelta(days=offset), covers)
         
-        print(f"🔍 TIMESLOT DEBUG - Slot {obj.time}: {count}/{obj.max_reservations}")
+        return super().get_queryset(request).annotate(**annotations)
+    
+    def current_reservations(self, obj):
+        count = getattr(obj, 'reservations_count', 0)
+        if obj.max_reservations is None:
+            return count
         return f"{count}/{obj.max_reservations}"
-    current_reservations.short_description = 'Réservations Aujourd\'hui'
+    current_reservations.short_description = 'Réservations'
+    current_reservations.admin_order_field = 'reservations_count'
+    
+    def current_covers(self, obj):
+        return f"{getattr(obj, 'covers_count', 0)}/{obj.max_covers}"
+    current_covers.short_description = 'Couverts'
+    current_covers.admin_order_field = 'covers_count'
     
     def availability_status(self, obj):
-        try:
-            # Use Casablanca timezone
-            casablanca_now = timezone.localtime(timezone.now())
-            today = casablanca_now.date()
-            
-            # Support both French and English statuses
-            reservations_count = Reservation.objects.filter(
-                time=obj.time,
-                date=today,
-                status__in=['pending', 'confirmed', 'En attente', 'Confirmée']
-            ).count()
-            available = obj.max_reservations - reservations_count
-            
-            if available <= 0:
-                color = '#f44336'
-                status = 'Complet'
-            elif available <= 2:
-                color = '#ff9800'
-                status = 'Presque complet'
-            else:
-                color = '#4caf50'
-                status = 'Disponible'
-            
-            return format_html(
-                '<span style="color: {}; font-weight: bold;">{}</span> ({} places)',
-                color, status, available
-            )
-        except Exception as e:
-            print(f"🔍 TIMESLOT ERROR - {e}")
-            return format_html('<span style="color: #999;">N/A</span>')
+        available = obj.remaining_covers(getattr(obj, 'reservations_count', 0), getattr(obj, 'covers_count', 0))
+        
+        if available <= 0:
+            color = '#f44336'
+            status = 'Complet'
+        elif available <= 4:
+            color = '#ff9800'
+            status = 'Presque complet'
+        else:
+            color = '#4caf50'
+            status = 'Disponible'
+        
+        return format_html(
+            '<span style="color: {}; font-weight: bold;">{}</span> ({} places)',
+            color, status, available
+        )
     availability_status.short_description = 'Disponibilité'
+    
+    def week_capacity(self, obj):
+        """Mini bar per day of the week (Mon-Sun), filled with the share of the slot covers booked"""
+        labels = ['L', 'M', 'M', 'J', 'V', 'S', 'D']
+        bars = []
+        for offset in range(7):
+            count = getattr(obj, f'week_covers_{offset}', 0)
+            ratio = min(1, count / obj.max_covers) if obj.max_covers else 1
+            color = '#f44336' if ratio >= 1 else '#ff9800' if ratio >= 0.8 else '#4caf50'
+            bars.append((labels[offset], count, obj.max_covers, int(ratio * 24), color))
+        
+        return format_html(
+            '<div style="display: flex; align-items: flex-end; gap: 3px; height: 36px;">{}</div>',
+            format_html_join(
+                '',
+                '<div title="{} : {}/{}" style="display: flex; flex-direction: column; align-items: center; font-size: 9px; color: #6c757d;">'
+                '<div style="width: 10px; height: 24px; background: #e9ecef; display: flex; align-items: flex-end;">'
+                '<div style="width: 10px; height: {}px; background: {};"></div></div>{}</div>',
+                ((label, count, capacity, height, color, label) for label, count, capacity, height, color in bars)
+            )
+        )
+    week_capacity.short_description = 'Semaine'
+
+class CustomerAdmin(admin.ModelAdmin):
+    """Clients (one per normalized phone) with their booking history"""
+    list_display = [
+        'name', 'phone', 'email', 'total_reservations', 'cancelled_reservations',
+        'completed_reservations', 'last_reservation_date', 'last_visit', 'reservations_link'
+    ]
+    list_filter = ['last_visit', 'last_reservation_date']
+    search_fields = ['name', 'email', 'phone_key']
+    ordering = ['-last_reservation_date']
+    readonly_fields = [
+        'phone_key', 'total_reservations', 'cancelled_reservations', 'completed_reservations',
+        'last_reservation_date', 'last_visit', 'created_at', 'updated_at'
+    ]
+    
+    def reservations_link(self, obj):
+        return format_html(
+            '<a href="/admin/reservations/reservation/?customer__id__exact={}">📋 Réservations</a>', obj.pk
+        )
+    reservations_link.short_description = 'Réservations'
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Phone on the normalized key (indexed prefix), otherwise name/email"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        phone_key = normalize_phone(term) if looks_like_phone(term) else ''
+        if phone_key:  # '000', '+000': nothing left, startswith('') would match every client
+            return queryset.filter(phone_key__startswith=phone_key), False
+        return queryset.filter(Q(name__icontains=term) | Q(email__icontains=term.lower())), False
 
 class SpecialDateAdmin(admin.ModelAdmin):
     """Admin for special dates - CASABLANCA TIMEZONE VERSION - FIXED FOR is_open FIELD"""
@@ -1662,8 +1781,8 @@ class SpecialDateAdmin(admin.ModelAdmin):
             casablanca_now = timezone.localtime(timezone.now())
             today = casablanca_now.date()
             
-            print(f"🔍 SPECIAL DATE DEBUG - Casablanca time: {casablanca_now}")
-            print(f"🔍 SPECIAL DATE DEBUG - Today: {today}, Special date: {obj.date}")
+            logger.debug(f"🔍 SPECIAL DATE DEBUG - Casablanca time: {casablanca_now}")
+            logger.debug(f"🔍 SPECIAL DATE DEBUG - Today: {today}, Special date: {obj.date}")
             
             if obj.date == today:
                 return format_html('<span style="color: #f44336; font-weight: bold;">Aujourd\'hui</span>')
@@ -1672,7 +1791,7 @@ class SpecialDateAdmin(admin.ModelAdmin):
             else:
                 return format_html('<span style="color: #666;">Passée</span>')
         except Exception as e:
-            print(f"🔍 SPECIAL DATE ERROR - {e}")
+            logger.error(f"🔍 SPECIAL DATE ERROR - {e}")
             return format_html('<span style="color: #999;">N/A</span>')
     is_upcoming_date.short_description = 'Statut'
     
@@ -1690,7 +1809,7 @@ class SpecialDateAdmin(admin.ModelAdmin):
             else:
                 return "-"
         except Exception as e:
-            print(f"🔍 SPECIAL DATE DAYS ERROR - {e}")
+            logger.error(f"🔍 SPECIAL DATE DAYS ERROR - {e}")
             return "-"
     days_until_date.short_description = 'Échéance'
     
@@ -1701,7 +1820,7 @@ class SpecialDateAdmin(admin.ModelAdmin):
         casablanca_now = timezone.localtime(timezone.now())
         thirty_days_ago = casablanca_now.date() - timedelta(days=30)
         
-        print(f"🔍 SPECIAL DATE QUERYSET DEBUG - Filtering from: {thirty_days_ago}")
+        logger.debug(f"🔍 SPECIAL DATE QUERYSET DEBUG - Filtering from: {thirty_days_ago}")
         return qs.filter(date__gte=thirty_days_ago)
 
 # ===== REGISTER ALL MODELS =====
@@ -1710,6 +1829,7 @@ admin.site.register(RestaurantInfo, RestaurantInfoAdmin)
 admin.site.register(Reservation, ReservationAdmin)
 admin.site.register(TimeSlot, TimeSlotAdmin)
 admin.site.register(SpecialDate, SpecialDateAdmin)
+admin.site.register(Customer, CustomerAdmin)
 
 # Customize admin site - REMOVE ALL BRANDING
 admin.site.site_header = ""
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.utils.retention import RETENTION_POLICIES, run_retention
+
+
+class Command(BaseCommand):
+    help = "Supprime les anciennes notifications / données de tracking par lots (ordre de clé primaire)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'policies', nargs='*', choices=sorted(RETENTION_POLICIES), metavar='policy',
+            help="Politiques à appliquer: notifications, tracking (défaut: toutes)"
+        )
+        parser.add_argument('--days', type=int, help="Remplace la durée de rétention des settings")
+        parser.add_argument('--batch-size', type=int, help="Lignes supprimées par lot (RETENTION_BATCH_SIZE)")
+        parser.add_argument('--pause', type=float, help="Pause en secondes entre deux lots (RETENTION_BATCH_PAUSE)")
+        parser.add_argument('--start-after', type=int, default=0, help="Reprendre après cette clé primaire (last_pk)")
+        parser.add_argument('--max-batches', type=int, help="Arrêter après N lots (reprise possible avec --start-after)")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans supprimer")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        policies = options['policies'] or list(RETENTION_POLICIES)
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être >= 1")
+
+        for policy in policies:
+            stats = run_retention(
+                policy,
+                days=options['days'],
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                start_after=options['start_after'],
+                max_batches=options['max_batches'],
+                dry_run=options['dry_run'],
+                progress=self.report_progress,
+            )
+
+            verb = "à supprimer" if options['dry_run'] else "supprimées"
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {policy}: {stats['deleted']} lignes {verb} en {stats['batches']} lots "
+                f"({stats['elapsed']}s, {stats['rate']} lignes/s, cutoff {stats['cutoff']})"
+            ))
+            if not stats['finished']:
+                self.stdout.write(self.style.WARNING(
+                    f"⏸️ {policy}: arrêt avant la fin - reprendre avec --start-after {stats['last_pk']}"
+                ))
+
+    def report_progress(self, stats):
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f"  lot {stats['batches']}: {stats['deleted']} lignes, last_pk {stats['last_pk']}, "
+                f"{stats['rate']} lignes/s"
+            )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+
+from reservations.utils.archive import archive_reservations, get_archive_dir
+
+
+class Command(BaseCommand):
+    help = "Archive les anciennes réservations (et leurs notifications) en fichiers gzip JSONL par mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archiver les réservations plus vieilles que N jours (ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--before', help="Archiver les réservations avant cette date (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, help="Réservations déplacées par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans écrire ni supprimer")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        before = None
+        if options['before']:
+            try:
+                before = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError("--before doit être au format YYYY-MM-DD")
+
+        stats = archive_reservations(
+            days=options['days'],
+            before=before,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            progress=self.report_progress,
+        )
+
+        verb = "à archiver" if options['dry_run'] else "archivées"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['reservations']} réservations {verb} avant {stats['before']} "
+            f"({stats['notifications']} notifications, {stats['batches']} lots) -> {get_archive_dir()}"
+        ))
+        if stats['months']:
+            self.stdout.write(f"📦 Mois: {', '.join(stats['months'])}")
+
+    def report_progress(self, stats):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  lot {stats['batches']}: {stats['reservations']} réservations")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations.models import Reservation
+from reservations.utils.customers import HistoryAccumulator, chunks, save_history
+
+
+class Command(BaseCommand):
+    help = "Crée les fiches clients (téléphone normalisé / email) à partir des réservations existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Lignes lues par aller-retour base")
+        parser.add_argument('--dry-run', action='store_true', help="Compter les clients sans rien écrire")
+
+    def handle(self, *args, **options):
+        history = HistoryAccumulator()
+        links = []
+
+        # Single streaming pass: plain tuples, no model instances
+        rows = Reservation.objects.order_by('pk').values_list(
+            'pk', 'customer_name', 'customer_phone', 'customer_email', 'status', 'date', 'customer_id'
+        ).iterator(chunk_size=options['chunk_size'])
+        for pk, name, phone, email, status, day, current_customer_id in rows:
+            key = history.add(name, phone, email, status, day)
+            if key is not None:
+                links.append((pk, key, current_customer_id))
+
+        self.stdout.write(f"📊 {len(links)} réservations, {len(history)} clients distincts")
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            # Counters are rebuilt from the reservations (absolute values)
+            customer_ids = save_history(history, absolute=True)
+
+            changed = [
+                Reservation(pk=pk, customer_id=customer_ids[key])
+                for pk, key, current_customer_id in links
+                if customer_ids.get(key) != current_customer_id
+            ]
+            for chunk in chunks(changed, options['chunk_size']):
+                Reservation.objects.bulk_update(chunk, ['customer'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(history)} clients à jour, {len(changed)} réservations rattachées"
+        ))
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+import statistics
+import time
+
+DEFAULT_PAGES = [
+    '/admin/',
+    '/admin/reservations/reservation/',
+    '/admin/reservations/timeslot/',
+    '/admin/reservations/notification/',
+]
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence des pages admin (changelists, tableau de bord) avec un utilisateur staff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', help="Chemins à mesurer (défaut: index + changelists principales)")
+        parser.add_argument('--runs', type=int, default=20, help="Requêtes mesurées par page")
+        parser.add_argument('--warmup', type=int, default=2, help="Requêtes non mesurées par page (caches, calendrier)")
+        parser.add_argument('--user', help="Utilisateur staff (défaut: premier superutilisateur)")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_staff=True, is_active=True)
+        user = users.filter(username=options['user']).first() if options['user'] else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Aucun utilisateur staff trouvé")
+
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+
+        self.stdout.write(f"{'page':45} {'min':>8} {'p50':>8} {'p95':>8} {'mean':>8}  (ms, {options['runs']} runs)")
+        for page in options['pages'] or DEFAULT_PAGES:
+            for _ in range(options['warmup']):
+                client.get(page)
+
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                response = client.get(page)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{page}: HTTP {response.status_code}")
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{page:45} {timings[0]:8.1f} {statistics.median(timings):8.1f} {p95:8.1f} {statistics.mean(timings):8.1f}"
+            )
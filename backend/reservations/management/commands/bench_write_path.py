@@ -0,0 +1,265 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from pathlib import Path
+import django
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from reservations.models import Reservation
+from reservations.signals import reservation_signals_muted
+from reservations.utils.availability import MAX_HORIZON_DAYS, find_available_slots
+from reservations.utils.occupancy import ACTIVE_STATUSES
+
+BENCH_NAME = "Client Bench"
+BENCH_DOMAIN = 'bench.writepath.ma'
+
+# Iterations with tracemalloc + query capture (both slow the code down: not timed)
+PROFILED_ITERATIONS = 3
+
+
+class Rollback(Exception):
+    pass
+
+
+def git_revision():
+    """(short sha, dirty) of the working tree, ('unknown', False) outside git"""
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmarks du chemin d'écriture des réservations (save(), signaux, notifications, "
+        "e-mails en locmem): temps, requêtes SQL et allocations par opération, résultats en JSON"
+    )
+
+    benchmarks = [
+        'create', 'create_api', 'status_change', 'delete', 'admin_confirm', 'admin_cancel',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Benchmarks à lancer (défaut: tous) - {', '.join(self.benchmarks)}")
+        parser.add_argument('--iterations', type=int, default=30, help="Opérations mesurées par benchmark")
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--bulk-size', type=int, default=50, help="Réservations par action admin groupée")
+        parser.add_argument('--output', help="Fichier JSON (défaut: benchmarks/<date>_<commit>.json)")
+        parser.add_argument('--compare', help="Résultat précédent à comparer (JSON)")
+        parser.add_argument('--no-save', action='store_true', help="Ne pas écrire de fichier JSON")
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(self.benchmarks)
+        if unknown:
+            raise CommandError(f"Benchmarks inconnus: {', '.join(sorted(unknown))}")
+        self.options = options
+        names = options['names'] or self.benchmarks
+
+        results = {}
+        # Everything is rolled back; on_commit hooks (content versions) run inside each measured operation
+        try:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), transaction.atomic():
+                self.prepare()
+                for name in names:
+                    results[name] = self.run_benchmark(name)
+                    self.print_row(name, results[name])
+                raise Rollback
+        except Rollback:
+            pass
+
+        sha, dirty = git_revision()
+        report = {
+            'commit': sha,
+            'dirty': dirty,
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'bulk_size': options['bulk_size'],
+            'benchmarks': results,
+        }
+        if options['compare']:
+            self.compare(report, options['compare'])
+        if not options['no_save']:
+            path = Path(options['output'] or Path(settings.BASE_DIR) / 'benchmarks'
+                        / f"{timezone.localtime().strftime('%Y%m%d-%H%M%S')}_{sha}.json")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"📝 {path}")
+
+    # ===== FIXTURES =====
+
+    def prepare(self):
+        self.admin_user = User.objects.filter(is_superuser=True, is_active=True).first()
+        if self.admin_user is None:
+            raise CommandError("Aucun superutilisateur (destinataire des notifications, actions admin)")
+        free = find_available_slots(
+            party_size=2, days=MAX_HORIZON_DAYS, limit=1, start=timezone.localdate() + timedelta(days=1)
+        )
+        if not free:
+            raise CommandError("Aucun créneau libre pour mesurer la création de réservation")
+        self.day, self.slot_time = free[0]['date'], free[0]['time']
+        self.counter = 0
+        self.client = Client()
+
+    def reservation_data(self):
+        self.counter += 1
+        return {
+            'customer_name': f"{BENCH_NAME} {self.counter}",
+            'customer_email': f"client{self.counter}@{BENCH_DOMAIN}",
+            'customer_phone': f"+2126{self.counter:08d}",
+            'date': self.day,
+            'time': self.slot_time,
+            'number_of_guests': 2,
+        }
+
+    def make_reservations(self, count, status='En attente'):
+        """Rows to update/delete, created without signals (setup, not measured)"""
+        with reservation_signals_muted():
+            return [Reservation.objects.create(status=status, **self.reservation_data()) for _ in range(count)]
+
+    def admin_request(self):
+        request = RequestFactory().post('/admin/reservations/reservation/')
+        request.user = self.admin_user
+        request._messages = CookieStorage(request)
+        return request
+
+    # ===== BENCHMARKS: (setup() -> state, operation(state)) =====
+
+    def bench_create(self):
+        return lambda: None, lambda state: Reservation.objects.create(status='En attente', **self.reservation_data())
+
+    def bench_create_api(self):
+        def setup():
+            # The slot must stay free: earlier benchmark rows are cancelled (not measured)
+            Reservation.objects.filter(
+                customer_name__startswith=BENCH_NAME, status__in=ACTIVE_STATUSES
+            ).update(status='Annulée')
+
+        def operation(state):
+            data = self.reservation_data()
+            data.update(date=self.day.isoformat(), time=self.slot_time.strftime('%H:%M'))
+            response = self.client.post('/api/reservations/create/', data, content_type='application/json')
+            if response.status_code != 201:
+                raise CommandError(f"create_api: HTTP {response.status_code} {response.content[:200]!r}")
+        return setup, operation
+
+    def bench_status_change(self):
+        def operation(reservation):
+            reservation.status = 'Confirmée'
+            reservation.save()
+        return lambda: self.make_reservations(1)[0], operation
+
+    def bench_delete(self):
+        return lambda: self.make_reservations(1)[0], lambda reservation: reservation.delete()
+
+    def bench_admin_confirm(self):
+        return self.admin_action('mark_as_confirmed')
+
+    def bench_admin_cancel(self):
+        return self.admin_action('mark_as_cancelled')
+
+    def admin_action(self, action):
+        model_admin = admin.site._registry[Reservation]
+
+        def setup():
+            reservations = self.make_reservations(self.options['bulk_size'])
+            return Reservation.objects.filter(pk__in=[reservation.pk for reservation in reservations])
+
+        return setup, lambda queryset: getattr(model_admin, action)(self.admin_request(), queryset)
+
+    # ===== MEASURE =====
+
+    def measured(self, operation, state):
+        """Run one operation with its on_commit hooks (executed as a commit would)"""
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            operation(state)
+
+    def run_benchmark(self, name):
+        setup, operation = getattr(self, f'bench_{name}')()
+        for _ in range(self.options['warmup']):
+            self.measured(operation, setup())
+
+        timings = []
+        for _ in range(self.options['iterations']):
+            state = setup()
+            started = time.perf_counter()
+            self.measured(operation, state)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        queries, emails, peaks, allocated = [], [], [], []
+        for _ in range(PROFILED_ITERATIONS):
+            state = setup()
+            outbox = len(getattr(mail, 'outbox', []))
+            connection.queries_log.clear()  # bounded deque: a full log would count 0 new queries
+            tracemalloc.start()
+            try:
+                with CaptureQueriesContext(connection) as captured:
+                    self.measured(operation, state)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            queries.append(len(captured))
+            emails.append(len(mail.outbox) - outbox)
+            peaks.append(peak)
+            allocated.append(current)
+
+        timings.sort()
+        return {
+            'iterations': len(timings),
+            'min_ms': round(timings[0], 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'stdev_ms': round(statistics.stdev(timings), 3) if len(timings) > 1 else 0.0,
+            'queries': max(queries),
+            'emails': max(emails),
+            'alloc_peak_kb': round(statistics.median(peaks) / 1024, 1),
+            'alloc_retained_kb': round(statistics.median(allocated) / 1024, 1),
+        }
+
+    # ===== OUTPUT =====
+
+    def print_row(self, name, row):
+        if not hasattr(self, 'header_printed'):
+            self.header_printed = True
+            self.stdout.write(
+                f"{'benchmark':16} {'min':>9} {'median':>9} {'p95':>9} {'queries':>8} {'emails':>7} {'peak KB':>9}  (ms)"
+            )
+        self.stdout.write(
+            f"{name:16} {row['min_ms']:9.2f} {row['median_ms']:9.2f} {row['p95_ms']:9.2f} "
+            f"{row['queries']:8} {row['emails']:7} {row['alloc_peak_kb']:9.1f}"
+        )
+
+    def compare(self, report, previous_path):
+        try:
+            previous = json.loads(Path(previous_path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Résultat précédent illisible: {e}")
+
+        self.stdout.write(f"\nvs {previous.get('commit')} ({previous.get('created_at', '')[:10]}):")
+        for name, row in report['benchmarks'].items():
+            old = previous.get('benchmarks', {}).get(name)
+            if not old:
+                continue
+            change = (row['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0
+            self.stdout.write(
+                f"{name:16} median {old['median_ms']:.2f} → {row['median_ms']:.2f} ms ({change:+.0f}%), "
+                f"queries {old['queries']} → {row['queries']}, peak {old['alloc_peak_kb']} → {row['alloc_peak_kb']} KB"
+            )
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from datetime import timedelta
+
+from reservations.models import Reservation, Notification
+from reservations.utils.partitioning import (
+    PARTITIONED_TABLES, add_months, convert_to_partitioned, ensure_partitions,
+    explain_partitions, is_partitioned, month_start, partitioning_supported,
+)
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions mensuelles à venir (Reservation.date, Notification.created_at) - PostgreSQL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help="Mois futurs à préparer (DATABASE_PARTITIONING['MONTHS_AHEAD'])")
+        parser.add_argument('--convert', action='store_true', help="Convertir les tables pas encore partitionnées")
+        parser.add_argument('--check-pruning', action='store_true', help="Vérifier (EXPLAIN) que les requêtes par mois ne lisent qu'une partition")
+
+    def handle(self, *args, **options):
+        if not partitioning_supported(connection):
+            raise CommandError(f"Le partitionnement nécessite PostgreSQL (base actuelle: {connection.vendor})")
+
+        for table in PARTITIONED_TABLES:
+            with connection.cursor() as cursor:
+                partitioned = is_partitioned(cursor, table)
+
+            if not partitioned:
+                if not options['convert']:
+                    self.stdout.write(self.style.WARNING(f"⚠️ {table} n'est pas partitionnée (utiliser --convert)"))
+                    continue
+                convert_to_partitioned(table, months_ahead=options['months_ahead'])
+                self.stdout.write(self.style.SUCCESS(f"✅ {table} convertie en partitions mensuelles"))
+
+            created = ensure_partitions(table, months_ahead=options['months_ahead'])
+            self.stdout.write(f"📅 {table}: {len(created)} partition(s) créée(s) {', '.join(created)}".rstrip())
+
+        if options['check_pruning']:
+            self.check_pruning()
+
+    def check_pruning(self):
+        """A one-month range must be planned on a single partition"""
+        start = month_start(timezone.localdate())
+        end = add_months(start, 1)
+        checks = [
+            ('reservations_reservation', Reservation.objects.filter(date__gte=start, date__lt=end)),
+            ('reservations_notification', Notification.objects.filter(
+                created_at__gte=timezone.now() - timedelta(days=1), created_at__lt=timezone.now()
+            )),
+        ]
+
+        failures = 0
+        for table, queryset in checks:
+            with connection.cursor() as cursor:
+                if not is_partitioned(cursor, table):
+                    continue
+            scanned = explain_partitions(queryset)
+            # A 24h window can straddle two months; the default partition must never be scanned
+            if scanned and len(scanned) <= 2 and f"{table}_default" not in scanned:
+                self.stdout.write(self.style.SUCCESS(f"✅ Pruning {table}: {', '.join(scanned)}"))
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"❌ Pruning {table}: {len(scanned)} partitions lues"))
+
+        if failures:
+            raise CommandError(f"{failures} vérification(s) de pruning en échec")
@@ -0,0 +1,269 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import random
+import time as clock
+import uuid
+
+from reservations.models import Notification, Reservation, SpecialDate, TimeSlot, get_restaurant_info
+from reservations.utils.bulk_import import link_customers
+from reservations.utils.content_versions import bump_version
+from reservations.utils.occupancy import default_duration
+from reservations.utils.partitioning import ensure_partitions, partitioned_tables
+
+# Share of the week's bookings per weekday (Monday first)
+WEEKDAY_WEIGHTS = [0.7, 0.75, 0.85, 1.0, 1.5, 1.8, 1.2]
+# Seasonality per month (summer and end of year are busier)
+MONTH_WEIGHTS = [0.8, 0.8, 0.9, 1.0, 1.0, 1.1, 1.4, 1.5, 1.0, 0.9, 0.9, 1.2]
+# Party sizes and their frequency
+PARTY_SIZES = [1, 2, 3, 4, 5, 6, 8, 10, 12]
+PARTY_WEIGHTS = [4, 40, 14, 22, 6, 7, 4, 2, 1]
+
+PAST_STATUSES = (['Terminée', 'Annulée', 'Confirmée'], [82, 13, 5])  # Confirmée = no-show never closed
+FUTURE_STATUSES = (['En attente', 'Confirmée', 'Annulée'], [35, 55, 10])
+
+FIRST_NAMES = ['Youssef', 'Fatima', 'Mohamed', 'Khadija', 'Omar', 'Salma', 'Amine', 'Imane', 'Karim', 'Nadia',
+               'Hamza', 'Sara', 'Mehdi', 'Leila', 'Anas', 'Meryem', 'Rachid', 'Hind', 'Julien', 'Claire']
+LAST_NAMES = ['Alaoui', 'Benali', 'El Idrissi', 'Tazi', 'Bennani', 'Chraibi', 'Fassi', 'Berrada', 'Lahlou',
+              'Ziani', 'Amrani', 'Kettani', 'Martin', 'Dubois', 'Haddad', 'Ouazzani']
+EMAIL_DOMAINS = ['gmail.com', 'hotmail.com', 'yahoo.fr', 'outlook.com', 'menara.ma']
+
+LOAD_MESSAGE = "Données de charge (generate_load_data)"
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the created_at values we set (auto_now_add would overwrite them)"""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un gros jeu de données réaliste (réservations sur plusieurs années, dates spéciales, "
+        "notifications avec suivi email) par bulk_create en lots, à graine fixe - pour les tests de charge"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=100000, help="Nombre de réservations à créer")
+        parser.add_argument('--years', type=float, default=3, help="Période couverte, jusqu'à --days-ahead jours dans le futur")
+        parser.add_argument('--days-ahead', type=int, default=60, help="Jours futurs couverts")
+        parser.add_argument('--notifications-per-reservation', type=float, default=1.5,
+                            help="Notifications moyennes par réservation (création + changements de statut)")
+        parser.add_argument('--customers', type=int, default=None,
+                            help="Clients distincts (défaut: une réservation sur 4 - habitués)")
+        parser.add_argument('--link-customers', action='store_true',
+                            help="Créer/relier les fiches Customer pendant l'insertion (plus lent; sinon: backfill_customers)")
+        parser.add_argument('--seed', type=int, default=42, help="Graine: même graine, mêmes données")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['reservations'] <= 0:
+            raise CommandError("--reservations doit être positif")
+
+        self.rng = random.Random(options['seed'])
+        today = timezone.localdate()
+        end = today + timedelta(days=options['days_ahead'])
+        start = end - timedelta(days=int(options['years'] * 365))
+
+        self.restaurant = get_restaurant_info()
+        self.slots = list(TimeSlot.objects.filter(is_active=True).order_by('time'))
+        if not self.slots:
+            raise CommandError("Aucun créneau actif: créez les TimeSlot avant de générer des réservations")
+        self.slot_weights = [self.slot_weight(slot.time) for slot in self.slots]
+        self.user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if self.user is None:
+            raise CommandError("Un superutilisateur est nécessaire (destinataire des notifications)")
+        customers = options['customers'] or max(1, options['reservations'] // 4)
+
+        months_ahead = (end.year - today.year) * 12 + end.month - today.month + 1
+        for table in partitioned_tables(connection):
+            ensure_partitions(table, start=start, months_ahead=months_ahead)
+
+        started = clock.monotonic()
+        special_dates = self.create_special_dates(start, end)
+        self.stdout.write(f"📅 {special_dates} dates spéciales")
+
+        closed = set(SpecialDate.objects.filter(date__range=(start, end), is_open=False).values_list('date', flat=True))
+        plan = self.plan_days(start, end, options['reservations'], closed)
+
+        created = notifications = 0
+        batch = []
+        for day, count in plan:
+            for _ in range(count):
+                batch.append(self.build_reservation(day, today, customers))
+                if len(batch) >= options['batch_size']:
+                    notifications += self.insert(batch, today, options)
+                    created += len(batch)
+                    batch = []
+                    rate = created / (clock.monotonic() - started)
+                    self.stdout.write(f"   {created}/{options['reservations']} réservations ({rate:.0f}/s)")
+        if batch:
+            notifications += self.insert(batch, today, options)
+            created += len(batch)
+
+        bump_version('reservations', 'special_dates')
+        elapsed = clock.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {created} réservations, {notifications} notifications en {elapsed:.1f}s ({start} → {end})"
+        ))
+        if not options['link_customers']:
+            self.stdout.write("ℹ️ Fiches clients non reliées: lancer `manage.py backfill_customers`")
+
+    # ===== DISTRIBUTIONS =====
+
+    def slot_weight(self, slot_time):
+        """Dinner peak around 20:00, smaller lunch peak around 13:00"""
+        hour = slot_time.hour + slot_time.minute / 60
+        if hour >= 18:
+            return 3.0 - min(abs(hour - 20.25), 2.5)
+        return 1.5 - min(abs(hour - 13), 1.4)
+
+    def plan_days(self, start, end, total, closed):
+        """(day, reservations) for each open day, proportional to weekday/month weights"""
+        days = []
+        day = start
+        while day <= end:
+            if day not in closed and not self.restaurant.is_closed_on_day(day.weekday()):
+                weight = WEEKDAY_WEIGHTS[day.weekday()] * MONTH_WEIGHTS[day.month - 1] * self.rng.uniform(0.8, 1.2)
+                days.append((day, weight))
+            day += timedelta(days=1)
+        if not days:
+            raise CommandError("Aucun jour ouvert sur la période")
+
+        scale = total / sum(weight for _, weight in days)
+        plan, carry = [], 0.0
+        for day, weight in days:
+            exact = weight * scale + carry
+            count = int(exact)
+            carry = exact - count
+            plan.append((day, count))
+        # Rounding leftovers go to the last day
+        missing = total - sum(count for _, count in plan)
+        plan[-1] = (plan[-1][0], plan[-1][1] + missing)
+        return plan
+
+    def customer(self, customers):
+        """40% of the bookings come from regulars (Pareto over the low indexes), the rest from anyone"""
+        if self.rng.random() < 0.4:
+            index = (int(self.rng.paretovariate(1.1)) - 1) % customers
+        else:
+            index = self.rng.randrange(customers)
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        phone = f"06{index:08d}"
+        email = None
+        if index % 5:  # one in five books without an email
+            email = f"{first}.{last}{index}@{EMAIL_DOMAINS[index % len(EMAIL_DOMAINS)]}".lower().replace(' ', '')
+        return f"{first} {last}", phone, email
+
+    def build_reservation(self, day, today, customers):
+        rng = self.rng
+        slot = rng.choices(self.slots, self.slot_weights)[0]
+        guests = rng.choices(PARTY_SIZES, PARTY_WEIGHTS)[0]
+        statuses, weights = PAST_STATUSES if day < today else FUTURE_STATUSES
+        status = rng.choices(statuses, weights)[0]
+        name, phone, email = self.customer(customers)
+
+        booked_at = timezone.make_aware(datetime.combine(day, slot.time)) - timedelta(
+            days=min(int(rng.expovariate(1 / 6)), 90), minutes=rng.randrange(1440)
+        )
+        reservation = Reservation(
+            customer_name=name,
+            customer_phone=phone,
+            customer_email=email,
+            date=day,
+            time=slot.time,
+            number_of_guests=guests,
+            duration=default_duration(guests),
+            status=status,
+            special_requests="Anniversaire" if rng.random() < 0.03 else None,
+            created_at=booked_at,
+        )
+        if status in ('Confirmée', 'Terminée'):
+            reservation.confirmed_at = booked_at + timedelta(minutes=rng.randrange(5, 600))
+        elif status == 'Annulée':
+            reservation.cancelled_at = booked_at + timedelta(hours=rng.randrange(1, 72))
+        reservation.set_phone_search_keys()  # bulk_create skips save()
+        return reservation
+
+    # ===== INSERTS =====
+
+    def insert(self, batch, today, options):
+        """One transaction per batch: reservations, then their notifications"""
+        created_at = Reservation._meta.get_field('created_at')
+        notification_created_at = Notification._meta.get_field('created_at')
+        with transaction.atomic(), explicit_timestamps(created_at, notification_created_at):
+            if options['link_customers']:
+                link_customers(batch)
+            Reservation.objects.bulk_create(batch, batch_size=options['batch_size'])
+            notifications = [
+                notification
+                for reservation in batch
+                for notification in self.build_notifications(reservation, today, options['notifications_per_reservation'])
+            ]
+            Notification.objects.bulk_create(notifications, batch_size=options['batch_size'])
+        return len(notifications)
+
+    def build_notifications(self, reservation, today, per_reservation):
+        """New-reservation message, plus status-change messages up to the requested average"""
+        rng = self.rng
+        count = 1 + int(per_reservation - 1) + (rng.random() < (per_reservation - 1) % 1)
+        notifications = []
+        for index in range(count):
+            created_at = reservation.created_at + timedelta(hours=index * rng.randrange(1, 48))
+            if index == 0:
+                message_type, title = 'new_reservation', '📨 Nouvelle réservation'
+            elif reservation.status == 'Annulée':
+                message_type, title = 'reservation_cancelled', '❌ Réservation annulée'
+            else:
+                message_type, title = 'reservation_confirmed', '✅ Réservation confirmée'
+            email_sent = bool(reservation.customer_email) and rng.random() < 0.95
+            opened = email_sent and rng.random() < 0.55
+            is_read = reservation.date < today or rng.random() < 0.3
+            notifications.append(Notification(
+                title=f"{title} - {reservation.customer_name}",
+                message=LOAD_MESSAGE,
+                message_type=message_type,
+                priority='normal' if email_sent or not reservation.customer_email else 'urgent',
+                related_reservation=reservation,
+                user=self.user,
+                is_read=is_read,
+                read_at=created_at + timedelta(hours=rng.randrange(1, 24)) if is_read else None,
+                created_at=created_at,
+                email_sent=email_sent,
+                email_sent_at=created_at + timedelta(seconds=rng.randrange(2, 30)) if email_sent else None,
+                email_opened_by_client=opened,
+                email_opened_at=created_at + timedelta(minutes=int(rng.expovariate(1 / 240))) if opened else None,
+                client_ip=f"196.{rng.randrange(64, 128)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" if opened else None,
+                # Not from the seeded rng: a second run with the same --seed must not reuse the tokens (unique)
+                tracking_token=uuid.uuid4(),
+            ))
+        return notifications
+
+    def create_special_dates(self, start, end):
+        """Fixed holidays closed each year, plus a few days with special hours"""
+        special_dates = []
+        for year in range(start.year, end.year + 1):
+            for month, day, reason in [(1, 1, "Nouvel An"), (5, 1, "Fête du Travail"), (7, 30, "Fête du Trône")]:
+                special_dates.append(SpecialDate(date=datetime(year, month, day).date(), is_open=False, reason=reason))
+            for _ in range(6):
+                day = datetime(year, self.rng.randrange(1, 13), self.rng.randrange(1, 29)).date()
+                special_dates.append(SpecialDate(
+                    date=day, is_open=True, special_opening_time=time(18, 0), special_closing_time=time(23, 30),
+                    reason="Soirée privée",
+                ))
+        special_dates = [sd for sd in special_dates if start <= sd.date <= end]
+        existing = set(SpecialDate.objects.filter(date__range=(start, end)).values_list('date', flat=True))
+        new = {sd.date: sd for sd in special_dates if sd.date not in existing}  # one per date
+        SpecialDate.objects.bulk_create(list(new.values()))
+        return len(new)
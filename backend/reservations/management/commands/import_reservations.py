@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+
+from reservations.utils.bulk_import import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, NOTIFY_MODES, detect_format, import_reservations,
+)
+
+
+class Command(BaseCommand):
+    help = "Importe des réservations en masse (CSV ou JSONL) avec validation des créneaux et dates spéciales"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier CSV (',' ou ';') ou JSONL")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Format du fichier (défaut: selon l'extension)")
+        parser.add_argument('--notify', choices=NOTIFY_MODES, default='summary',
+                            help="none: aucun message, summary: un message récapitulatif, each: message + email par réservation")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Lignes validées et insérées par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Valider sans rien insérer")
+        parser.add_argument('--errors-file', help="Écrire les lignes rejetées dans ce fichier (JSONL)")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        file_format = options['format'] or detect_format(options['path'])
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_reservations(
+                    stream,
+                    file_format=file_format,
+                    notify=options['notify'],
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                    progress=self.report_progress,
+                )
+        except OSError as e:
+            raise CommandError(f"Impossible de lire {options['path']}: {e}")
+
+        verb = "valides" if options['dry_run'] else "importées"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {report['created']} réservations {verb}, {report['rejected']} rejetées "
+            f"sur {report['total']} lignes ({report['elapsed']}s)"
+        ))
+
+        for error in report['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"  ligne {error['line']}: {'; '.join(error['errors'])}"))
+        if len(report['errors']) > 20:
+            self.stdout.write(f"  ... {len(report['errors']) - 20} autres erreurs")
+
+        if options['errors_file'] and report['errors']:
+            with open(options['errors_file'], 'w', encoding='utf-8') as output:
+                for error in report['errors']:
+                    output.write(json.dumps(error, ensure_ascii=False) + '\n')
+            self.stdout.write(f"📝 Erreurs écrites dans {options['errors_file']}")
+
+    def report_progress(self, report):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {report['total']} lignes lues, {report['created']} valides")
@@ -0,0 +1,446 @@
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from datetime import datetime, timedelta
+import json
+import logging
+import random
+import socketserver
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from reservations.models import Customer, Reservation, get_restaurant_info
+from reservations.signals import reservation_signals_muted
+from reservations.utils.availability import MAX_HORIZON_DAYS
+from reservations.utils.occupancy import ACTIVE_STATUSES, load_occupancy
+from reservations.utils.opening_calendar import get_opening_calendar
+
+# Every booking of the run uses this e-mail domain (cleanup, overbooking check)
+LOAD_TEST_DOMAIN = 'rush-hour.loadtest.ma'
+
+FRIDAY = 4
+PARTY_SIZES = [1, 2, 3, 4, 5, 6, 8]
+PARTY_WEIGHTS = [3, 40, 12, 25, 8, 8, 4]
+
+# Endpoints polled by an open admin dashboard
+STAFF_ENDPOINTS = [
+    ('dashboard-stats', '/api/dashboard/stats/'),
+    ('dashboard-metrics', '/dashboard/api/metrics/'),
+    ('dashboard-recent', '/dashboard/api/recent/'),
+    ('notifications', '/api/notifications/'),
+]
+
+# Default thresholds (overridable on the command line)
+DEFAULT_MAX_P95_MS = 1000
+DEFAULT_MAX_P99_MS = 2500
+DEFAULT_MIN_RPS = 20
+DEFAULT_MAX_ERROR_RATE = 0.01
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+# ===== LOCAL SINKS =====
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: every message is accepted and counted, nothing is delivered"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply('220 localhost load test sink')
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    self.server.count_message()
+                    self.reply('250 OK')
+                continue
+            verb = line[:4].upper()
+            if verb == b'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif verb == b'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif verb == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpSinkHandler)
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    def count_message(self):
+        with self.lock:
+            self.messages += 1
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+# ===== CLIENTS =====
+
+class HttpSession:
+    """urllib client of one simulated browser - records (endpoint, status, ms) per request"""
+
+    def __init__(self, base_url, cookies=''):
+        self.base_url = base_url
+        self.cookies = cookies
+        self.samples = []
+
+    def request(self, name, path, payload=None):
+        headers = {'Accept': 'application/json'}
+        data = None
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = self.cookies
+
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, body = error.code, error.read()
+        except OSError:
+            status, body = 0, b''  # connection refused / reset / timeout
+        self.samples.append((name, status, (time.perf_counter() - started) * 1000))
+
+        try:
+            return status, json.loads(body) if body else {}
+        except ValueError:
+            return status, {}
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge 'vendredi soir': clients concurrents qui réservent comme BookingPage.js "
+        "(special-dates, timeslots, availability, create) + staff qui consulte le tableau de bord. "
+        "Serveur local, SMTP local (aucun appel réseau). Échoue si un seuil est dépassé ou en cas de surréservation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=40, help="Clients qui réservent en parallèle")
+        parser.add_argument('--bookings-per-client', type=int, default=5, help="Parcours de réservation par client")
+        parser.add_argument('--staff', type=int, default=2, help="Tableaux de bord ouverts en parallèle")
+        parser.add_argument('--staff-interval', type=float, default=2.0, help="Secondes entre deux rafraîchissements staff")
+        parser.add_argument('--think-ms', type=int, default=200, help="Pause max. entre deux actions d'un client")
+        parser.add_argument('--fridays', type=int, default=2, help="Vendredis ciblés (ouverts, sans réservation active)")
+        parser.add_argument('--date', action='append', default=[], help="Date ciblée YYYY-MM-DD (remplace --fridays, répétable)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--max-p95-ms', type=float, default=DEFAULT_MAX_P95_MS)
+        parser.add_argument('--max-p99-ms', type=float, default=DEFAULT_MAX_P99_MS)
+        parser.add_argument('--min-rps', type=float, default=DEFAULT_MIN_RPS, help="Débit minimal (requêtes/s)")
+        parser.add_argument('--max-error-rate', type=float, default=DEFAULT_MAX_ERROR_RATE, help="Part max. de 5xx / erreurs réseau")
+        parser.add_argument('--baseline', help="Rapport JSON d'un run précédent: échoue si p95/débit régressent au-delà de --tolerance")
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Régression admise vs --baseline (0.25 = 25%%)")
+        parser.add_argument('--report', help="Écrit le rapport JSON de ce run")
+        parser.add_argument('--keep', action='store_true', help="Conserver les réservations créées")
+
+    def handle(self, *args, **options):
+        self.options = options
+        admin_user = User.objects.filter(is_superuser=True, is_active=True).first()
+        if admin_user is None:
+            raise CommandError("Aucun superutilisateur: le tableau de bord staff ne peut pas être simulé")
+
+        days = self.target_days()
+        baseline_violations = self.overbooking(days)
+
+        sink = SmtpSink()
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(WSGIHandler())
+        threads = [
+            threading.Thread(target=sink.serve_forever, daemon=True),
+            threading.Thread(target=server.serve_forever, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        staff_client = Client()
+        staff_client.force_login(admin_user)
+        staff_cookies = '; '.join(f"{key}={morsel.value}" for key, morsel in staff_client.cookies.items())
+
+        self.stdout.write(
+            f"🚀 {options['clients']} clients x {options['bookings_per_client']} réservations, "
+            f"{options['staff']} staff - {', '.join(str(day) for day in days)}"
+        )
+        email_settings = dict(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.server_address[1],
+            EMAIL_USE_TLS=False, EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', EMAIL_TIMEOUT=10,
+        )
+        # Per-request INFO/WARNING lines would bury the report (-v 2 keeps them)
+        previous_disable = logging.root.manager.disable
+        if options['verbosity'] < 2:
+            logging.disable(logging.WARNING)
+        try:
+            with override_settings(**email_settings):
+                results = self.run_load(base_url, staff_cookies, days)
+        finally:
+            logging.disable(previous_disable)
+            server.shutdown()
+            sink.shutdown()
+            server.server_close()
+            sink.server_close()
+
+        results['emails'] = sink.messages
+        results['overbooking'] = self.new_violations(baseline_violations, self.overbooking(days))
+        if not options['keep']:
+            self.cleanup()
+
+        self.print_report(results)
+        if options['report']:
+            with open(options['report'], 'w') as handle:
+                json.dump(results, handle, indent=2, default=str)
+            self.stdout.write(f"📝 Rapport: {options['report']}")
+
+        failures = self.check_thresholds(results)
+        if failures:
+            raise CommandError("Seuils dépassés:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("✅ Tous les seuils sont respectés"))
+
+    # ===== SETUP =====
+
+    def target_days(self):
+        if self.options['date']:
+            try:
+                return sorted({datetime.strptime(value, '%Y-%m-%d').date() for value in self.options['date']})
+            except ValueError as e:
+                raise CommandError(f"Date invalide: {e}")
+
+        # Open Fridays without active bookings: the run starts from an empty evening
+        calendar = get_opening_calendar()
+        today = timezone.localdate()
+        candidates = [today + timedelta(days=offset) for offset in range(1, MAX_HORIZON_DAYS + 1)]
+        fridays = [day for day in candidates if day.weekday() == FRIDAY and calendar.is_open(day)]
+        booked = set(Reservation.objects.filter(
+            date__in=fridays, status__in=ACTIVE_STATUSES
+        ).values_list('date', flat=True).distinct())
+        days = [day for day in fridays if day not in booked][:self.options['fridays']]
+        if not days:
+            raise CommandError("Aucun vendredi ouvert sans réservation dans l'horizon: utiliser --date")
+        return days
+
+    # ===== LOAD =====
+
+    def run_load(self, base_url, staff_cookies, days):
+        options = self.options
+        finished = threading.Event()
+        sessions, outcomes = [], []
+        lock = threading.Lock()
+
+        def booking_worker(index):
+            session = HttpSession(base_url)
+            result = self.booking_client(session, random.Random(options['seed'] * 1000 + index), index, days)
+            with lock:
+                sessions.append(session)
+                outcomes.extend(result)
+
+        def staff_worker():
+            session = HttpSession(base_url, staff_cookies)
+            while not finished.is_set():
+                for name, path in STAFF_ENDPOINTS:
+                    session.request(name, path)
+                finished.wait(options['staff_interval'])
+            with lock:
+                sessions.append(session)
+
+        workers = [threading.Thread(target=booking_worker, args=(index,)) for index in range(options['clients'])]
+        pollers = [threading.Thread(target=staff_worker) for _ in range(options['staff'])]
+        started = time.perf_counter()
+        for thread in pollers + workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        finished.set()
+        for thread in pollers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        samples = [sample for session in sessions for sample in session.samples]
+        return self.summarize(samples, outcomes, elapsed)
+
+    def booking_client(self, session, rng, index, days):
+        """The requests BookingPage.js makes, one booking attempt per page visit"""
+        think = self.options['think_ms'] / 1000
+        outcomes = []
+        for attempt in range(self.options['bookings_per_client']):
+            session.request('special-dates', '/api/special-dates/')
+            session.request('timeslots', '/api/timeslots/')
+            party = rng.choices(PARTY_SIZES, PARTY_WEIGHTS)[0]
+
+            outcome = 'sold_out'
+            for day in rng.sample(days, len(days)):  # another Friday when the first one is full
+                time.sleep(rng.uniform(0, think))
+                status, data = session.request('availability', f'/api/availability/?date={day}')
+                slots = [
+                    slot for slot in data.get('availability', [])
+                    if slot.get('is_available') and slot.get('available_spots', 0) >= party
+                ]
+                if not slots:
+                    continue
+
+                # Dinner slots are the most wanted
+                weights = [3 if '19:00' <= slot['time'] <= '21:30' else 1 for slot in slots]
+                slot = rng.choices(slots, weights)[0]
+                time.sleep(rng.uniform(0, think))
+                status, _ = session.request('create', '/api/reservations/create/', {
+                    'customer_name': f"Client Rush {index}-{attempt}",
+                    'customer_email': f"client{index}.{attempt}@{LOAD_TEST_DOMAIN}",
+                    'customer_phone': f"+2126{index:04d}{attempt:04d}",
+                    'date': str(day),
+                    'time': slot['time'],
+                    'number_of_guests': party,
+                    'special_requests': '',
+                })
+                # 400 = the slot filled up between availability and submit
+                outcome = {201: 'booked', 400: 'rejected'}.get(status, 'error')
+                break
+            outcomes.append(outcome)
+        return outcomes
+
+    # ===== RESULTS =====
+
+    def summarize(self, samples, outcomes, elapsed):
+        by_endpoint = {}
+        for name, status, ms in samples:
+            by_endpoint.setdefault(name, []).append((status, ms))
+
+        def stats(entries):
+            timings = sorted(ms for _, ms in entries)
+            return {
+                'requests': len(entries),
+                'errors': sum(1 for status, _ in entries if status == 0 or status >= 500),
+                'p50_ms': round(statistics.median(timings), 1) if timings else 0.0,
+                'p95_ms': round(percentile(timings, 0.95), 1),
+                'p99_ms': round(percentile(timings, 0.99), 1),
+                'max_ms': round(timings[-1], 1) if timings else 0.0,
+            }
+
+        total = stats([(status, ms) for _, status, ms in samples])
+        total['rps'] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+        total['error_rate'] = round(total['errors'] / len(samples), 4) if samples else 0.0
+        return {
+            'started_at': timezone.now().isoformat(),
+            'options': {key: self.options[key] for key in (
+                'clients', 'bookings_per_client', 'staff', 'staff_interval', 'think_ms', 'seed',
+            )},
+            'elapsed_s': round(elapsed, 2),
+            'total': total,
+            'endpoints': {name: stats(entries) for name, entries in sorted(by_endpoint.items())},
+            'outcomes': {outcome: outcomes.count(outcome) for outcome in ('booked', 'rejected', 'sold_out', 'error')},
+        }
+
+    def overbooking(self, days):
+        """(day, rule, slot) -> amount over the limit, for every slot/restaurant limit exceeded"""
+        calendar = get_opening_calendar()
+        restaurant = get_restaurant_info()
+        occupancy = load_occupancy(min(days), max(days))
+        violations = {}
+        for day in days:
+            occ = occupancy[day]
+            for slot in calendar.open_slots(day):
+                count, guests = occ.slot_usage(slot.time)
+                if guests > slot.max_covers:
+                    violations[(str(day), 'slot_covers', slot.time.strftime('%H:%M'))] = guests - slot.max_covers
+                if slot.max_reservations is not None and count > slot.max_reservations:
+                    violations[(str(day), 'slot_reservations', slot.time.strftime('%H:%M'))] = count - slot.max_reservations
+            if occ.covers and max(occ.covers) > restaurant.capacity:
+                violations[(str(day), 'restaurant_covers', '')] = max(occ.covers) - restaurant.capacity
+            if occ.parties and max(occ.parties) > restaurant.number_of_tables:
+                violations[(str(day), 'restaurant_tables', '')] = max(occ.parties) - restaurant.number_of_tables
+        return violations
+
+    def new_violations(self, before, after):
+        return [
+            {'date': day, 'rule': rule, 'slot': slot, 'over_by': excess}
+            for (day, rule, slot), excess in sorted(after.items())
+            if excess > before.get((day, rule, slot), 0)
+        ]
+
+    def cleanup(self):
+        with reservation_signals_muted():
+            deleted, _ = Reservation.objects.filter(customer_email__endswith='@' + LOAD_TEST_DOMAIN).delete()
+            customers, _ = Customer.objects.filter(email__endswith='@' + LOAD_TEST_DOMAIN).delete()
+        self.stdout.write(f"🧹 {deleted} lignes de test supprimées (réservations + notifications), {customers} clients")
+
+    def print_report(self, results):
+        self.stdout.write(f"\n{'endpoint':20} {'req':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+        rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+        for name, row in rows:
+            self.stdout.write(
+                f"{name:20} {row['requests']:6} {row['errors']:5} {row['p50_ms']:8.1f} "
+                f"{row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}"
+            )
+        outcomes = results['outcomes']
+        self.stdout.write(
+            f"\n📊 {results['total']['rps']} req/s sur {results['elapsed_s']}s - "
+            f"{outcomes['booked']} réservées, {outcomes['rejected']} refusées (créneau pris entre-temps), "
+            f"{outcomes['sold_out']} complet, {outcomes['error']} erreurs - {results['emails']} e-mails reçus par le SMTP local"
+        )
+        for violation in results['overbooking']:
+            self.stdout.write(self.style.ERROR(
+                f"❌ Surréservation {violation['date']} {violation['slot']} {violation['rule']}: +{violation['over_by']}"
+            ))
+
+    def check_thresholds(self, results):
+        options = self.options
+        total = results['total']
+        failures = []
+        if results['overbooking']:
+            failures.append(f"{len(results['overbooking'])} surréservation(s)")
+        if total['p95_ms'] > options['max_p95_ms']:
+            failures.append(f"p95 {total['p95_ms']} ms > {options['max_p95_ms']} ms")
+        if total['p99_ms'] > options['max_p99_ms']:
+            failures.append(f"p99 {total['p99_ms']} ms > {options['max_p99_ms']} ms")
+        if total['rps'] < options['min_rps']:
+            failures.append(f"débit {total['rps']} req/s < {options['min_rps']} req/s")
+        if total['error_rate'] > options['max_error_rate']:
+            failures.append(f"taux d'erreur {total['error_rate']:.2%} > {options['max_error_rate']:.2%}")
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Baseline illisible: {e}")
+            allowed = 1 + options['tolerance']
+            for name, row in results['endpoints'].items():
+                previous = baseline.get('endpoints', {}).get(name)
+                if previous and row['p95_ms'] > previous['p95_ms'] * allowed:
+                    failures.append(f"{name}: p95 {row['p95_ms']} ms vs {previous['p95_ms']} ms (baseline)")
+            previous_rps = baseline.get('total', {}).get('rps')
+            if previous_rps and total['rps'] * allowed < previous_rps:
+                failures.append(f"débit {total['rps']} req/s vs {previous_rps} req/s (baseline)")
+        return failures
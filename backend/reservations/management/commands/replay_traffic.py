@@ -0,0 +1,237 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from reservations.utils.traffic import has_pseudonymous_token, load_traces
+
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def ks_statistic(first, second):
+    """Two-sample Kolmogorov-Smirnov D: largest gap between the two latency CDFs (0 = same distribution)"""
+    first, second = sorted(first), sorted(second)
+    i = j = 0
+    gap = 0.0
+    while i < len(first) and j < len(second):
+        value = min(first[i], second[j])
+        while i < len(first) and first[i] == value:
+            i += 1
+        while j < len(second) and second[j] == value:
+            j += 1
+        gap = max(gap, abs(i / len(first) - j / len(second)))
+    return gap
+
+
+def capture_files():
+    """Rotated capture files, oldest first (LOGGING['handlers']['file_traffic'])"""
+    handler = settings.LOGGING['handlers']['file_traffic']
+    path = Path(handler['filename'])
+    backups = [Path(f"{path}.{index}") for index in range(handler.get('backupCount', 0), 0, -1)]
+    return [candidate for candidate in backups + [path] if candidate.exists()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue le trafic capturé (TRAFFIC_CAPTURE, logs/traffic.jsonl) contre une instance locale, "
+        "au rythme d'origine (--speed 1) ou accéléré (--speed 10), et compare les latences de deux builds "
+        "(--compare A.json B.json). Les POST créent des réservations: repartir de la même base à chaque run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help="Fichiers de capture (défaut: logs/traffic.jsonl et ses rotations)")
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Instance cible")
+        parser.add_argument('--speed', type=float, default=1.0, help="1 = rythme d'origine, 10 = dix fois plus vite, 0 = sans pause")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requêtes en vol au maximum")
+        parser.add_argument('--limit', type=int, help="Rejouer seulement les N premières requêtes")
+        parser.add_argument('--read-only', action='store_true', help="Ignorer les requêtes qui écrivent (POST, PUT...)")
+        parser.add_argument('--include-tracking', action='store_true',
+                            help="Rejouer aussi /track/<jeton>: jetons anonymisés, absents de la base cible (404)")
+        parser.add_argument('--label', help="Nom du build (défaut: date)")
+        parser.add_argument('--output', help="Résultat JSON (latences par route) pour --compare")
+        parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare deux résultats, sans rejouer")
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Hausse de p95 admise (0.2 = 20%%)")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['compare']:
+            return self.compare(*options['compare'])
+
+        paths = options['files'] or capture_files()
+        if not paths:
+            raise CommandError("Aucun fichier de capture (activer TRAFFIC_CAPTURE['ENABLED'])")
+        entries = load_traces(paths)
+        if options['read_only']:
+            entries = [entry for entry in entries if entry['method'] in ('GET', 'HEAD')]
+        if not options['include_tracking']:
+            # Tracking tokens are replaced by pseudonyms at capture: no notification has them
+            tracking = [entry for entry in entries if has_pseudonymous_token(entry['path'])]
+            if tracking:
+                entries = [entry for entry in entries if not has_pseudonymous_token(entry['path'])]
+                self.stdout.write(f"⏭️ {len(tracking)} requêtes de suivi ignorées (jetons anonymisés, --include-tracking)")
+        if options['limit']:
+            entries = entries[:options['limit']]
+        if not entries:
+            raise CommandError("Aucune requête à rejouer")
+
+        span = entries[-1]['t'] - entries[0]['t']
+        self.stdout.write(
+            f"▶️ {len(entries)} requêtes ({span:.0f}s capturées) vers {options['url']} à x{options['speed'] or '∞'}"
+        )
+        samples, elapsed, max_lag = self.replay(entries)
+        result = self.summarize(samples, elapsed, max_lag)
+        self.print_result(result)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(result, indent=2))
+            self.stdout.write(f"📝 {options['output']}")
+
+    # ===== REPLAY =====
+
+    def build_request(self, entry):
+        url = self.options['url'].rstrip('/') + entry['path']
+        if entry.get('query'):
+            url += '?' + urlencode(entry['query'], doseq=True)
+
+        body, headers = entry.get('body'), {'Accept': 'application/json'}
+        data = None
+        if body is not None:
+            if entry.get('content_type') == 'application/json':
+                data = json.dumps(body).encode()
+            elif entry.get('content_type') == 'application/x-www-form-urlencoded':
+                data = urlencode(body, doseq=True).encode()
+            else:
+                return None  # body not captured (multipart, too large)
+            headers['Content-Type'] = entry['content_type']
+        return urllib.request.Request(url, data=data, headers=headers, method=entry['method'])
+
+    def send(self, entry, request):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            status = error.code
+        except OSError:
+            status = 0
+        return entry.get('route') or entry['path'], status, entry['status'], (time.perf_counter() - started) * 1000
+
+    def replay(self, entries):
+        """Requests sent at their captured offsets / speed; lag = how late the latest one started"""
+        speed = self.options['speed']
+        first = entries[0]['t']
+        samples, lags, lock = [], [0.0], threading.Lock()
+        skipped = 0
+
+        def run(entry, request, due):
+            lag = time.perf_counter() - started - due  # includes waiting for a free worker
+            sample = self.send(entry, request)
+            with lock:
+                samples.append(sample)
+                if speed:
+                    lags.append(lag)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as pool:
+            for entry in entries:
+                request = self.build_request(entry)
+                if request is None:
+                    skipped += 1
+                    continue
+                due = (entry['t'] - first) / speed if speed else 0.0
+                wait = due - (time.perf_counter() - started)
+                if wait > 0:
+                    time.sleep(wait)
+                pool.submit(run, entry, request, due)
+        if skipped:
+            self.stdout.write(f"⏭️ {skipped} requêtes ignorées (corps non capturé)")
+        return samples, time.perf_counter() - started, max(lags)
+
+    # ===== RESULTS =====
+
+    def summarize(self, samples, elapsed, max_lag):
+        routes = {}
+        for route, status, recorded_status, ms in samples:
+            routes.setdefault(route, []).append((status, recorded_status, ms))
+
+        def stats(rows):
+            timings = sorted(ms for _, _, ms in rows)
+            return {
+                'count': len(rows),
+                'errors': sum(1 for status, _, _ in rows if status == 0 or status >= 500),
+                'status_mismatch': sum(1 for status, recorded, _ in rows if status != recorded),
+                'p50_ms': round(statistics.median(timings), 2),
+                'p90_ms': round(percentile(timings, 0.90), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'p99_ms': round(percentile(timings, 0.99), 2),
+                'max_ms': round(timings[-1], 2),
+                'samples': [round(ms, 2) for ms in timings],
+            }
+
+        return {
+            'label': self.options['label'] or timezone.localtime().strftime('%Y-%m-%d %H:%M'),
+            'url': self.options['url'],
+            'speed': self.options['speed'],
+            'replayed_at': timezone.now().isoformat(),
+            'requests': len(samples),
+            'elapsed_s': round(elapsed, 2),
+            'max_lag_ms': round(max_lag * 1000, 1),
+            'routes': {route: stats(rows) for route, rows in sorted(routes.items())},
+        }
+
+    def print_result(self, result):
+        self.stdout.write(
+            f"\n{'route':34} {'req':>6} {'err':>5} {'≠st':>5} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)"
+        )
+        for route, row in result['routes'].items():
+            self.stdout.write(
+                f"{route[:34]:34} {row['count']:6} {row['errors']:5} {row['status_mismatch']:5} "
+                f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f}"
+            )
+        self.stdout.write(
+            f"\n📊 {result['requests']} requêtes en {result['elapsed_s']}s - "
+            f"retard max. {result['max_lag_ms']} ms (>0: l'instance ne suit pas le rythme)"
+        )
+
+    def compare(self, before_path, after_path):
+        try:
+            before, after = (json.loads(Path(path).read_text()) for path in (before_path, after_path))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Résultat illisible: {e}")
+
+        tolerance = self.options['tolerance']
+        regressions = []
+        self.stdout.write(f"{before['label']} → {after['label']}\n")
+        self.stdout.write(f"{'route':34} {'p50':>17} {'p95':>17} {'p99':>17} {'KS D':>6}")
+        for route in sorted(set(before['routes']) & set(after['routes'])):
+            old, new = before['routes'][route], after['routes'][route]
+            gap = ks_statistic(old['samples'], new['samples'])
+            columns = ' '.join(f"{old[key]:7.1f}→{new[key]:7.1f}ms" for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            regressed = old['p95_ms'] and new['p95_ms'] > old['p95_ms'] * (1 + tolerance)
+            if regressed:
+                regressions.append(route)
+            self.stdout.write(f"{route[:34]:34} {columns} {gap:6.2f}{'  ⚠️' if regressed else ''}")
+
+        only = set(before['routes']) ^ set(after['routes'])
+        if only:
+            self.stdout.write(f"\nRoutes présentes dans un seul résultat: {', '.join(sorted(only))}")
+        if regressions and self.options['fail_on_regression']:
+            raise CommandError(f"p95 en hausse de plus de {tolerance:.0%}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS(f"\n{len(regressions)} route(s) en régression (p95 > +{tolerance:.0%})"))
@@ -0,0 +1,257 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+import logging
+import random
+import time
+
+from .utils.metrics import inc, observe, registry
+from .utils.profiling import (
+    DEFAULT_SAMPLE_INTERVAL_MS, CProfiler, ProfilerBusy, StackSampler, get_profiling_setting, save_profile,
+)
+from .utils.request_metrics import (
+    DEFAULT_REPEATED_QUERY_THRESHOLD, DEFAULT_SLOW_REQUEST_MS,
+    collect_metrics, get_metrics_setting, query_budget,
+)
+from .utils.traffic import get_capture_setting, read_body, should_capture, trace_entry, write_trace
+
+logger = logging.getLogger('reservations.metrics')
+
+
+async def request_user(request):
+    """request.user for async code (AuthenticationMiddleware's auser, no sync query on the event loop)"""
+    auser = getattr(request, 'auser', None)
+    return await auser() if auser else None
+
+
+class AsyncCapableMiddleware:
+    """
+    Base of the middlewares below: served natively in both modes - WSGI calls
+    handle(), ASGI awaits ahandle(). Without it Django runs each sync middleware
+    in a thread under ASGI and async views lose their event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Per-request SQL query count, DB time, signal-handler time and email time.
+
+    Sent back as a Server-Timing header (staff users, or everyone when
+    REQUEST_METRICS['SERVER_TIMING'] is on) and logged as one JSON line.
+    Requests over their query budget, with one statement repeated many times
+    (N+1) or slower than SLOW_REQUEST_MS are logged as warnings.
+    Streaming responses are measured up to the first byte. Queries are counted
+    by the connections' execute wrapper (utils/request_metrics.py), including
+    the ones async views run through sync_to_async().
+    """
+
+    def handle(self, request):
+        if not get_metrics_setting('ENABLED', True):
+            return self.get_response(request)
+
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, getattr(request, 'user', None))
+
+    async def ahandle(self, request):
+        if not get_metrics_setting('ENABLED', True):
+            return await self.get_response(request)
+
+        with collect_metrics() as metrics:
+            response = await self.get_response(request)
+        user = None if get_metrics_setting('SERVER_TIMING', False) else await request_user(request)
+        return self.finish(request, response, metrics, user)
+
+    def finish(self, request, response, metrics, user):
+        self.record(request, response, metrics)
+        summary = self.summarize(request, response, metrics)
+        if self.show_server_timing(user):
+            response['Server-Timing'] = self.server_timing(metrics)
+
+        # Fields go to the JSON formatter as extra attributes (see utils/logging_utils.py)
+        level = logging.WARNING if summary['flags'] else logging.INFO
+        logger.log(level, f"{request.method} {request.path}", extra=summary)
+        return response
+
+    def record(self, request, response, metrics):
+        """Prometheus counters/histograms by view name (see utils/metrics.py)"""
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        inc('reservations_http_requests_total', view=view, method=request.method, status=response.status_code)
+        observe('reservations_http_request_duration_seconds', metrics.elapsed, view=view)
+        registry.flush()
+
+    def summarize(self, request, response, metrics):
+        elapsed_ms = metrics.elapsed * 1000
+        budget = query_budget(request.path)
+        repeated_sql, repeated = metrics.most_repeated()
+
+        flags = []
+        if metrics.queries > budget:
+            flags.append(f"queries>{budget}")
+        n_plus_one = repeated >= get_metrics_setting('REPEATED_QUERY_THRESHOLD', DEFAULT_REPEATED_QUERY_THRESHOLD)
+        if n_plus_one:
+            flags.append(f"repeated_query x{repeated}")
+        if elapsed_ms > get_metrics_setting('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+            flags.append("slow")
+
+        summary = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed_ms, 1),
+            'queries': metrics.queries,
+            'query_budget': budget,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'signals_ms': round(metrics.sections['signals'] * 1000, 1),
+            'email_ms': round(metrics.sections['email'] * 1000, 1),
+            'flags': flags,
+        }
+        if n_plus_one:
+            summary['repeated_sql'] = repeated_sql[:300]
+        return summary
+
+    def show_server_timing(self, user):
+        if get_metrics_setting('SERVER_TIMING', False):
+            return True
+        return bool(user and user.is_authenticated and user.is_staff)
+
+    def server_timing(self, metrics):
+        return ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f"signals;dur={metrics.sections['signals'] * 1000:.1f}",
+            f"email;dur={metrics.sections['email'] * 1000:.1f}",
+            f"total;dur={metrics.elapsed * 1000:.1f}",
+        ])
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    Opt-in profiling of a request, stored in a bounded ring buffer (see
+    utils/profiling.py, listed at /api/profiles/).
+
+    - staff users: ?profile=1 (stack sampler, collapsed stacks for a flamegraph)
+      or ?profile=cprofile (deterministic cProfile, pstats file);
+    - anyone: PROFILING['SAMPLE_RATE'] of the requests under PROFILING['PATHS']
+      are sampled (stack sampler only).
+    Goes after AuthenticationMiddleware (needs request.user). Under ASGI both
+    profilers follow the event loop thread: concurrent requests show up too.
+    """
+
+    def handle(self, request):
+        user = getattr(request, 'user', None)
+        profiler = self.choose_profiler(request, user)
+        if profiler is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            profiler = self.start_profiler(profiler)
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        return self.store(request, response, profiler, started, user)
+
+    async def ahandle(self, request):
+        user = await request_user(request) if request.GET.get('profile') else None
+        profiler = self.choose_profiler(request, user)
+        if profiler is None:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            profiler = self.start_profiler(profiler)
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        if user is None:
+            user = await request_user(request)
+        return self.store(request, response, profiler, started, user)
+
+    def start_profiler(self, profiler):
+        """Start the profiler - cProfile already busy (concurrent request) falls back to the sampler"""
+        try:
+            profiler.start()
+        except ProfilerBusy as e:
+            logger.info(f"cProfile busy ({e}): stack sampler used instead")
+            profiler = self.sampler()
+            profiler.start()
+        return profiler
+
+    def store(self, request, response, profiler, started, user):
+        duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            name = save_profile(profiler, request, duration_ms)
+            if user and user.is_staff:
+                response['X-Profile'] = name
+        except OSError as e:
+            logger.error(f"Profile save error: {e}")
+        return response
+
+    def choose_profiler(self, request, user):
+        mode = request.GET.get('profile')
+        if mode and user and user.is_authenticated and user.is_staff:
+            if mode == 'cprofile':
+                return CProfiler()
+            return self.sampler()
+
+        rate = get_profiling_setting('SAMPLE_RATE', 0)
+        if rate and random.random() < rate and request.path.startswith(tuple(get_profiling_setting('PATHS', ['/']))):
+            return self.sampler()
+        return None
+
+    def sampler(self):
+        return StackSampler(get_profiling_setting('SAMPLE_INTERVAL_MS', DEFAULT_SAMPLE_INTERVAL_MS) / 1000)
+
+
+class TrafficCaptureMiddleware(AsyncCapableMiddleware):
+    """
+    Opt-in recording of the public API / tracking traffic (TRAFFIC_CAPTURE),
+    one anonymized JSON line per request in a rotating file - replayed by
+    `manage.py replay_traffic`. Names, emails, phones and free text are
+    replaced by keyed pseudonyms of the same shape; dates, times and party
+    sizes are kept so availability behaves the same on replay.
+    Goes after AuthenticationMiddleware (staff sessions are not recorded).
+    """
+
+    def handle(self, request):
+        if not self.sampled() or not should_capture(request, getattr(request, 'user', None)):
+            return self.get_response(request)
+
+        body = read_body(request)
+        started_at, started = time.time(), time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, body, response, started_at, started)
+
+    async def ahandle(self, request):
+        if not self.sampled() or not should_capture(request, await request_user(request)):
+            return await self.get_response(request)
+
+        body = read_body(request)
+        started_at, started = time.time(), time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, body, response, started_at, started)
+
+    def sampled(self):
+        if not get_capture_setting('ENABLED', False):
+            return False
+        rate = get_capture_setting('SAMPLE_RATE', 1.0)
+        return rate >= 1 or random.random() < rate
+
+    def record(self, request, body, response, started_at, started):
+        try:
+            write_trace(trace_entry(request, body, response, started_at, time.perf_counter() - started))
+        except Exception as e:
+            logger.error(f"Traffic capture error: {e}")
+        return response
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:19
+
+from django.db import migrations, models
+
+
+# pg_trgm GIN indexes on the expressions Django uses for icontains: UPPER("col"::text) LIKE UPPER(...)
+TRIGRAM_INDEXES = [
+    ('reservations_reservation', 'customer_name', 'reservation_name_trgm'),
+    ('reservations_reservation', 'customer_email', 'reservation_email_trgm'),
+    ('reservations_notification', 'title', 'notification_title_trgm'),
+    ('reservations_notification', 'message', 'notification_message_trgm'),
+]
+
+
+def backfill_phone_search_keys(apps, schema_editor):
+    """Fill the normalized/reversed phone digits of the existing reservations (chunked)"""
+    from reservations.utils.phone import normalize_phone, reversed_phone_digits
+
+    Reservation = apps.get_model('reservations', 'Reservation')
+    last_pk = 0
+    while True:
+        batch = list(Reservation.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'customer_phone')[:1000])
+        if not batch:
+            break
+        for reservation in batch:
+            reservation.customer_phone_digits = normalize_phone(reservation.customer_phone)
+            reservation.customer_phone_reversed = reversed_phone_digits(reservation.customer_phone)
+        Reservation.objects.bulk_update(batch, ['customer_phone_digits', 'customer_phone_reversed'])
+        last_pk = batch[-1].pk
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """PostgreSQL only - other databases keep plain LIKE (SQLite for local tests)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0013_notificationreceipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='customer_phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='customer_phone_reversed',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_phone_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
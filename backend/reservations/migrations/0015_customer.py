@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0014_reservation_phone_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_key', models.CharField(blank=True, max_length=20, null=True, unique=True, verbose_name='Téléphone normalisé')),
+                ('phone', models.CharField(blank=True, max_length=20, verbose_name='Téléphone')),
+                ('email', models.EmailField(blank=True, db_index=True, max_length=254, null=True, verbose_name='Email')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('total_reservations', models.PositiveIntegerField(default=0, verbose_name='Réservations')),
+                ('cancelled_reservations', models.PositiveIntegerField(default=0, verbose_name='Annulations')),
+                ('completed_reservations', models.PositiveIntegerField(default=0, verbose_name='Visites')),
+                ('last_reservation_date', models.DateField(blank=True, null=True, verbose_name='Dernière réservation')),
+                ('last_visit', models.DateField(blank=True, null=True, verbose_name='Dernière visite')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Client depuis')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+            ],
+            options={
+                'verbose_name': 'Client',
+                'verbose_name_plural': 'Clients',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservations.customer', verbose_name='Client'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0015_customer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='duration',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(15), django.core.validators.MaxValueValidator(480)], verbose_name='Durée (min)'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:35
+
+from django.db import migrations, models
+
+
+def seed_max_covers(apps, schema_editor):
+    """Existing slots start with the restaurant capacity as their covers limit"""
+    RestaurantInfo = apps.get_model('reservations', 'RestaurantInfo')
+    TimeSlot = apps.get_model('reservations', 'TimeSlot')
+    restaurant = RestaurantInfo.objects.filter(pk=1).first()
+    if restaurant and restaurant.capacity > 0:
+        TimeSlot.objects.update(max_covers=restaurant.capacity)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0016_reservation_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslot',
+            name='max_covers',
+            field=models.PositiveIntegerField(default=50, verbose_name='Couverts max'),
+        ),
+        migrations.AlterField(
+            model_name='timeslot',
+            name='max_reservations',
+            field=models.IntegerField(blank=True, default=10, help_text='Optionnel - vide = pas de limite sur le nombre de réservations', null=True, verbose_name='Nombre max de réservations'),
+        ),
+        migrations.RunPython(seed_max_covers, migrations.RunPython.noop),
+    ]
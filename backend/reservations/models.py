@@ -2,10 +2,120 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count, Sum, Min, F, Case, When, Exists, OuterRef, Value, ExpressionWrapper
+from django.db.models.functions import Coalesce, Greatest
 from datetime import datetime, timedelta, date
 from collections import defaultdict
 import uuid
+from .utils.content_versions import bump_version
+from .utils.occupancy import ACTIVE_STATUSES, default_duration, get_day_occupancy
+from .utils.customers import chunks, get_customer_setting
+from .utils.phone import normalize_phone, reversed_phone_digits
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationManager(models.Manager):
+    """Manager pour les notifications - projection partagée pour les API"""
+    
+    # Columns read by the notification APIs, straight from the notification row
+    FEED_FIELDS = (
+        'id', 'title', 'message', 'message_type', 'priority', 'is_read',
+        'created_at', 'read_at', 'email_sent', 'email_sent_at',
+        'email_opened_by_client', 'email_opened_at', 'tracking_token',
+        'related_reservation_id',
+    )
+    
+    # Reservation columns joined in the same query (name -> lookup)
+    RESERVATION_COLUMNS = {
+        'customer_name': 'related_reservation__customer_name',
+        'customer_phone': 'related_reservation__customer_phone',
+        'customer_email': 'related_reservation__customer_email',
+        'reservation_date': 'related_reservation__date',
+        'reservation_time': 'related_reservation__time',
+        'reservation_guests': 'related_reservation__number_of_guests',
+    }
+    
+    def read_condition(self, user):
+        """Read by this user: created before their "mark all" watermark, or a read receipt (EXISTS)"""
+        return Q(Exists(NotificationReadMark.objects.filter(user=user, read_all_before__gt=OuterRef('created_at')))) | Q(
+            Exists(NotificationReceipt.objects.filter(user=user, notification=OuterRef('pk')))
+        )
+    
+    def read_before(self, cutoff):
+        """
+        Read by someone before cutoff: shared flag, a receipt, or a "mark all" watermark.
+        A watermark does not say when the notification was read, only that it was:
+        those count once the notification itself is older than cutoff.
+        """
+        return self.get_queryset().filter(
+            Q(is_read=True, read_at__lt=cutoff)
+            | Q(Exists(NotificationReceipt.objects.filter(notification=OuterRef('pk'), read_at__lt=cutoff)))
+            | Q(Exists(NotificationReadMark.objects.filter(read_all_before__gt=OuterRef('created_at'))), created_at__lt=cutoff)
+        )
+    
+    def read_by(self, user):
+        """read_condition() as a boolean column for annotate()"""
+        return ExpressionWrapper(self.read_condition(user), output_field=models.BooleanField())
+    
+    def unread_for(self, user):
+        """Notifications not handled yet and not read by this user (anti-join on watermark + receipts)"""
+        return self.get_queryset().filter(is_read=False).exclude(self.read_condition(user))
+    
+    def mark_unread(self, queryset, user):
+        """
+        Unread again for this user: receipts dropped and the watermark moved back before
+        the oldest selected notification. The other notifications the watermark covered
+        in between keep a receipt (admin action on a few rows, not a hot path).
+        """
+        oldest = queryset.aggregate(oldest=Min('created_at'))['oldest']
+        mark = NotificationReadMark.objects.filter(user=user, read_all_before__gt=oldest).first() if oldest else None
+        if mark is not None:
+            still_read = self.get_queryset().filter(
+                created_at__gte=oldest, created_at__lt=mark.read_all_before
+            ).exclude(pk__in=queryset.values('pk')).values_list('pk', flat=True)
+            NotificationReceipt.objects.bulk_create(
+                [NotificationReceipt(user=user, notification_id=pk) for pk in still_read], ignore_conflicts=True
+            )
+            mark.read_all_before = oldest
+            mark.save(update_fields=['read_all_before'])
+        NotificationReceipt.objects.filter(user=user, notification__in=queryset).delete()
+    
+    def feed(self, user=None):
+        """Notifications as dicts with the reservation columns joined in (one query, no N+1)"""
+        annotations = {name: F(lookup) for name, lookup in self.RESERVATION_COLUMNS.items()}
+        if user is not None:
+            annotations['read_by_user'] = self.read_by(user)
+        return self.get_queryset().annotate(**annotations).values(
+            *self.FEED_FIELDS, *annotations.keys()
+        )
+    
+    def page(self, cursor=None, limit=50, user=None):
+        """Keyset page of the feed, newest first - returns (rows, next_cursor)"""
+        queryset = self.feed(user=user).order_by('-id')
+        if cursor:
+            queryset = queryset.filter(id__lt=cursor)
+        
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]['id']
+        return rows, next_cursor
+    
+    def counts(self, user=None):
+        """Unread and urgent-unread counts in a single aggregate query (per user if given)"""
+        queryset = self.get_queryset()
+        unread = Q(is_read=False)
+        if user is not None:
+            queryset = queryset.annotate(read_by_user=self.read_by(user))
+            unread &= Q(read_by_user=False)
+        return queryset.aggregate(
+            unread=Count('id', filter=unread),
+            urgent=Count('id', filter=unread & Q(priority='urgent')),
+        )
 
 
 class Notification(models.Model):
@@ -72,6 +182,8 @@ class Notification(models.Model):
     # Admin user (usually superuser)
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Utilisateur")
     
+    objects = NotificationManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Notification"
@@ -117,13 +229,23 @@ class Notification(models.Model):
         else:
             return f"📤 Email envoyé {self.time_since_sent}"
     
-    def mark_as_read(self):
-        """Mark message as read by admin"""
+    def mark_as_read(self, user=None):
+        """Mark message as read - for one user (receipt) or for everyone (handled)"""
+        if user is not None:
+            NotificationReceipt.objects.get_or_create(user=user, notification=self)
+            return
+        
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
     
+    def is_read_by(self, user):
+        """Check if the message is handled or already read by this user"""
+        return self.is_read or Notification.objects.filter(pk=self.pk).filter(
+            Notification.objects.read_condition(user)
+        ).exists()
+    
     # ✅ EMAIL TRACKING METHODS
     def mark_email_as_opened(self, request=None):
         """Mark email as opened by client"""
@@ -143,7 +265,7 @@ class Notification(models.Model):
                 'client_user_agent'
             ])
             
-            print(f"📧 Email opened by client for: {self.title}")
+            logger.debug(f"📧 Email opened by client for: {self.title}")
     
     def mark_email_as_sent(self):
         """Mark email as successfully sent"""
@@ -165,20 +287,28 @@ class Notification(models.Model):
     @property
     def email_status_display(self):
         """Display email status for admin"""
-        if not self.email_sent:
-            return "❌ Non envoyé"
-        elif self.email_opened_by_client:
-            return f"👁️ Ouvert {self.time_since_opened}"
-        else:
-            return f"📤 Envoyé {self.time_since_sent}"
+        return self.format_email_status(
+            self.email_sent, self.email_opened_by_client, self.email_sent_at, self.email_opened_at
+        )
     
     @property
     def time_since_opened(self):
         """Time since email was opened"""
-        if not self.email_opened_at:
+        return self.format_time_since(self.email_opened_at)
+    
+    @property
+    def time_since_sent(self):
+        """Time since email was sent"""
+        return self.format_time_since(self.email_sent_at)
+    
+    # ✅ FORMATTERS - shared by instance properties and feed rows (values dicts)
+    @staticmethod
+    def format_time_since(moment):
+        """Short 'il y a ...' label for a past datetime"""
+        if not moment:
             return ""
         
-        diff = timezone.now() - self.email_opened_at
+        diff = timezone.now() - moment
         if diff.days > 0:
             return f"il y a {diff.days}j"
         elif diff.seconds > 3600:
@@ -186,19 +316,36 @@ class Notification(models.Model):
         else:
             return f"il y a {diff.seconds // 60}min"
     
-    @property
-    def time_since_sent(self):
-        """Time since email was sent"""
-        if not self.email_sent_at:
-            return ""
+    @classmethod
+    def format_email_status(cls, email_sent, opened, sent_at, opened_at):
+        """Email status label from raw tracking columns"""
+        if not email_sent:
+            return "❌ Non envoyé"
+        elif opened:
+            return f"👁️ Ouvert {cls.format_time_since(opened_at)}"
+        else:
+            return f"📤 Envoyé {cls.format_time_since(sent_at)}"
+    
+    @staticmethod
+    def format_time_ago(created_at):
+        """Human readable time since creation - USING DJANGO TIMEZONE ONLY"""
+        # This respects the TIME_ZONE setting in settings.py (Africa/Casablanca)
+        now = timezone.localtime(timezone.now())
+        created_local = timezone.localtime(created_at)
+        
+        # Calculate difference
+        diff = now - created_local
         
-        diff = timezone.now() - self.email_sent_at
         if diff.days > 0:
-            return f"il y a {diff.days}j"
+            return f"Il y a {diff.days} jour{'s' if diff.days > 1 else ''}"
         elif diff.seconds > 3600:
-            return f"il y a {diff.seconds // 3600}h"
+            hours = diff.seconds // 3600
+            return f"Il y a {hours}h"
+        elif diff.seconds > 60:
+            minutes = diff.seconds // 60
+            return f"Il y a {minutes}min"
         else:
-            return f"il y a {diff.seconds // 60}min"
+            return "À l'instant"
     
     # ✅ ENHANCED: Add email tracking summary property for admin display
     @property
@@ -301,26 +448,7 @@ class Notification(models.Model):
     @property
     def time_ago(self):
         """Human readable time since creation - USING DJANGO TIMEZONE ONLY"""
-        from django.utils import timezone
-        
-        # Use Django's timezone-aware datetime
-        # This respects the TIME_ZONE setting in settings.py (Africa/Casablanca)
-        now = timezone.localtime(timezone.now())
-        created_local = timezone.localtime(self.created_at)
-        
-        # Calculate difference
-        diff = now - created_local
-        
-        if diff.days > 0:
-            return f"Il y a {diff.days} jour{'s' if diff.days > 1 else ''}"
-        elif diff.seconds > 3600:
-            hours = diff.seconds // 3600
-            return f"Il y a {hours}h"
-        elif diff.seconds > 60:
-            minutes = diff.seconds // 60
-            return f"Il y a {minutes}min"
-        else:
-            return "À l'instant"
+        return self.format_time_ago(self.created_at)
     
     # ✅ CLASS METHODS
     @classmethod
@@ -340,28 +468,47 @@ class Notification(models.Model):
         )
     
     @classmethod
-    def mark_all_as_read(cls):
-        """Mark all unread messages as read"""
+    def mark_all_as_read(cls, user=None):
+        """Mark all unread messages as read - for one user (watermark) or for everyone"""
+        if user is not None:
+            # One row per user whatever the number of notifications (upsert, no receipts)
+            count = cls.objects.unread_for(user).count()
+            NotificationReadMark.objects.bulk_create(
+                [NotificationReadMark(user=user, read_all_before=timezone.now())],
+                update_conflicts=True, unique_fields=['user'], update_fields=['read_all_before'],
+            )
+            return count
+        
         return cls.objects.filter(is_read=False).update(
             is_read=True,
             read_at=timezone.now()
         )
     
     @classmethod
-    def get_unread_count(cls):
+    def get_unread_count(cls, user=None):
         """Get count of unread messages"""
+        if user is not None:
+            return cls.objects.unread_for(user).count()
         return cls.objects.filter(is_read=False).count()
     
     @classmethod
-    def get_urgent_count(cls):
+    def get_urgent_count(cls, user=None):
         """Get count of urgent unread messages"""
+        if user is not None:
+            return cls.objects.unread_for(user).filter(priority='urgent').count()
         return cls.objects.filter(is_read=False, priority='urgent').count()
     
+    @classmethod
+    def get_counts(cls, user=None):
+        """Get unread and urgent counts together (one query)"""
+        return cls.objects.counts(user=user)
+    
     @classmethod
     def cleanup_old_messages(cls, days=30):
-        """Clean up old read messages"""
+        """Clean up old read messages (chunked deletes) - returns the number deleted"""
+        from .utils.retention import delete_in_chunks
         cutoff_date = timezone.now() - timedelta(days=days)
-        return cls.objects.filter(is_read=True, read_at__lt=cutoff_date).delete()
+        return delete_in_chunks(cls.objects.read_before(cutoff_date))['deleted']
     
     # ✅ EMAIL TRACKING CLASS METHODS
     @classmethod
@@ -369,13 +516,16 @@ class Notification(models.Model):
         """Get email tracking statistics"""
         cutoff_date = timezone.now() - timedelta(days=days)
         
-        notifications = cls.objects.filter(
+        totals = cls.objects.filter(
             created_at__gte=cutoff_date,
             email_sent=True
+        ).aggregate(
+            sent=Count('id'),
+            opened=Count('id', filter=Q(email_opened_by_client=True)),
         )
         
-        total_sent = notifications.count()
-        total_opened = notifications.filter(email_opened_by_client=True).count()
+        total_sent = totals['sent']
+        total_opened = totals['opened']
         open_rate = (total_opened / total_sent * 100) if total_sent > 0 else 0
         
         return {
@@ -386,6 +536,58 @@ class Notification(models.Model):
         }
 
 
+class NotificationReceipt(models.Model):
+    """Accusé de lecture par utilisateur - une ligne seulement quand l'utilisateur a lu"""
+    
+    # Notifications are shared by every staff inbox (fan-out on read): instead of
+    # copying a notification per user, a receipt row records who has read it.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_receipts',
+        verbose_name="Utilisateur"
+    )
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='receipts',
+        verbose_name="Notification"
+    )
+    read_at = models.DateTimeField(default=timezone.now, verbose_name="Lu le")
+    
+    class Meta:
+        verbose_name = "Accusé de lecture"
+        verbose_name_plural = "Accusés de lecture"
+        constraints = [
+            # Also the index behind the unread anti-join (user_id, notification_id)
+            models.UniqueConstraint(fields=['user', 'notification'], name='unique_notification_receipt'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.notification_id}"
+
+
+class NotificationReadMark(models.Model):
+    """Tout marquer comme lu - une ligne par utilisateur"""
+    
+    # Notifications created before read_all_before are read by this user: "mark all
+    # as read" moves the watermark instead of writing a receipt per notification.
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_read_mark',
+        verbose_name="Utilisateur"
+    )
+    read_all_before = models.DateTimeField(verbose_name="Tout lu avant")
+    
+    class Meta:
+        verbose_name = "Lecture groupée"
+        verbose_name_plural = "Lectures groupées"
+    
+    def __str__(self):
+        return f"{self.user} - {self.read_all_before}"
+
+
 class RestaurantInfo(models.Model):
     """Informations du restaurant Resto Pêcheur (Singleton)"""
     name = models.CharField(max_length=100, default="Resto Pêcheur", editable=False)
@@ -452,21 +654,14 @@ class RestaurantInfo(models.Model):
     
     def get_occupancy_rate_today(self):
         """Calcule le taux d'occupation pour aujourd'hui - UPDATED WITH FRENCH STATUS SUPPORT"""
-        today = timezone.now().date()
-        total_guests_today = Reservation.objects.filter(
-            date=today,
-            status__in=['confirmed', 'pending', 'Confirmée', 'En attente']  # Support both English and French
-        ).aggregate(total=Sum('number_of_guests'))['total'] or 0
+        # Same precomputed numbers as the availability endpoints
+        total_guests_today = get_day_occupancy(timezone.localdate()).total_guests
         
         return round((total_guests_today / self.capacity) * 100, 1) if self.capacity > 0 else 0
     
     def get_available_tables_today(self):
         """Retourne le nombre de tables disponibles aujourd'hui - UPDATED WITH FRENCH STATUS SUPPORT"""
-        today = timezone.now().date()
-        reserved_tables = Reservation.objects.filter(
-            date=today,
-            status__in=['confirmed', 'pending', 'Confirmée', 'En attente']  # Support both English and French
-        ).count()
+        reserved_tables = get_day_occupancy(timezone.localdate()).total_reservations
         
         return max(0, self.number_of_tables - reserved_tables)
     
@@ -475,6 +670,176 @@ class RestaurantInfo(models.Model):
         verbose_name_plural = "Configuration Restaurant"
 
 
+class CustomerManager(models.Manager):
+    """Lookups by normalized phone first, email second"""
+    
+    def lookup(self, phone=None, email=None):
+        """Customer matching a phone (normalized) or else an email, or None"""
+        phone_key = normalize_phone(phone)
+        if phone_key:
+            customer = self.filter(phone_key=phone_key).first()
+            if customer:
+                return customer
+        if email and email.strip():
+            return self.filter(email=email.strip().lower()).order_by('pk').first()
+        return None
+    
+    def booking_refusal(self, phone=None, email=None):
+        """Reason to refuse an online booking from the client's history, or None (one indexed lookup)"""
+        max_cancellations = get_customer_setting('MAX_CANCELLATIONS', None)
+        if not max_cancellations:
+            return None
+        customer = self.lookup(phone, email)
+        if customer and customer.cancelled_reservations >= max_cancellations:
+            logger.info(f"🚫 Réservation en ligne refusée: {customer} ({customer.history_display})")
+            return "Merci de contacter directement le restaurant pour réserver"
+        return None
+    
+    def for_contact(self, name, phone=None, email=None):
+        """Get or create the customer of a reservation (contact details refreshed)"""
+        phone_key = normalize_phone(phone) or None
+        email = (email or '').strip().lower() or None
+        if not phone_key and not email:
+            return None
+        
+        customer = self.lookup(phone, email)
+        if customer is None:
+            if phone_key:
+                customer, _ = self.get_or_create(
+                    phone_key=phone_key,
+                    defaults={'name': name, 'phone': phone or '', 'email': email}
+                )
+            else:
+                customer = self.create(name=name, phone=phone or '', email=email)
+            return customer
+        
+        updates = {}
+        if name and customer.name != name:
+            updates['name'] = name
+        if email and customer.email != email:
+            updates['email'] = email
+        if phone_key and not customer.phone_key:
+            updates.update(phone_key=phone_key, phone=phone)
+        if updates:
+            self.filter(pk=customer.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(customer, field, value)
+        return customer
+
+
+class Customer(models.Model):
+    """Client identifié par son téléphone normalisé (email en clé secondaire)"""
+    
+    phone_key = models.CharField(max_length=20, unique=True, null=True, blank=True, verbose_name="Téléphone normalisé")
+    phone = models.CharField(max_length=20, blank=True, verbose_name="Téléphone")
+    email = models.EmailField(blank=True, null=True, db_index=True, verbose_name="Email")
+    name = models.CharField(max_length=100, verbose_name="Nom")
+    
+    # Historique maintenu à chaque réservation / changement de statut
+    total_reservations = models.PositiveIntegerField(default=0, verbose_name="Réservations")
+    cancelled_reservations = models.PositiveIntegerField(default=0, verbose_name="Annulations")
+    completed_reservations = models.PositiveIntegerField(default=0, verbose_name="Visites")
+    last_reservation_date = models.DateField(blank=True, null=True, verbose_name="Dernière réservation")
+    last_visit = models.DateField(blank=True, null=True, verbose_name="Dernière visite")
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Client depuis")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    
+    objects = CustomerManager()
+    
+    class Meta:
+        verbose_name = "Client"
+        verbose_name_plural = "Clients"
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.phone or self.email})"
+    
+    @property
+    def cancellation_rate(self):
+        if not self.total_reservations:
+            return 0
+        return round(self.cancelled_reservations / self.total_reservations * 100, 1)
+    
+    @property
+    def history_display(self):
+        """Short history for staff: '5 réservations, 1 annulation, dernière visite 12/05/2025'"""
+        parts = [f"{self.total_reservations} réservation{'s' if self.total_reservations > 1 else ''}"]
+        if self.cancelled_reservations:
+            parts.append(f"{self.cancelled_reservations} annulation{'s' if self.cancelled_reservations > 1 else ''}")
+        if self.last_visit:
+            parts.append(f"dernière visite {self.last_visit.strftime('%d/%m/%Y')}")
+        return ", ".join(parts)
+    
+    @staticmethod
+    def status_deltas(old_status, new_status):
+        """(cancelled, completed) counter changes when a reservation goes from old_status to new_status"""
+        cancelled = (new_status == 'Annulée') - (old_status == 'Annulée')
+        completed = (new_status == 'Terminée') - (old_status == 'Terminée')
+        return cancelled, completed
+    
+    @classmethod
+    def increment(cls, customer_id, total=0, cancelled=0, completed=0, last_date=None, last_visit=None):
+        """Atomic counter update (UPDATE ... SET x = x + n), dates only move forward"""
+        updates = {}
+        if total:
+            updates['total_reservations'] = Greatest(F('total_reservations') + total, Value(0))
+        if cancelled:
+            updates['cancelled_reservations'] = Greatest(F('cancelled_reservations') + cancelled, Value(0))
+        if completed:
+            updates['completed_reservations'] = Greatest(F('completed_reservations') + completed, Value(0))
+        if last_date:
+            updates['last_reservation_date'] = Greatest(Coalesce('last_reservation_date', Value(last_date)), Value(last_date))
+        if last_visit:
+            updates['last_visit'] = Greatest(Coalesce('last_visit', Value(last_visit)), Value(last_visit))
+        if updates:
+            cls.objects.filter(pk=customer_id).update(**updates)
+    
+    @classmethod
+    def increment_many(cls, deltas):
+        """increment() for many clients, one UPDATE per chunk (CASE on the pk) - deltas: id -> increment() kwargs"""
+        for chunk in chunks(deltas.items()):
+            updates = {}
+            for field, name in (('total_reservations', 'total'), ('cancelled_reservations', 'cancelled'),
+                                ('completed_reservations', 'completed')):
+                whens = [When(pk=customer_id, then=Value(delta[name])) for customer_id, delta in chunk if delta.get(name)]
+                if whens:
+                    updates[field] = Greatest(F(field) + Case(*whens, default=Value(0)), Value(0))
+            for field, name in (('last_reservation_date', 'last_date'), ('last_visit', 'last_visit')):
+                whens = [When(pk=customer_id, then=Value(delta[name])) for customer_id, delta in chunk if delta.get(name)]
+                if whens:
+                    latest = Case(*whens, default=F(field))
+                    updates[field] = Greatest(Coalesce(field, latest), latest)
+            if updates:
+                cls.objects.filter(pk__in=[customer_id for customer_id, _ in chunk]).update(**updates)
+    
+    @classmethod
+    def record_reservation(cls, reservation, old_status=None, created=False):
+        """Counters for a new reservation or a status change of an existing one"""
+        if not reservation.customer_id:
+            return
+        if not created and old_status == reservation.status:
+            return
+        
+        cancelled, completed = cls.status_deltas(old_status, reservation.status)
+        cls.increment(
+            reservation.customer_id,
+            total=1 if created else 0,
+            cancelled=cancelled,
+            completed=completed,
+            last_date=reservation.date if created else None,
+            last_visit=reservation.date if reservation.status == 'Terminée' else None,
+        )
+    
+    @classmethod
+    def forget_reservation(cls, customer_id, status):
+        """Counters of a client losing one of its reservations (moved to another client)"""
+        if not customer_id:
+            return
+        cancelled, completed = cls.status_deltas(status, None)
+        cls.increment(customer_id, total=-1, cancelled=cancelled, completed=completed)
+
+
 class ReservationManager(models.Manager):
     """Manager personnalisé pour les réservations - UPDATED WITH FRENCH STATUS SUPPORT"""
     
@@ -499,7 +864,7 @@ class ReservationManager(models.Manager):
     
     def active(self):
         """Réservations actives (pending + confirmed) - SUPPORT BOTH LANGUAGES"""
-        return self.filter(status__in=['pending', 'confirmed', 'En attente', 'Confirmée'])
+        return self.filter(status__in=ACTIVE_STATUSES)
     
     def get_weekly_stats(self):
         """Statistiques par jour de la semaine"""
@@ -511,7 +876,7 @@ class ReservationManager(models.Manager):
             day = start_week + timedelta(days=i)
             count = self.filter(
                 date=day,
-                status__in=['pending', 'confirmed', 'En attente', 'Confirmée']  # Support both
+                status__in=ACTIVE_STATUSES
             ).count()
             weekly_data.append(count)
         
@@ -522,7 +887,7 @@ class ReservationManager(models.Manager):
         today = timezone.now().date()
         reservations = self.filter(
             date=today,
-            status__in=['pending', 'confirmed', 'En attente', 'Confirmée']  # Support both
+            status__in=ACTIVE_STATUSES
         ).values('time').annotate(count=Count('id'))
         
         hourly_data = defaultdict(int)
@@ -543,7 +908,7 @@ class ReservationManager(models.Manager):
         today = timezone.now().date()
         peak_hour = self.filter(
             date=today,
-            status__in=['pending', 'confirmed', 'En attente', 'Confirmée']
+            status__in=ACTIVE_STATUSES
         ).values('time').annotate(
             total_guests=Sum('number_of_guests')  # Count guests, not reservations
         ).order_by('-total_guests').first()
@@ -567,6 +932,9 @@ class Reservation(models.Model):
     customer_name = models.CharField(max_length=100, verbose_name="Nom du client")
     customer_email = models.EmailField(blank=True, null=True, verbose_name="Email")
     customer_phone = models.CharField(max_length=20, verbose_name="Téléphone")
+    # Search keys derived from customer_phone (filled in save(), indexed)
+    customer_phone_digits = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
+    customer_phone_reversed = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
     
     # Détails de la réservation
     date = models.DateField(verbose_name="Date")
@@ -575,6 +943,13 @@ class Reservation(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(20)],
         verbose_name="Nombre de personnes"
     )
+    # Temps d'occupation de la table (vide = durée par défaut selon le nombre de personnes)
+    duration = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(15), MaxValueValidator(480)],
+        verbose_name="Durée (min)"
+    )
     
     # Statut et notes
     status = models.CharField(
@@ -589,6 +964,15 @@ class Reservation(models.Model):
         verbose_name="Demandes spéciales"
     )
     
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations',
+        verbose_name="Client"
+    )
+    
     # Champs additionnels pour le dashboard
     table_number = models.IntegerField(blank=True, null=True, verbose_name="Numéro de table")
     confirmed_at = models.DateTimeField(blank=True, null=True, verbose_name="Confirmé le")
@@ -616,13 +1000,20 @@ class Reservation(models.Model):
         
         # Auto-migration si nécessaire
         if self.status in status_migration:
-            print(f"🔄 Auto-migration: {self.status} → {status_migration[self.status]} for {self.customer_name}")
+            logger.debug(f"🔄 Auto-migration: {self.status} → {status_migration[self.status]} for {self.customer_name}")
             self.status = status_migration[self.status]
         
         # Gestion des timestamps de statut (code existant amélioré)
+        created = self._state.adding
+        old_status = None
+        old_phone = None
+        previous_customer_id = None
         if self.pk:
             try:
                 old_instance = Reservation.objects.get(pk=self.pk)
+                old_status = old_instance.status
+                old_phone = old_instance.customer_phone
+                previous_customer_id = old_instance.customer_id
                 if old_instance.status != self.status:
                     if self.status in ['confirmed', 'Confirmée'] and not self.confirmed_at:
                         self.confirmed_at = timezone.now()
@@ -631,7 +1022,32 @@ class Reservation(models.Model):
             except Reservation.DoesNotExist:
                 pass
         
+        self.set_phone_search_keys()
+        if not self.duration:
+            self.duration = default_duration(self.number_of_guests)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'customer_phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'customer_phone_digits', 'customer_phone_reversed'}
+        
+        # Client: linked on creation (or when the phone changes), counters updated after the save
+        relinked = False
+        if update_fields is None and (created or not self.customer_id or old_phone != self.customer_phone):
+            self.customer = Customer.objects.for_contact(self.customer_name, self.customer_phone, self.customer_email)
+            relinked = not created and self.customer_id != previous_customer_id
+        
         super().save(*args, **kwargs)
+        if relinked:
+            # A reservation moved to another client: taken off the old one, a new booking for the new one
+            Customer.forget_reservation(previous_customer_id, old_status)
+            Customer.record_reservation(self, created=True)
+        elif update_fields is None or 'status' in update_fields:
+            # Status not saved (update_fields without it): nothing changed in the database
+            Customer.record_reservation(self, old_status=old_status, created=created)
+    
+    def set_phone_search_keys(self):
+        """Normalized and reversed phone digits used by the admin search"""
+        self.customer_phone_digits = normalize_phone(self.customer_phone)
+        self.customer_phone_reversed = reversed_phone_digits(self.customer_phone)
     
     class Meta:
         verbose_name = "Réservation"
@@ -728,9 +1144,17 @@ class TimeSlotManager(models.Manager):
 class TimeSlot(models.Model):
     """Créneaux horaires disponibles"""
     time = models.TimeField(verbose_name="Heure")
+    # ✅ Capacité en couverts (somme des personnes qui arrivent sur ce créneau)
+    max_covers = models.PositiveIntegerField(
+        default=50,
+        verbose_name="Couverts max"
+    )
     max_reservations = models.IntegerField(
         default=10, 
-        verbose_name="Nombre max de réservations"
+        blank=True,
+        null=True,
+        verbose_name="Nombre max de réservations",
+        help_text="Optionnel - vide = pas de limite sur le nombre de réservations"
     )
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     
@@ -744,25 +1168,39 @@ class TimeSlot(models.Model):
         verbose_name_plural = "Créneaux horaires"
         ordering = ['time']
     
-    def available_slots(self, date):
-        """Retourne le nombre de créneaux disponibles pour une date donnée - UPDATED WITH FRENCH STATUS"""
-        reservations_count = Reservation.objects.filter(
+    def usage(self, date):
+        """(réservations, couverts) de ce créneau pour une date - un seul COUNT/SUM"""
+        totals = Reservation.objects.filter(
             date=date,
             time=self.time,
-            status__in=['pending', 'confirmed', 'En attente', 'Confirmée']  # Support both
-        ).count()
-        return max(0, self.max_reservations - reservations_count)
+            status__in=ACTIVE_STATUSES
+        ).aggregate(count=Count('id'), guests=Sum('number_of_guests'))
+        return totals['count'], totals['guests'] or 0
     
-    def is_available(self, date):
-        """Vérifie si ce créneau est disponible pour une date donnée"""
-        return self.available_slots(date) > 0
+    def remaining_covers(self, reservations_count, booked_guests):
+        """Couverts encore disponibles (0 si le plafond de réservations est atteint)"""
+        if self.max_reservations is not None and reservations_count >= self.max_reservations:
+            return 0
+        return max(0, self.max_covers - booked_guests)
+    
+    def accepts(self, reservations_count, booked_guests, guests=1):
+        """Une table de `guests` personnes peut encore être ajoutée"""
+        return self.remaining_covers(reservations_count, booked_guests) >= guests
+    
+    def available_slots(self, date):
+        """Retourne le nombre de places (couverts) disponibles pour une date donnée"""
+        return self.remaining_covers(*self.usage(date))
+    
+    def is_available(self, date, guests=1):
+        """Vérifie si ce créneau peut accueillir `guests` personnes à une date donnée"""
+        return self.accepts(*self.usage(date), guests=guests)
     
     def get_reservations_for_date(self, date):
         """Retourne les réservations pour ce créneau à une date donnée - UPDATED WITH FRENCH STATUS"""
         return Reservation.objects.filter(
             date=date,
             time=self.time,
-            status__in=['pending', 'confirmed', 'En attente', 'Confirmée']  # Support both
+            status__in=ACTIVE_STATUSES
         ).select_related()
 
 
@@ -863,6 +1301,7 @@ def migrate_all_reservations_to_french():
     for old_status, new_status in status_mapping.items():
         count = Reservation.objects.filter(status=old_status).update(status=new_status)
         if count > 0:
+            bump_version('reservations')
             print(f"✅ Migré {count} réservations: {old_status} → {new_status}")
             total_migrated += count
     
@@ -899,59 +1338,58 @@ def refresh_all_notification_tracking():
             if notification.refresh_email_status():
                 updated_count += 1
         
-        print(f"✅ Updated {updated_count} notifications with current tracking status")
+        logger.info(f"✅ Updated {updated_count} notifications with current tracking status")
         return updated_count
         
     except Exception as e:
-        print(f"❌ Error refreshing notification tracking: {e}")
+        logger.error(f"❌ Error refreshing notification tracking: {e}")
         return 0
 
 
 def get_email_tracking_summary():
     """Get comprehensive email tracking summary"""
     try:
-        # Get basic stats
-        total_notifications = Notification.objects.filter(email_sent=True).count()
-        opened_notifications = Notification.objects.filter(
-            email_sent=True, 
-            email_opened_by_client=True
-        ).count()
-        
-        # Calculate open rate
-        open_rate = (opened_notifications / total_notifications * 100) if total_notifications > 0 else 0
-        
-        # Get recent activity (last 7 days)
         seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_notifications = Notification.objects.filter(
-            email_sent=True,
-            email_sent_at__gte=seven_days_ago
+        
+        # Overall, recent (last 7 days) and unopened counts in one aggregate
+        sent = Q(email_sent=True)
+        recent = Q(email_sent=True, email_sent_at__gte=seven_days_ago)
+        totals = Notification.objects.aggregate(
+            total=Count('id', filter=sent),
+            opened=Count('id', filter=sent & Q(email_opened_by_client=True)),
+            recent_total=Count('id', filter=recent),
+            recent_opened=Count('id', filter=recent & Q(email_opened_by_client=True)),
+            recent_unopened=Count('id', filter=recent & Q(email_opened_by_client=False)),
         )
         
-        recent_opened = recent_notifications.filter(email_opened_by_client=True).count()
-        recent_total = recent_notifications.count()
-        recent_open_rate = (recent_opened / recent_total * 100) if recent_total > 0 else 0
+        # Calculate open rates
+        total_notifications = totals['total']
+        open_rate = (totals['opened'] / total_notifications * 100) if total_notifications > 0 else 0
+        recent_total = totals['recent_total']
+        recent_open_rate = (totals['recent_opened'] / recent_total * 100) if recent_total > 0 else 0
         
-        # Get customers who haven't opened emails
-        unread_notifications = Notification.objects.filter(
+        # Get customers who haven't opened emails (reservation columns joined in)
+        unread_notifications = Notification.objects.feed().filter(
             email_sent=True,
             email_opened_by_client=False,
             email_sent_at__gte=seven_days_ago
-        ).select_related('related_reservation')
+        ).order_by('-created_at')
         
+        now = timezone.now()
         summary = {
             'total_emails_sent': total_notifications,
-            'total_emails_opened': opened_notifications,
+            'total_emails_opened': totals['opened'],
             'overall_open_rate': round(open_rate, 1),
             'recent_emails_sent': recent_total,
-            'recent_emails_opened': recent_opened,
+            'recent_emails_opened': totals['recent_opened'],
             'recent_open_rate': round(recent_open_rate, 1),
-            'unread_emails_count': unread_notifications.count(),
+            'unread_emails_count': totals['recent_unopened'],
             'customers_need_followup': [
                 {
-                    'customer_name': n.customer_name,
-                    'customer_email': n.customer_email,
-                    'sent_at': n.email_sent_at.strftime('%d/%m/%Y %H:%M'),
-                    'days_ago': (timezone.now() - n.email_sent_at).days
+                    'customer_name': n['customer_name'] or "N/A",
+                    'customer_email': n['customer_email'] or "N/A",
+                    'sent_at': n['email_sent_at'].strftime('%d/%m/%Y %H:%M'),
+                    'days_ago': (now - n['email_sent_at']).days
                 }
                 for n in unread_notifications[:10]  # Limit to 10
             ]
@@ -960,52 +1398,25 @@ def get_email_tracking_summary():
         return summary
         
     except Exception as e:
-        print(f"❌ Error getting email tracking summary: {e}")
+        logger.error(f"❌ Error getting email tracking summary: {e}")
         return None
 
 
-def cleanup_old_email_tracking_data(days=90):
+def cleanup_old_email_tracking_data(days=None):
     """Clean up old email tracking data while preserving important statistics"""
+    from .utils.retention import run_retention
+    
     try:
-        cutoff_date = timezone.now() - timedelta(days=days)
-        
-        # Only clean up very old, read notifications with no recent email activity
-        old_notifications = Notification.objects.filter(
-            is_read=True,
-            read_at__lt=cutoff_date,
-            email_sent_at__lt=cutoff_date
-        ).exclude(
-            # Keep notifications that were recently opened
-            email_opened_at__gte=timezone.now() - timedelta(days=30)
-        )
-        
-        # Log some stats before deletion
-        tracking_stats = []
-        for notification in old_notifications[:20]:  # Sample first 20
-            if notification.email_sent:
-                tracking_stats.append({
-                    'customer': notification.customer_name,
-                    'sent': notification.email_sent_at.strftime('%d/%m/%Y') if notification.email_sent_at else 'N/A',
-                    'opened': notification.email_opened_by_client,
-                    'opened_at': notification.email_opened_at.strftime('%d/%m/%Y') if notification.email_opened_at else 'N/A'
-                })
-        
-        count = old_notifications.count()
+        # Chunked, PK-ordered deletes - days defaults to TRACKING_DATA_RETENTION_DAYS
+        count = run_retention('tracking', days=days)['deleted']
         
         if count > 0:
-            print(f"📊 Sample email tracking data before cleanup:")
-            for stat in tracking_stats[:5]:
-                status = "Opened" if stat['opened'] else "Not opened"
-                print(f"  - {stat['customer']}: Sent {stat['sent']}, {status}")
-            
-            # Delete old notifications
-            old_notifications.delete()
-            print(f"✅ Cleaned up {count} old email tracking records")
+            logger.info(f"✅ Cleaned up {count} old email tracking records")
         else:
-            print("ℹ️ No old email tracking data to clean up")
+            logger.info("ℹ️ No old email tracking data to clean up")
         
         return count
         
     except Exception as e:
-        print(f"❌ Error cleaning up email tracking data: {e}")
+        logger.error(f"❌ Error cleaning up email tracking data: {e}")
         return 0
\ No newline at end of file
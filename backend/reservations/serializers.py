@@ -33,11 +33,11 @@ class TimeSlotSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = TimeSlot
-        fields = ['id', 'time', 'max_reservations', 'is_active', 'available_slots']
+        fields = ['id', 'time', 'max_covers', 'max_reservations', 'is_active', 'available_slots']
     
     def get_available_slots(self, obj):
         """Retourne le nombre de créneaux disponibles pour une date donnée"""
-        # Par défaut, on retourne max_reservations
+        # Par défaut, on retourne max_covers (places)
         # Dans une vraie app, on calculerait selon la date demandée
         request = self.context.get('request')
         if request and 'date' in request.GET:
@@ -47,8 +47,8 @@ class TimeSlotSerializer(serializers.ModelSerializer):
                 date_obj = datetime.strptime(date, '%Y-%m-%d').date()
                 return obj.available_slots(date_obj)
             except (ValueError, TypeError):
-                return obj.max_reservations
-        return obj.max_reservations
+                return obj.max_covers
+        return obj.max_covers
 
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -121,34 +121,23 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
                 'date': "Impossible de réserver dans le passé."
             })
         
-        # Vérifier la disponibilité du créneau
-        try:
-            time_slot = TimeSlot.objects.get(time=data['time'], is_active=True)
-            if not time_slot.is_available(data['date']):
-                raise serializers.ValidationError({
-                    'time': "Ce créneau n'est plus disponible pour cette date."
-                })
-        except TimeSlot.DoesNotExist:
+        # Fermetures, jours fermés et horaires spéciaux: calendrier compilé (pas de requête)
+        from .utils.opening_calendar import get_opening_calendar
+        calendar = get_opening_calendar()
+        if not calendar.is_open(data['date']):
             raise serializers.ValidationError({
-                'time': "Créneau horaire non disponible."
+                'date': calendar.closure_reason(data['date'])
             })
         
-        # Vérifier que le restaurant n'est pas fermé ce jour-là
-        from .models import get_restaurant_info
-        restaurant = get_restaurant_info()
-        weekday = data['date'].weekday()  # 0=Monday, 6=Sunday
-        
-        if restaurant.is_closed_on_day(weekday):
-            days = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+        # Vérifier la disponibilité du créneau
+        time_slot = calendar.get_slot(data['date'], data['time'])
+        if time_slot is None:
             raise serializers.ValidationError({
-                'date': f"Le restaurant est fermé le {days[weekday]}."
+                'time': "Créneau horaire non disponible."
             })
-        
-        # Vérifier les dates spéciales
-        special_date = SpecialDate.objects.filter(date=data['date']).first()
-        if special_date and special_date.is_closed:
+        if not time_slot.is_available(data['date'], guests=data['number_of_guests']):
             raise serializers.ValidationError({
-                'date': f"Le restaurant est fermé ce jour: {special_date.reason or 'Fermeture exceptionnelle'}"
+                'time': "Ce créneau n'est plus disponible pour cette date."
             })
         
         return data
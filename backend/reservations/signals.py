@@ -4,20 +4,74 @@ from django.contrib.auth.models import User
 from django.db import transaction
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from .models import Reservation, Notification
+from .models import Reservation, Notification, RestaurantInfo, TimeSlot, SpecialDate
+from .utils.content_versions import bump_version
+from .utils.request_metrics import timed
+from .utils.opening_calendar import apply_change as apply_calendar_change
 from .utils.email_utils import (
     send_reservation_confirmation_email, 
     send_reservation_cancellation_email, 
     send_reservation_pending_email
 )
+from contextlib import contextmanager
 import logging
 import re
+import threading
 
 logger = logging.getLogger(__name__)
 
 # Global variable to store old status before save
 _reservation_old_status = {}
 
+# Per-thread switch used by maintenance jobs (archival, imports) to skip messages and emails
+_signal_state = threading.local()
+
+@contextmanager
+def reservation_signals_muted():
+    """Disable reservation messages/emails inside the block (current thread only)"""
+    previous = getattr(_signal_state, 'muted', False)
+    _signal_state.muted = True
+    try:
+        yield
+    finally:
+        _signal_state.muted = previous
+
+def reservation_signals_are_muted():
+    """Check if reservation signals are muted for the current thread"""
+    return getattr(_signal_state, 'muted', False)
+
+# ===== CONTENT VERSIONS (ETag / Last-Modified of the public read endpoints) =====
+
+# The opening calendar of this process is patched right after the bump (same commit)
+
+@receiver(post_save, sender=RestaurantInfo)
+@receiver(post_delete, sender=RestaurantInfo)
+@timed('signals')
+def bump_restaurant_version(sender, instance, **kwargs):
+    bump_version('restaurant')
+    apply_calendar_change('restaurant', 'update_restaurant', instance)
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+@timed('signals')
+def bump_timeslots_version(sender, instance, **kwargs):
+    bump_version('timeslots')
+    apply_calendar_change('timeslots', 'update_slot', instance, deleted=kwargs['signal'] is post_delete)
+
+@receiver(post_save, sender=SpecialDate)
+@receiver(post_delete, sender=SpecialDate)
+@timed('signals')
+def bump_special_dates_version(sender, instance, **kwargs):
+    bump_version('special_dates')
+    apply_calendar_change('special_dates', 'update_special_date', instance, deleted=kwargs['signal'] is post_delete)
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@timed('signals')
+def bump_reservations_version(sender, **kwargs):
+    # Not affected by reservation_signals_muted(): availability still changes
+    bump_version('reservations')
+
 def validate_email_address_properly(email):
     """Properly validate email address format"""
     try:
@@ -48,13 +102,17 @@ def validate_email_address_properly(email):
         return False, f"Email validation error: {str(e)}"
 
 @receiver(pre_save, sender=Reservation)
+@timed('signals')
 def capture_old_status(sender, instance, **kwargs):
     """Capture old status BEFORE save to detect changes"""
+    if reservation_signals_are_muted():
+        return
+    
     if instance.pk:  # Only for existing reservations
         try:
             old_instance = Reservation.objects.get(pk=instance.pk)
             _reservation_old_status[instance.pk] = old_instance.status
-            print(f"🔍 PRE_SAVE: Captured old status for {instance.customer_name}: {old_instance.status}")
+            logger.debug(f"🔍 PRE_SAVE: Captured old status for {instance.customer_name}: {old_instance.status}")
         except Reservation.DoesNotExist:
             _reservation_old_status[instance.pk] = None
 
@@ -74,14 +132,17 @@ def mark_related_notifications_as_read(reservation):
                 is_read=True,
                 read_at=timezone.now()
             )
-            print(f"✅ Marked {count} related notification(s) as read for {reservation.customer_name}")
+            logger.info(f"✅ Marked {count} related notification(s) as read for {reservation.customer_name}")
         
     except Exception as e:
         logger.error(f"Error marking related notifications as read: {e}")
 
 @receiver(post_save, sender=Reservation)
+@timed('signals')
 def create_simple_admin_message(sender, instance, created, **kwargs):
     """Create simple, clear messages for admin with email tracking - ENHANCED"""
+    if reservation_signals_are_muted():
+        return
     
     try:
         admin_user = User.objects.filter(is_superuser=True).first()
@@ -90,20 +151,21 @@ def create_simple_admin_message(sender, instance, created, **kwargs):
             return
         
         if created:
-            # ✅ NEW RESERVATION
-            print(f"🔍 POST_SAVE: New reservation created: {instance.customer_name}")
-            handle_new_reservation_message(instance, admin_user)
+            # ✅ NEW RESERVATION - message and email once committed: the booking form holds
+            # the day lock until then, the SMTP call (up to EMAIL_TIMEOUT) must not
+            logger.debug(f"🔍 POST_SAVE: New reservation created: {instance.customer_name}")
+            transaction.on_commit(lambda: handle_new_reservation_message(instance, admin_user))
         else:
             # ✅ RESERVATION UPDATE - Check for status change
             old_status = _reservation_old_status.get(instance.pk)
             current_status = instance.status
             
-            print(f"🔍 POST_SAVE: Checking status change for {instance.customer_name}")
-            print(f"🔍 OLD STATUS: {old_status}")
-            print(f"🔍 NEW STATUS: {current_status}")
+            logger.debug(f"🔍 POST_SAVE: Checking status change for {instance.customer_name}")
+            logger.debug(f"🔍 OLD STATUS: {old_status}")
+            logger.debug(f"🔍 NEW STATUS: {current_status}")
             
             if old_status and old_status != current_status:
-                print(f"✅ STATUS CHANGED: {old_status} → {current_status}")
+                logger.info(f"✅ STATUS CHANGED: {old_status} → {current_status}")
                 
                 # Mark all related notifications as read FIRST (user handled this reservation)
                 mark_related_notifications_as_read(instance)
@@ -111,7 +173,7 @@ def create_simple_admin_message(sender, instance, created, **kwargs):
                 # Then create new notification about the status change
                 handle_status_change_message(instance, old_status, current_status, admin_user)
             else:
-                print(f"ℹ️ No status change detected")
+                logger.debug(f"ℹ️ No status change detected")
             
             # Clean up the stored old status
             if instance.pk in _reservation_old_status:
@@ -119,14 +181,14 @@ def create_simple_admin_message(sender, instance, created, **kwargs):
             
     except Exception as e:
         logger.error(f"Error creating admin message: {e}")
-        print(f"❌ Erreur création message: {e}")
+        logger.error(f"❌ Erreur création message: {e}")
         import traceback
         traceback.print_exc()
 
 def handle_new_reservation_message(reservation, admin_user):
     """Create message for new reservation with PROPER email validation and failure tracking"""
     try:
-        print(f"📧 Processing new reservation for: {reservation.customer_name}")
+        logger.debug(f"📧 Processing new reservation for: {reservation.customer_name}")
         
         # ✅ CREATE NOTIFICATION FIRST to get tracking token
         notification = Notification.objects.create(
@@ -148,34 +210,34 @@ def handle_new_reservation_message(reservation, admin_user):
         priority = 'normal'
         error_reason = ""
         
-        print(f"📧 Customer email: '{reservation.customer_email}'")
+        logger.debug(f"📧 Customer email: '{reservation.customer_email}'")
         
         if reservation.customer_email and reservation.customer_email.strip():
             # ✅ PROPER EMAIL VALIDATION
             is_valid, validation_message = validate_email_address_properly(reservation.customer_email)
             
-            print(f"📧 Email validation result: {is_valid} - {validation_message}")
+            logger.debug(f"📧 Email validation result: {is_valid} - {validation_message}")
             
             if is_valid:
                 try:
-                    print(f"📧 Email validation passed, attempting to send to: {reservation.customer_email}")
+                    logger.debug(f"📧 Email validation passed, attempting to send to: {reservation.customer_email}")
                     
                     # ✅ TRY TO SEND EMAIL - This will now properly detect failures
                     email_sent = send_reservation_pending_email(reservation, notification)
                     
-                    print(f"📧 Email function returned: {email_sent}")
+                    logger.debug(f"📧 Email function returned: {email_sent}")
                     
                     # ✅ DOUBLE-CHECK: Reload notification to see actual email_sent status
                     notification.refresh_from_db()
                     actual_email_sent = notification.email_sent
                     
-                    print(f"📧 Notification email_sent field: {actual_email_sent}")
+                    logger.debug(f"📧 Notification email_sent field: {actual_email_sent}")
                     
                     if email_sent and actual_email_sent:
-                        print(f"✅ Email sent successfully to {reservation.customer_email}")
+                        logger.info(f"✅ Email sent successfully to {reservation.customer_email}")
                         priority = 'normal'
                     else:
-                        print(f"❌ Email failed to send to {reservation.customer_email}")
+                        logger.error(f"❌ Email failed to send to {reservation.customer_email}")
                         # ✅ ENSURE notification reflects failure
                         notification.email_sent = False
                         notification.email_opened_by_client = False
@@ -185,7 +247,7 @@ def handle_new_reservation_message(reservation, admin_user):
                         error_reason = "Échec d'envoi"
                         
                 except Exception as e:
-                    print(f"❌ Email exception for {reservation.customer_email}: {e}")
+                    logger.error(f"❌ Email exception for {reservation.customer_email}: {e}")
                     # ✅ EMAIL EXCEPTION - mark as failed
                     email_sent = False
                     notification.email_sent = False
@@ -195,7 +257,7 @@ def handle_new_reservation_message(reservation, admin_user):
                     error_reason = f"Erreur d'envoi: {str(e)}"
                     logger.error(f"Email error for {reservation.customer_name}: {e}")
             else:
-                print(f"❌ Email validation failed: {validation_message}")
+                logger.error(f"❌ Email validation failed: {validation_message}")
                 priority = 'urgent'
                 email_sent = False
                 error_reason = f"Email invalide: {validation_message}"
@@ -203,7 +265,7 @@ def handle_new_reservation_message(reservation, admin_user):
                 notification.email_sent = False
                 notification.save(update_fields=['email_sent'])
         else:
-            print(f"❌ No email address provided")
+            logger.error(f"❌ No email address provided")
             priority = 'urgent'
             email_sent = False
             error_reason = "Aucun email fourni"
@@ -212,7 +274,7 @@ def handle_new_reservation_message(reservation, admin_user):
         notification.refresh_from_db()
         final_email_status = notification.email_sent
         
-        print(f"📧 Final email status check: {final_email_status}")
+        logger.debug(f"📧 Final email status check: {final_email_status}")
         
         # ✅ UPDATE MESSAGE BASED ON ACTUAL RESULT
         if final_email_status and email_sent:
@@ -253,12 +315,12 @@ def handle_new_reservation_message(reservation, admin_user):
         notification.message_type = message_type
         notification.save(update_fields=['title', 'message', 'priority', 'message_type'])
         
-        print(f"✅ New reservation notification created: {notification.title}")
-        print(f"📊 Final tracking status: email_sent={notification.email_sent}")
+        logger.info(f"✅ New reservation notification created: {notification.title}")
+        logger.debug(f"📊 Final tracking status: email_sent={notification.email_sent}")
         
     except Exception as e:
         logger.error(f"Error creating new reservation message: {e}")
-        print(f"❌ Erreur message nouvelle réservation: {e}")
+        logger.error(f"❌ Erreur message nouvelle réservation: {e}")
 
 def handle_status_change_message(reservation, old_status, new_status, admin_user):
     """Create message for status changes with PROPER email validation and failure tracking"""
@@ -282,12 +344,12 @@ def handle_status_change_message(reservation, old_status, new_status, admin_user
         priority = 'info'
         message_type = 'info'
         
-        print(f"📧 Processing status change: {old_status} → {new_status}")
-        print(f"📧 Customer email: {reservation.customer_email}")
+        logger.debug(f"📧 Processing status change: {old_status} → {new_status}")
+        logger.debug(f"📧 Customer email: {reservation.customer_email}")
         
         if new_status in ['Confirmée', 'confirmed']:
             # CONFIRMED
-            print(f"✅ Processing CONFIRMATION for {reservation.customer_name}")
+            logger.info(f"✅ Processing CONFIRMATION for {reservation.customer_name}")
             
             if reservation.customer_email and reservation.customer_email.strip():
                 # ✅ VALIDATE EMAIL FIRST
@@ -295,7 +357,7 @@ def handle_status_change_message(reservation, old_status, new_status, admin_user
                 
                 if is_valid:
                     try:
-                        print(f"📧 Attempting to send confirmation email to: {reservation.customer_email}")
+                        logger.debug(f"📧 Attempting to send confirmation email to: {reservation.customer_email}")
                         # ✅ TRY TO SEND EMAIL
                         email_sent = send_reservation_confirmation_email(reservation, notification)
                         
@@ -304,7 +366,7 @@ def handle_status_change_message(reservation, old_status, new_status, admin_user
                         actual_email_sent = notification.email_sent
                         
                         if not (email_sent and actual_email_sent):
-                            print(f"❌ Confirmation email failed")
+                            logger.error(f"❌ Confirmation email failed")
                             notification.email_sent = False
                             notification.email_opened_by_client = False
                             notification.save(update_fields=['email_sent', 'email_opened_by_client'])
@@ -312,17 +374,17 @@ def handle_status_change_message(reservation, old_status, new_status, admin_user
                         
                     except Exception as e:
                         logger.error(f"Confirmation email error: {e}")
-                        print(f"❌ Confirmation email error: {e}")
+                        logger.error(f"❌ Confirmation email error: {e}")
                         email_sent = False
                         notification.email_sent = False
                         notification.save(update_fields=['email_sent'])
                 else:
-                    print(f"❌ Email validation failed for confirmation: {validation_message}")
+                    logger.error(f"❌ Email validation failed for confirmation: {validation_message}")
                     email_sent = False
                     notification.email_sent = False
                     notification.save(update_fields=['email_sent'])
             else:
-                print(f"⚠️ No email address for confirmation")
+                logger.warning(f"⚠️ No email address for confirmation")
                 email_sent = False
             
             # ✅ CHECK FINAL STATUS
@@ -359,7 +421,7 @@ Action effectuée avec succès"""
         
         elif new_status in ['Annulée', 'cancelled']:
             # CANCELLED
-            print(f"❌ Processing CANCELLATION for {reservation.customer_name}")
+            logger.info(f"❌ Processing CANCELLATION for {reservation.customer_name}")
             
             if reservation.customer_email and reservation.customer_email.strip():
                 # ✅ VALIDATE EMAIL FIRST
@@ -367,7 +429,7 @@ Action effectuée avec succès"""
                 
                 if is_valid:
                     try:
-                        print(f"📧 Attempting to send cancellation email to: {reservation.customer_email}")
+                        logger.debug(f"📧 Attempting to send cancellation email to: {reservation.customer_email}")
                         email_sent = send_reservation_cancellation_email(reservation, notification)
                         
                         # ✅ DOUBLE-CHECK actual status
@@ -375,24 +437,24 @@ Action effectuée avec succès"""
                         actual_email_sent = notification.email_sent
                         
                         if not (email_sent and actual_email_sent):
-                            print(f"❌ Cancellation email failed")
+                            logger.error(f"❌ Cancellation email failed")
                             notification.email_sent = False
                             notification.save(update_fields=['email_sent'])
                             email_sent = False
                             
                     except Exception as e:
                         logger.error(f"Cancellation email error: {e}")
-                        print(f"❌ Cancellation email error: {e}")
+                        logger.error(f"❌ Cancellation email error: {e}")
                         email_sent = False
                         notification.email_sent = False
                         notification.save(update_fields=['email_sent'])
                 else:
-                    print(f"❌ Email validation failed for cancellation: {validation_message}")
+                    logger.error(f"❌ Email validation failed for cancellation: {validation_message}")
                     email_sent = False
                     notification.email_sent = False
                     notification.save(update_fields=['email_sent'])
             else:
-                print(f"⚠️ No email address for cancellation")
+                logger.warning(f"⚠️ No email address for cancellation")
                 email_sent = False
             
             # ✅ CHECK FINAL STATUS
@@ -425,7 +487,7 @@ Service terminé avec succès"""
         
         else:
             # Other status changes
-            print(f"ℹ️ Status change noted: {old_status} → {new_status}")
+            logger.info(f"ℹ️ Status change noted: {old_status} → {new_status}")
             message = f"""📝 Statut modifié: {old_status} → {new_status}
 📅 {reservation.date.strftime('%d/%m/%Y')} à {reservation.time.strftime('%H:%M')}
 👥 {reservation.number_of_guests} personne{'s' if reservation.number_of_guests > 1 else ''}
@@ -443,18 +505,22 @@ Changement de statut enregistré"""
         notification.message_type = message_type
         notification.save(update_fields=['title', 'message', 'priority', 'message_type'])
         
-        print(f"✅ Status change notification created: {notification.title}")
-        print(f"📊 Final tracking status: email_sent={notification.email_sent}")
+        logger.info(f"✅ Status change notification created: {notification.title}")
+        logger.debug(f"📊 Final tracking status: email_sent={notification.email_sent}")
         
     except Exception as e:
         logger.error(f"Error handling status change: {e}")
-        print(f"❌ Erreur changement de statut: {e}")
+        logger.error(f"❌ Erreur changement de statut: {e}")
         import traceback
         traceback.print_exc()
 
 @receiver(post_delete, sender=Reservation)
+@timed('signals')
 def reservation_deleted_message(sender, instance, **kwargs):
     """Create message when reservation is deleted with email tracking"""
+    if reservation_signals_are_muted():
+        return
+    
     try:
         admin_user = User.objects.filter(is_superuser=True).first()
         if not admin_user:
@@ -497,7 +563,7 @@ def reservation_deleted_message(sender, instance, **kwargs):
                     notification.email_sent = False
                     notification.save(update_fields=['email_sent'])
             else:
-                print(f"❌ Email validation failed for deletion: {validation_message}")
+                logger.error(f"❌ Email validation failed for deletion: {validation_message}")
                 email_sent = False
         
         # ✅ CHECK FINAL STATUS
@@ -516,12 +582,12 @@ Réservation définitivement supprimée du système"""
         notification.message = message.strip()
         notification.save(update_fields=['message'])
         
-        print(f"✅ Message avec tracking créé pour suppression: {instance.customer_name}")
-        print(f"📊 Final tracking status: email_sent={notification.email_sent}")
+        logger.info(f"✅ Message avec tracking créé pour suppression: {instance.customer_name}")
+        logger.debug(f"📊 Final tracking status: email_sent={notification.email_sent}")
         
     except Exception as e:
         logger.error(f"Error creating deletion message: {e}")
-        print(f"❌ Erreur message suppression: {e}")
+        logger.error(f"❌ Erreur message suppression: {e}")
 
 # Helper function to create custom messages with tracking
 def create_custom_admin_message(title, message, priority='normal', message_type='info', reservation=None, send_email=False):
@@ -561,7 +627,7 @@ def create_custom_admin_message(title, message, priority='normal', message_type=
                 except Exception as e:
                     logger.error(f"Error sending custom email: {e}")
             else:
-                print(f"❌ Custom email not sent - validation failed: {validation_message}")
+                logger.error(f"❌ Custom email not sent - validation failed: {validation_message}")
         
         return notification
         
@@ -607,7 +673,7 @@ def get_email_tracking_stats():
             ]
         }
         
-        print(f"📊 Email tracking stats: {total_sent} sent, {total_opened} opened ({open_rate}%)")
+        logger.debug(f"📊 Email tracking stats: {total_sent} sent, {total_opened} opened ({open_rate}%)")
         return stats
         
     except Exception as e:
@@ -627,7 +693,7 @@ def mark_notification_email_opened(tracking_token, request=None):
         if not notification.email_opened_by_client:
             notification.mark_email_as_opened(request)
             
-            print(f"📧 Email opened for notification: {notification.title}")
+            logger.debug(f"📧 Email opened for notification: {notification.title}")
             return True
             
         return False
@@ -779,47 +845,18 @@ def test_reservation_with_valid_email():
         return False
 
 # Cleanup function with tracking info
-def cleanup_old_notifications(days=30):
+def cleanup_old_notifications(days=None):
     """Clean up old read notifications (preserves tracking data for recent notifications)"""
-    from django.utils import timezone
-    from datetime import timedelta
+    from .utils.retention import run_retention
     
     try:
-        cutoff_date = timezone.now() - timedelta(days=days)
-        
-        # Only delete notifications that are read AND old AND have no recent email activity
-        old_notifications = Notification.objects.filter(
-            is_read=True,
-            read_at__lt=cutoff_date
-        ).exclude(
-            # Keep notifications with recent email tracking activity
-            email_opened_at__gte=timezone.now() - timedelta(days=7)
-        )
-        
-        count = old_notifications.count()
-        
-        # Log some stats before deletion
-        email_tracking_stats = []
-        for notification in old_notifications[:10]:  # Sample first 10
-            if notification.email_sent:
-                email_tracking_stats.append({
-                    'title': notification.title,
-                    'sent': notification.email_sent,
-                    'opened': notification.email_opened_by_client,
-                    'customer': getattr(notification.related_reservation, 'customer_name', 'N/A') if notification.related_reservation else 'N/A'
-                })
+        # Chunked, PK-ordered deletes - days defaults to NOTIFICATION_RETENTION_DAYS
+        stats = run_retention('notifications', days=days)
+        count = stats['deleted']
         
-        # Delete old notifications
-        old_notifications.delete()
-        
-        logger.info(f"Cleaned up {count} old notifications")
+        logger.info(f"Cleaned up {count} old notifications in {stats['batches']} batches")
         print(f"✅ {count} anciennes notifications supprimées")
         
-        if email_tracking_stats:
-            print("📊 Sample email tracking data from deleted notifications:")
-            for stat in email_tracking_stats:
-                print(f"  - {stat['customer']}: Email {'opened' if stat['opened'] else 'not opened'}")
-        
         return count
         
     except Exception as e:
@@ -0,0 +1,70 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import time, timedelta
+
+from reservations.models import Reservation, SpecialDate, get_restaurant_info
+from reservations.signals import reservation_signals_muted
+from reservations.tests.test_booking_lock import BookingSetupMixin
+from reservations.utils.availability import find_available_slots
+from reservations.utils.opening_calendar import get_opening_calendar, reset_opening_calendar
+
+
+class AvailabilityGuestsTests(TestCase):
+    """Party size of the availability endpoints: integer between 1 and 20, 400 otherwise"""
+
+    def setUp(self):
+        self.day = (timezone.localdate() + timedelta(days=7)).isoformat()
+
+    def test_invalid_guests(self):
+        for guests in ('abc', '-5', '0', '21', '2.5'):
+            with self.subTest(guests=guests):
+                response = self.client.get(reverse('check-availability-by-date'), {'date': self.day, 'guests': guests})
+                self.assertEqual(response.status_code, 400)
+                response = self.client.get(
+                    reverse('check-availability'), {'date': self.day, 'time': '20:00', 'guests': guests}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_guests(self):
+        for guests in ('', '1', '20'):
+            with self.subTest(guests=guests):
+                response = self.client.get(reverse('check-availability-by-date'), {'date': self.day, 'guests': guests})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('availability', response.json())
+
+
+class NextAvailableSlotsTests(BookingSetupMixin, TestCase):
+    """Window search: full stays and closed days are skipped, bookings read in one query"""
+
+    def setUp(self):
+        self.set_up_room()
+        with reservation_signals_muted():
+            Reservation.objects.create(
+                customer_name="Client", customer_phone="0611111111", date=self.day, time=time(20, 0),
+                number_of_guests=4, status='Confirmée',
+            )
+        calendar = get_opening_calendar()
+        self.next_open = next(
+            self.day + timedelta(days=offset) for offset in range(1, 15) if calendar.is_open(self.day + timedelta(days=offset))
+        )
+
+    def test_full_day_is_skipped(self):
+        # The 20:00 party holds the 4 seats at 21:00 too
+        self.assertEqual(find_available_slots(party_size=1, days=1, start=self.day), [])
+        slots = find_available_slots(party_size=2, days=15, limit=2, start=self.day)
+        self.assertEqual(
+            [(slot['date'], slot['time']) for slot in slots], [(self.next_open, time(20, 0)), (self.next_open, time(21, 0))]
+        )
+
+    def test_closed_day_is_skipped(self):
+        SpecialDate.objects.create(date=self.next_open, is_open=False, reason="Fermeture")
+        reset_opening_calendar()
+        slots = find_available_slots(party_size=2, days=15, limit=1, start=self.day)
+        self.assertGreater(slots[0]['date'], self.next_open)
+
+    def test_one_query_for_the_window(self):
+        get_restaurant_info()
+        get_opening_calendar()
+        with self.assertNumQueries(2):
+            find_available_slots(party_size=2, days=30, limit=50, start=self.day)
@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import time, timedelta
+from unittest import skipUnless
+import threading
+
+from reservations.models import Notification, Reservation, RestaurantInfo, TimeSlot
+from reservations.signals import reservation_signals_muted
+from reservations.utils.occupancy import ACTIVE_STATUSES, lock_day
+from reservations.utils.opening_calendar import get_opening_calendar, reset_opening_calendar
+
+
+class BookingSetupMixin:
+    """Two overlapping slots (20:00 and 21:00) and a dining room of 4 seats"""
+
+    def set_up_room(self):
+        reset_opening_calendar()
+        self.addCleanup(reset_opening_calendar)
+        restaurant = RestaurantInfo.load()
+        restaurant.capacity = 4
+        restaurant.save()
+        for hour in (20, 21):
+            TimeSlot.objects.create(time=time(hour, 0), max_covers=20, max_reservations=10, is_active=True)
+        reset_opening_calendar()
+        calendar = get_opening_calendar()
+        self.day = next(
+            day for day in (timezone.localdate() + timedelta(days=offset) for offset in range(1, 15))
+            if calendar.is_open(day) and calendar.get_slot(day, time(21, 0))
+        )
+
+    def book(self, hour):
+        return self.client.post(reverse('reservation-create'), {
+            'customer_name': f"Client {hour}h", 'customer_email': "client@example.org", 'customer_phone': f"06000000{hour}",
+            'date': self.day.isoformat(), 'time': f'{hour}:00', 'number_of_guests': 4,
+        })
+
+
+class OverlappingBookingTests(BookingSetupMixin, TestCase):
+
+    def setUp(self):
+        self.set_up_room()
+
+    def test_overlapping_stay_is_refused(self):
+        self.assertEqual(self.book(20).status_code, 201)
+        # The 20:00 party (4 guests, 105 min) still holds the 4 seats at 21:00
+        self.assertEqual(self.book(21).status_code, 400)
+
+    def test_message_and_email_after_commit(self):
+        User.objects.create_superuser('admin', 'admin@example.org', password=None)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.book(20).status_code, 201)
+            # Nothing sent while the booking transaction (and the day lock) is open
+            self.assertFalse(Notification.objects.exists())
+            self.assertEqual(mail.outbox, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Notification.objects.get().title, "📨 Nouvelle réservation - Client 20h")
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_legacy_english_statuses_hold_seats(self):
+        self.assertIn('pending', ACTIVE_STATUSES)
+        self.assertIn('confirmed', ACTIVE_STATUSES)
+        slot = TimeSlot.objects.get(time=time(20, 0))
+        with reservation_signals_muted():
+            reservation = Reservation.objects.create(
+                customer_name="Ancien", customer_phone="0611111111", date=self.day, time=time(20, 0), number_of_guests=2
+            )
+        Reservation.objects.filter(pk=reservation.pk).update(status='confirmed')
+        self.assertEqual(slot.usage(self.day), (1, 2))
+
+
+@skipUnless(connection.vendor == 'postgresql', "Verrou consultatif par jour: PostgreSQL uniquement")
+class BookingDayLockTests(BookingSetupMixin, TransactionTestCase):
+    """A booking waits for another booking of the same day, whatever its slot"""
+
+    def setUp(self):
+        self.set_up_room()
+
+    def test_second_booking_of_the_day_waits(self):
+        results = {}
+        with transaction.atomic():
+            lock_day(self.day)
+
+            def book_21h():
+                results['status'] = self.book(21).status_code
+                connection.close()
+
+            worker = threading.Thread(target=book_21h)
+            worker.start()
+            worker.join(0.5)
+            self.assertTrue(worker.is_alive())
+
+            with reservation_signals_muted():
+                Reservation.objects.create(
+                    customer_name="Client 20h", customer_phone="0600000020", date=self.day, time=time(20, 0),
+                    number_of_guests=4,
+                )
+        worker.join(10)
+        self.assertEqual(results['status'], 400)
+        self.assertEqual(Reservation.objects.filter(date=self.day).count(), 1)
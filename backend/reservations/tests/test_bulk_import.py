@@ -0,0 +1,153 @@
+from django.test import TestCase
+from django.utils import timezone
+from datetime import time, timedelta
+import io
+
+from reservations.models import Customer, Reservation, RestaurantInfo, SpecialDate, TimeSlot
+from reservations.signals import reservation_signals_muted
+from reservations.tests.test_booking_lock import BookingSetupMixin
+from reservations.utils.bulk_import import import_reservations
+from reservations.utils.customers import HistoryAccumulator, save_history
+from reservations.utils.occupancy import DayOccupancy
+from reservations.utils.opening_calendar import reset_opening_calendar
+from reservations.utils.phone import normalize_phone
+
+HEADER = "customer_name,customer_phone,date,time,number_of_guests,status\n"
+
+
+def next_weekday(weekday, weeks=0, past=False):
+    """Date of the next (or last) given weekday (0=lundi), weeks further"""
+    today = timezone.localdate()
+    if past:
+        return today - timedelta(days=(today.weekday() - weekday) % 7 or 7, weeks=weeks)
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7, weeks=weeks)
+
+
+class BulkImportRulesTests(TestCase):
+    """Imported rows follow the same opening rules as the booking form"""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurant = RestaurantInfo.load()
+        restaurant.closed_on_monday = True
+        restaurant.save()
+        for hour in (19, 20, 21):
+            TimeSlot.objects.create(time=time(hour, 0), max_covers=20, max_reservations=10, is_active=True)
+
+        cls.monday = next_weekday(0)
+        cls.closure = next_weekday(2)
+        cls.special_hours = next_weekday(3)
+        cls.past_closure = next_weekday(2, weeks=1, past=True)
+        cls.past_open = next_weekday(1, weeks=1, past=True)
+        SpecialDate.objects.create(date=cls.closure, is_open=False, reason="Travaux")
+        SpecialDate.objects.create(date=cls.past_closure, is_open=False, reason="Congés")
+        SpecialDate.objects.create(
+            date=cls.special_hours, is_open=True, special_opening_time=time(20, 0), special_closing_time=time(21, 0)
+        )
+
+    def setUp(self):
+        reset_opening_calendar()
+        self.addCleanup(reset_opening_calendar)
+
+    def run_import(self, rows, **options):
+        content = HEADER + ''.join(
+            f"Client {index},06000000{index:02d},{day.isoformat()},{hour}:00,2,{status}\n"
+            for index, (day, hour, status) in enumerate(rows)
+        )
+        report = import_reservations(io.StringIO(content), **options)
+        return report, {error['line']: error['errors'] for error in report['errors']}
+
+    def test_opening_rules(self):
+        report, errors = self.run_import([
+            (self.monday, 20, 'En attente'),
+            (self.closure, 20, 'En attente'),
+            (self.special_hours, 19, 'En attente'),
+            (self.special_hours, 20, 'En attente'),
+            (self.past_closure, 20, 'Terminée'),
+            (self.past_open, 20, 'Terminée'),
+        ])
+        self.assertEqual(errors, {
+            2: ["Restaurant fermé ce jour-là"],
+            3: ["Restaurant fermé ce jour-là"],
+            4: ["Selected time slot is not available"],
+            6: ["Restaurant fermé ce jour-là"],
+        })
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(
+            sorted(Reservation.objects.values_list('date', flat=True)), sorted([self.past_open, self.special_hours])
+        )
+
+    def test_dry_run_writes_nothing(self):
+        report, errors = self.run_import([(self.special_hours, 20, 'En attente')], dry_run=True)
+        self.assertEqual((report['created'], errors), (1, {}))
+        self.assertFalse(Reservation.objects.exists())
+
+
+class BulkImportCapacityTests(BookingSetupMixin, TestCase):
+    """Same capacity rules as the booking form: seats and tables over the whole stay"""
+
+    def setUp(self):
+        self.set_up_room()
+
+    def run_import(self, *rows):
+        content = HEADER + ''.join(
+            f"Client {hour}h,06000000{hour},{self.day.isoformat()},{hour}:00,{guests},En attente\n"
+            for hour, guests in rows
+        )
+        return import_reservations(io.StringIO(content))
+
+    def test_overlapping_rows_of_the_file(self):
+        report = self.run_import((20, 4), (21, 4))
+        # The 20:00 party (4 guests, 105 min) still holds the 4 seats at 21:00
+        self.assertEqual(report['errors'], [{'line': 3, 'errors': ["Not enough seats left at this time"]}])
+        self.assertEqual(report['created'], 1)
+
+    def test_existing_bookings_hold_seats(self):
+        with reservation_signals_muted():
+            Reservation.objects.create(
+                customer_name="Client", customer_phone="0611111111", date=self.day, time=time(20, 0), number_of_guests=3
+            )
+        report = self.run_import((21, 2), (21, 1))
+        self.assertEqual(report['errors'], [{'line': 2, 'errors': ["Not enough seats left at this time"]}])
+
+    def test_added_party_matches_a_rebuilt_day(self):
+        bookings = [(time(19, 0), 90, 2), (time(20, 0), 105, 4), (time(19, 30), 120, 3), (time(20, 0), 60, 1)]
+        occupancy = DayOccupancy(bookings[:1])
+        for booking in bookings[1:]:
+            occupancy.add(*booking)
+        rebuilt = DayOccupancy(bookings)
+        self.assertEqual((occupancy.points, occupancy.covers, occupancy.parties), (rebuilt.points, rebuilt.covers, rebuilt.parties))
+        self.assertEqual(occupancy.slot_usage(time(20, 0)), (2, 5))
+
+
+class ImportCustomerHistoryTests(TestCase):
+    """Existing clients of an import batch are incremented together"""
+
+    def customer(self, index, **counters):
+        phone = f"061234567{index}"
+        return Customer.objects.create(phone_key=normalize_phone(phone), phone=phone, name=f"Client {index}", **counters)
+
+    def test_counters_added(self):
+        today = timezone.localdate()
+        first = self.customer(1, total_reservations=3, cancelled_reservations=1, last_reservation_date=today)
+        second = self.customer(2)
+        history = HistoryAccumulator()
+        history.add("Client 1", first.phone, None, 'Annulée', today - timedelta(days=3))
+        history.add("Client 1", first.phone, None, 'Terminée', today - timedelta(days=2))
+        history.add("Client 2", second.phone, None, 'Terminée', today - timedelta(days=1))
+        history.add("Client 3", "0612345673", None, 'En attente', today)
+
+        # Lookup, one insert for the new client, one UPDATE for both existing ones
+        with self.assertNumQueries(3):
+            ids = save_history(history)
+        self.assertEqual(len(ids), 3)
+
+        first.refresh_from_db()
+        self.assertEqual(
+            (first.total_reservations, first.cancelled_reservations, first.completed_reservations),
+            (5, 2, 1),
+        )
+        self.assertEqual((first.last_reservation_date, first.last_visit), (today, today - timedelta(days=2)))
+        second.refresh_from_db()
+        self.assertEqual((second.total_reservations, second.completed_reservations), (1, 1))
+        self.assertEqual(second.last_reservation_date, today - timedelta(days=1))
@@ -0,0 +1,50 @@
+from django.test import TestCase
+from django.urls import reverse
+from unittest import mock
+import asyncio
+
+from reservations.utils import content_versions
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class ConditionalContentTests(TestCase):
+    """ETag / Last-Modified of the versioned read endpoints"""
+
+    def get_version_spy(self):
+        calls = []
+
+        def get_version(name):
+            calls.append(on_event_loop())
+            return original(name)
+
+        original = content_versions.get_version
+        patcher = mock.patch.object(content_versions, 'get_version', get_version)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return calls
+
+    async def test_async_view_reads_versions_off_the_event_loop(self):
+        calls = self.get_version_spy()
+        response = await self.async_client.get(reverse('special-dates-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [False])  # one read, in a worker thread
+
+        repeat = await self.async_client.get(reverse('special-dates-list'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_sync_view_reads_each_version_once(self):
+        calls = self.get_version_spy()
+        response = self.client.get(reverse('timeslot-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag') and response.has_header('Last-Modified'))
+        self.assertEqual(len(calls), 1)
+
+        repeat = self.client.get(reverse('timeslot-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
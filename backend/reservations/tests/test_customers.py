@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from datetime import time, timedelta
+
+from reservations.models import Customer, Reservation
+from reservations.signals import reservation_signals_muted
+from reservations.utils.phone import normalize_phone
+
+
+class CustomerHistoryTests(TestCase):
+    """Counters kept on Customer by Reservation.save()"""
+
+    def book(self, phone, status='En attente', name="Karim Alaoui"):
+        with reservation_signals_muted():
+            return Reservation.objects.create(
+                customer_name=name, customer_phone=phone, date=timezone.localdate() + timedelta(days=3),
+                time=time(20, 0), number_of_guests=2, status=status,
+            )
+
+    def counters(self, phone):
+        customer = Customer.objects.lookup(phone)
+        return customer.total_reservations, customer.cancelled_reservations, customer.completed_reservations
+
+    def test_status_changes(self):
+        reservation = self.book("0612345678")
+        reservation.status = 'Annulée'
+        with reservation_signals_muted():
+            reservation.save()
+        self.assertEqual(self.counters("0612345678"), (1, 1, 0))
+
+    def test_moved_to_another_client(self):
+        reservation = self.book("0612345678", status='Annulée')
+        self.book("0612345678")
+        reservation.customer_phone = "0700000000"
+        with reservation_signals_muted():
+            reservation.save()
+        self.assertEqual(self.counters("0612345678"), (1, 0, 0))
+        self.assertEqual(self.counters("0700000000"), (1, 1, 0))
+
+    def test_status_not_in_update_fields(self):
+        reservation = self.book("0612345678")
+        reservation.status = 'Annulée'
+        reservation.table_number = 4
+        with reservation_signals_muted():
+            reservation.save(update_fields=['table_number'])
+        self.assertEqual(self.counters("0612345678"), (1, 0, 0))
+
+        # The status change is counted once it is actually saved
+        with reservation_signals_muted():
+            reservation.save(update_fields=['status'])
+        self.assertEqual(self.counters("0612345678"), (1, 1, 0))
+
+    @override_settings(CUSTOMER_HISTORY_SETTINGS={'MAX_CANCELLATIONS': 2})
+    def test_booking_refused_after_cancellations(self):
+        self.book("0612345678", status='Annulée')
+        self.assertIsNone(Customer.objects.booking_refusal("06 12 34 56 78"))
+        self.book("0612345678", status='Annulée')
+        self.assertTrue(Customer.objects.booking_refusal("+212 612345678"))
+
+        response = self.client.post(reverse('reservation-create'), {
+            'customer_name': "Karim Alaoui", 'customer_email': "karim@example.org", 'customer_phone': "0612345678",
+            'date': (timezone.localdate() + timedelta(days=3)).isoformat(), 'time': '20:00', 'number_of_guests': 2,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+
+class CustomerAdminSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', password=None)
+        for name, phone in (("Karim Alaoui", "0612345678"), ("Sara Bennani", "0700000000")):
+            Customer.objects.create(phone_key=normalize_phone(phone), phone=phone, name=name)
+
+    def search(self, term):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin:reservations_customer_changelist'), {'q': term})
+        return sorted(customer.name for customer in response.context['cl'].result_list)
+
+    def test_phone_prefix(self):
+        self.assertEqual(self.search("06 12"), ["Karim Alaoui"])
+        self.assertEqual(self.search("sara"), ["Sara Bennani"])
+
+    def test_term_without_significant_digits(self):
+        # normalize_phone('000') is '': no phone_key__startswith='' matching every client
+        self.assertEqual(self.search("000"), [])
+        self.assertEqual(self.search("+000"), [])
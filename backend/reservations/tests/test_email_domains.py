@@ -0,0 +1,68 @@
+from django.test import AsyncRequestFactory, SimpleTestCase
+from django.urls import reverse
+from unittest import mock, skipUnless
+import asyncio
+import json
+
+from reservations.utils import email_domains
+from reservations.utils.email_domains import DNS_AVAILABLE, adomain_accepts_email
+from reservations.views import verify_emails_bulk
+
+
+@skipUnless(DNS_AVAILABLE, "dnspython n'est pas installé")
+class AsyncMxLookupTests(SimpleTestCase):
+    """MX lookups are cached per domain; a cancelled lookup (client gone) caches nothing"""
+
+    def setUp(self):
+        email_domains._mx_cache.clear()
+        self.addCleanup(email_domains._mx_cache.clear)
+        self.started = asyncio.Event()
+        self.release = None
+
+    async def fake_resolve(self, domain, rdtype, lifetime=None):
+        self.started.set()
+        if domain.startswith('missing'):
+            raise email_domains.dns.resolver.NXDOMAIN()
+        if self.release is not None:
+            await self.release.wait()
+        return [domain]
+
+    def patch_resolver(self):
+        patcher = mock.patch.object(email_domains.dns.asyncresolver, 'resolve', side_effect=self.fake_resolve)
+        resolve = patcher.start()
+        self.addCleanup(patcher.stop)
+        return resolve
+
+    async def test_answers_are_cached(self):
+        resolve = self.patch_resolver()
+        self.assertTrue(await adomain_accepts_email('Example.org'))
+        self.assertTrue(await adomain_accepts_email('example.org'))
+        self.assertFalse(await adomain_accepts_email('missing.example'))
+        self.assertFalse(await adomain_accepts_email('missing.example'))
+        self.assertEqual([call.args[0] for call in resolve.call_args_list], ['example.org', 'missing.example'])
+
+    async def test_cancelled_lookup_caches_nothing(self):
+        self.patch_resolver()
+        self.release = asyncio.Event()
+        lookup = asyncio.create_task(adomain_accepts_email('slow.example'))
+        await self.started.wait()
+        lookup.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await lookup
+        self.assertNotIn('slow.example', email_domains._mx_cache)
+
+    async def test_cancelled_bulk_request_cancels_every_lookup(self):
+        resolve = self.patch_resolver()
+        self.release = asyncio.Event()
+        emails = [f"client@slow{index}.example" for index in range(3)]
+        request = AsyncRequestFactory().post(
+            reverse('verify-emails-bulk'), json.dumps({'emails': emails}), content_type='application/json'
+        )
+        view = asyncio.create_task(verify_emails_bulk(request))
+        while resolve.call_count < len(emails):
+            await asyncio.sleep(0)
+        view.cancel()
+        # Not swallowed by the view's `except Exception` handlers
+        with self.assertRaises(asyncio.CancelledError):
+            await view
+        self.assertEqual(email_domains._mx_cache, {})
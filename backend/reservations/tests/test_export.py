@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from datetime import date, time
+import csv
+import io
+import zipfile
+
+from reservations.models import Reservation
+from reservations.signals import reservation_signals_muted
+
+
+class ReservationExportTests(TestCase):
+    """Streaming CSV / XLSX export: customer text is never turned into a formula"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', password=None)
+        with reservation_signals_muted():
+            cls.reservation = Reservation.objects.create(
+                customer_name='=HYPERLINK("http://evil.example","clic")', customer_email="client@example.org",
+                customer_phone="+33612345678", date=date(2030, 5, 4), time=time(20, 0), number_of_guests=2,
+                special_requests="@SUM(A1:A9)",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, export_format):
+        response = self.client.get(reverse('reservation-export'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_formulas_are_quoted(self):
+        content = self.export('csv').decode('utf-8-sig')
+        header, row = list(csv.reader(io.StringIO(content), delimiter=';'))
+        cells = dict(zip(header, row))
+        self.assertEqual(cells['Client'], '\'=HYPERLINK("http://evil.example","clic")')
+        self.assertEqual(cells['Téléphone'], "'+33612345678")
+        self.assertEqual(cells['Demandes spéciales'], "'@SUM(A1:A9)")
+        # Values the export formats itself are left alone
+        self.assertEqual(cells['ID'], str(self.reservation.pk))
+        self.assertEqual(cells['Date'], '04/05/2030')
+        self.assertEqual(cells['Email'], "client@example.org")
+
+    def test_xlsx_uses_inline_strings(self):
+        with zipfile.ZipFile(io.BytesIO(self.export('xlsx'))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<c t="inlineStr"><is><t xml:space="preserve">=HYPERLINK(', sheet)
+        self.assertNotIn('<f>', sheet)
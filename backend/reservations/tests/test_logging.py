@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+import io
+import json
+import logging
+import logging.config
+
+from reservations.utils.logging_utils import AsyncQueueHandler, JsonFormatter
+
+SINK = io.StringIO()
+
+
+class AsyncQueueHandlerTests(SimpleTestCase):
+    """Records written by the listener thread keep their exception and extra fields"""
+
+    def setUp(self):
+        SINK.seek(0)
+        SINK.truncate()
+        logging.config.dictConfig({
+            'version': 1,
+            'disable_existing_loggers': False,
+            'formatters': {'json': {'()': JsonFormatter}},
+            'handlers': {
+                'memory': {'class': 'logging.StreamHandler', 'stream': 'ext://reservations.tests.test_logging.SINK', 'formatter': 'json'},
+                'queued_memory': {'()': AsyncQueueHandler, 'targets': ['cfg://handlers.memory']},
+            },
+            'loggers': {'reservations.tests.queued': {'handlers': ['queued_memory'], 'propagate': False}},
+        })
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+        self.logger = logging.getLogger('reservations.tests.queued')
+
+    def entries(self):
+        # close() drains the queue before stopping the listener
+        self.logger.handlers[0].close()
+        return [json.loads(line) for line in SINK.getvalue().splitlines()]
+
+    def test_targets_from_cfg_references(self):
+        handler = self.logger.handlers[0]
+        self.assertIsInstance(handler, AsyncQueueHandler)
+        self.assertEqual([target.name for target in handler.targets], ['memory'])
+
+    def test_exception_and_extra_fields(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.exception("Échec %s", 'envoi', extra={'reservation_id': 7})
+        entry, = self.entries()
+        self.assertEqual(entry['message'], "Échec envoi")
+        self.assertEqual(entry['reservation_id'], 7)
+        self.assertIn('ZeroDivisionError', entry['exception'])
+        self.assertNotIn('Traceback', entry['message'])
+
+    def test_unconfigured_target(self):
+        with self.assertRaises(ValueError):
+            AsyncQueueHandler(targets=['memory'])
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from pathlib import Path
+import json
+import subprocess
+import sys
+import tempfile
+
+from reservations.utils.metrics import RETIRED_FILE, collect_all, prune_dead_workers, registry
+
+
+def exited_pid():
+    """Pid of a process that already exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class PrometheusMetricsTests(TestCase):
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        override = override_settings(METRICS={**settings.METRICS, 'DIR': self.dir, 'TOKEN': 's3cret'})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_worker(self, pid, value):
+        (self.dir / f"{pid}.json").write_text(json.dumps({
+            'buckets': list(registry.buckets),
+            'counters': [['reservations_emails_total', [['result', 'sent']], value]],
+            'histograms': [],
+        }))
+
+    def emails_sent(self):
+        _, counters, _ = collect_all()
+        return counters['reservations_emails_total', (('result', 'sent'),)]
+
+    def test_bearer_token_or_staff(self):
+        url = reverse('prometheus-metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="metrics"')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        self.client.force_login(User.objects.create_user('staff', password=None, is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_empty_token_never_matches(self):
+        with self.settings(METRICS={**settings.METRICS, 'DIR': self.dir, 'TOKEN': ''}):
+            response = self.client.get(reverse('prometheus-metrics'), HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 401)
+
+    def test_exited_workers_are_folded(self):
+        first, second = exited_pid(), exited_pid()
+        self.write_worker(first, 3)
+        self.write_worker(second, 4)
+        self.assertEqual(self.emails_sent(), 7)
+
+        self.assertFalse((self.dir / f"{first}.json").exists())
+        self.assertFalse((self.dir / f"{second}.json").exists())
+        self.assertTrue((self.dir / RETIRED_FILE).exists())
+
+        # Later exits add up, totals never go down
+        self.write_worker(exited_pid(), 5)
+        self.assertEqual(self.emails_sent(), 12)
+        self.assertEqual(prune_dead_workers(self.dir), 0)
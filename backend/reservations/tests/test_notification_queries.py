@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import time, timedelta
+
+from reservations.models import Notification, Reservation
+from reservations.signals import reservation_signals_muted
+
+# A staff request includes 2 queries for the session and the user
+SESSION_QUERIES = 2
+
+
+def seed_notifications(count, user):
+    """count notifications, each linked to its own reservation (signals muted, no email)"""
+    today = timezone.localdate()
+    offset = Reservation.objects.count()
+    with reservation_signals_muted():
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                customer_name=f"Client {index}",
+                customer_email=f"client{index}@example.org",
+                customer_phone=f"06{index:08d}",
+                date=today + timedelta(days=index % 10),
+                time=time(19, 0),
+                number_of_guests=2,
+            )
+            for index in range(offset, offset + count)
+        ])
+    Notification.objects.bulk_create([
+        Notification(
+            user=user,
+            title=f"Réservation {reservation.customer_name}",
+            message="Nouvelle réservation",
+            related_reservation=reservation,
+            email_sent=True,
+            email_sent_at=timezone.now(),
+            email_opened_by_client=index % 2 == 0,
+            email_opened_at=timezone.now() if index % 2 == 0 else None,
+        )
+        for index, reservation in enumerate(reservations, start=offset)
+    ])
+
+
+class NotificationEndpointQueryTests(TestCase):
+    """Notification endpoints: same number of queries whatever the page size and the data size"""
+
+    DATASET_SIZES = (5, 80)
+    PAGE_SIZES = (10, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', password=None)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def grow_to(self, size):
+        seed_notifications(size - Notification.objects.count(), self.staff)
+
+    def test_notification_list(self):
+        # Page (reservation columns + read receipt joined in) and the counts
+        for size in self.DATASET_SIZES:
+            self.grow_to(size)
+            for limit in self.PAGE_SIZES:
+                with self.subTest(notifications=size, limit=limit):
+                    with self.assertNumQueries(SESSION_QUERIES + 2):
+                        response = self.client.get(reverse('notification_list'), {'limit': limit})
+                    self.assertEqual(response.status_code, 200)
+                    data = response.json()
+                    self.assertEqual(len(data['notifications']), min(size, limit))
+                    self.assertEqual(data['notifications'][0]['customer_name'], f"Client {size - 1}")
+
+    def test_notification_list_next_page(self):
+        self.grow_to(self.DATASET_SIZES[-1])
+        first = self.client.get(reverse('notification_list'), {'limit': 50}).json()
+        with self.assertNumQueries(SESSION_QUERIES + 2):
+            second = self.client.get(
+                reverse('notification_list'), {'limit': 50, 'cursor': first['next_cursor']}
+            ).json()
+        self.assertEqual(len(second['notifications']), self.DATASET_SIZES[-1] - 50)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_dashboard_api_recent(self):
+        # Recent reservations and recent unread notifications
+        for size in self.DATASET_SIZES:
+            self.grow_to(size)
+            with self.subTest(notifications=size):
+                with self.assertNumQueries(SESSION_QUERIES + 2):
+                    response = self.client.get(reverse('dashboard_api_recent'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['recent_notifications']), 5)
+
+    def test_email_tracking_stats(self):
+        # Sent/opened aggregate and the recent openings (public endpoint: no session read)
+        for size in self.DATASET_SIZES:
+            self.grow_to(size)
+            with self.subTest(notifications=size):
+                with self.assertNumQueries(2):
+                    response = self.client.get(reverse('email_tracking_stats'))
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(data['total_sent'], size)
+                self.assertEqual(len(data['recent_openings']), min(10, (size + 1) // 2))
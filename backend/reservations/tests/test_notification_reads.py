@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from reservations.models import Notification, NotificationReadMark, NotificationReceipt
+from reservations.tests.test_notification_queries import SESSION_QUERIES, seed_notifications
+
+
+class NotificationReadTests(TestCase):
+    """Shared notifications, read state per user (watermark + sparse receipts)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser('manager', 'manager@example.org', password=None)
+        cls.staff = User.objects.create_user('staff', 'staff@example.org', password=None, is_staff=True)
+        seed_notifications(20, cls.manager)
+
+    def new_notification(self):
+        return Notification.objects.create(user=self.manager, title="Nouvelle", message="Après le marquage")
+
+    def test_mark_all_is_per_user(self):
+        self.assertEqual(Notification.mark_all_as_read(user=self.manager), 20)
+        self.assertEqual(Notification.get_unread_count(user=self.manager), 0)
+        self.assertEqual(Notification.get_unread_count(user=self.staff), 20)
+        # Handled for nobody: the shared flag is untouched
+        self.assertEqual(Notification.get_unread_count(), 20)
+
+    def test_mark_all_writes_one_row_whatever_the_data_size(self):
+        for size in (20, 200):
+            seed_notifications(size - Notification.objects.count(), self.manager)
+            with self.subTest(notifications=size):
+                # Unread count for the response + watermark upsert
+                with self.assertNumQueries(2):
+                    Notification.mark_all_as_read(user=self.manager)
+                self.assertEqual(NotificationReadMark.objects.count(), 1)
+                self.assertEqual(NotificationReceipt.objects.count(), 0)
+                self.new_notification()
+
+    def test_later_notifications_stay_unread(self):
+        Notification.mark_all_as_read(user=self.manager)
+        later = self.new_notification()
+        self.assertEqual(list(Notification.objects.unread_for(self.manager)), [later])
+        self.assertFalse(later.is_read_by(self.manager))
+
+        later.mark_as_read(user=self.manager)
+        self.assertTrue(later.is_read_by(self.manager))
+        self.assertEqual(Notification.get_counts(user=self.manager)['unread'], 0)
+
+    def test_feed_read_flag(self):
+        Notification.mark_all_as_read(user=self.manager)
+        later = self.new_notification()
+        flags = {row['id']: row['read_by_user'] for row in Notification.objects.feed(user=self.manager)}
+        self.assertFalse(flags.pop(later.pk))
+        self.assertTrue(all(flags.values()))
+
+    def test_mark_unread_moves_the_watermark_back(self):
+        Notification.mark_all_as_read(user=self.manager)
+        notifications = list(Notification.objects.order_by('created_at', 'pk'))
+        selected = notifications[5]
+
+        Notification.objects.mark_unread(Notification.objects.filter(pk=selected.pk), self.manager)
+        self.assertEqual(list(Notification.objects.unread_for(self.manager)), [selected])
+        # Only the notifications between the selected one and the old watermark needed a receipt
+        self.assertEqual(NotificationReceipt.objects.filter(user=self.manager).count(), len(notifications) - 6)
+
+    def test_mark_all_endpoint_query_count(self):
+        self.client.force_login(self.manager)
+        for size in (20, 120):
+            seed_notifications(size - Notification.objects.count(), self.manager)
+            with self.subTest(notifications=size):
+                with self.assertNumQueries(SESSION_QUERIES + 2):
+                    response = self.client.post(reverse('mark_all_notifications_read'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(Notification.get_unread_count(user=self.manager), 0)
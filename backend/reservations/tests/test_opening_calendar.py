@@ -0,0 +1,53 @@
+from django.test import TestCase, override_settings
+from datetime import time, timedelta
+from unittest import mock
+
+from reservations.models import SpecialDate, TimeSlot
+
+from reservations.utils import opening_calendar
+from reservations.utils.content_versions import get_version_cache, new_version, VERSION_KEY_PREFIX
+
+
+class OpeningCalendarVersionTests(TestCase):
+    """Lookups of the process-wide calendar and the shared content versions"""
+
+    def setUp(self):
+        opening_calendar.reset_opening_calendar()
+        self.addCleanup(opening_calendar.reset_opening_calendar)
+
+    def changed_by_another_process(self, name):
+        get_version_cache().set(f"{VERSION_KEY_PREFIX}:{name}", new_version(), timeout=None)
+
+    @override_settings(OPENING_CALENDAR_CHECK_SECONDS=60)
+    def test_lookups_do_not_read_versions_every_time(self):
+        calendar = opening_calendar.get_opening_calendar()
+        with mock.patch.object(opening_calendar, 'get_version', wraps=opening_calendar.get_version) as get_version:
+            for _ in range(100):
+                self.assertIs(opening_calendar.get_opening_calendar(), calendar)
+        self.assertEqual(get_version.call_count, 0)
+
+    @override_settings(OPENING_CALENDAR_CHECK_SECONDS=0)
+    def test_change_from_another_process_rebuilds(self):
+        calendar = opening_calendar.get_opening_calendar()
+        self.assertIs(opening_calendar.get_opening_calendar(), calendar)
+        self.changed_by_another_process('timeslots')
+        self.assertIsNot(opening_calendar.get_opening_calendar(), calendar)
+
+    def test_local_change_replaces_the_calendar(self):
+        slot = TimeSlot.objects.create(time=time(20, 0), max_covers=20, is_active=True)
+        opening_calendar.reset_opening_calendar()
+        calendar = opening_calendar.get_opening_calendar()
+        day = next(day for day in (calendar.start + timedelta(days=offset) for offset in range(1, 8)) if calendar.is_open(day))
+        masks = list(calendar.masks)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SpecialDate.objects.create(date=day, is_open=False, reason="Fermeture")
+
+        # A lookup that started before the change keeps a consistent calendar
+        self.assertEqual(calendar.masks, masks)
+        self.assertEqual(calendar.get_slot(day, slot.time), slot)
+        with mock.patch.object(opening_calendar.OpeningCalendar, 'build') as build:
+            updated = opening_calendar.get_opening_calendar()
+        build.assert_not_called()  # patched copy, not a rebuild
+        self.assertIsNot(updated, calendar)
+        self.assertFalse(updated.is_open(day))
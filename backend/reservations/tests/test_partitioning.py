@@ -0,0 +1,167 @@
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+
+from reservations.models import Notification, NotificationReceipt, Reservation
+from reservations.signals import reservation_signals_muted
+from reservations.utils.partitioning import (
+    PARTITIONED_TABLES, add_months, add_relation_check, add_unique_check, ensure_partitions,
+    explain_partitions, is_partitioned, list_partitions, month_start, partition_all, partition_bounds,
+    partition_name, partitioned_relations, partitioning_supported, trigger_name,
+)
+
+
+class RecordingCursor:
+    """Collects the statements instead of running them"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+
+
+class PartitionHelperTests(SimpleTestCase):
+    """Month arithmetic and generated DDL (no PostgreSQL needed)"""
+
+    def test_months(self):
+        self.assertEqual(month_start(date(2024, 2, 29)), date(2024, 2, 1))
+        self.assertEqual(add_months(date(2024, 11, 1), 2), date(2025, 1, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(partition_name('reservations_reservation', date(2025, 3, 1)), 'reservations_reservation_p2025_03')
+
+    def test_bounds(self):
+        self.assertEqual(partition_bounds('reservations_reservation', date(2024, 12, 1)), ("'2024-12-01'", "'2025-01-01'"))
+        self.assertEqual(
+            partition_bounds('reservations_notification', date(2024, 12, 1)),
+            ("'2024-12-01 00:00:00+00'", "'2025-01-01 00:00:00+00'"),
+        )
+
+    def test_trigger_names_fit_postgresql_identifiers(self):
+        self.assertEqual(trigger_name('reservations_notification', 'uniq'), 'reservations_notification_uniq')
+        long_name = trigger_name('reservations_notificationreceipt', 'related_notification_id', 'fk_parent')
+        self.assertEqual(len(long_name), 63)
+        # Truncated names stay distinct (hash suffix)
+        self.assertNotEqual(long_name, trigger_name('reservations_notificationreceipt', 'related_notification_id', 'fk'))
+
+    def test_relations_to_partitioned_tables(self):
+        relations = {(child, column, parent) for child, _, column, parent, _ in partitioned_relations()}
+        self.assertIn(('reservations_notification', 'related_reservation_id', 'reservations_reservation'), relations)
+        self.assertIn(('reservations_notificationreceipt', 'notification_id', 'reservations_notification'), relations)
+
+    def test_unique_check_ddl(self):
+        cursor = RecordingCursor()
+        add_unique_check(cursor, 'reservations_notification', ['tracking_token'], 'notification_token_key')
+        function, drop, create = cursor.statements
+        self.assertIn('pg_advisory_xact_lock', function)
+        self.assertIn('\'reservations_notification\', NEW."tracking_token"::text', function)
+        self.assertEqual(drop, 'DROP TRIGGER IF EXISTS "notification_token_key_uniq" ON "reservations_notification"')
+        self.assertIn('AFTER INSERT OR UPDATE OF "tracking_token"', create)
+
+    def test_relation_check_ddl_is_deferred(self):
+        cursor = RecordingCursor()
+        add_relation_check(
+            cursor, 'reservations_notification', 'id', 'related_reservation_id', 'reservations_reservation', 'id'
+        )
+        triggers = [sql for sql in cursor.statements if sql.startswith('CREATE CONSTRAINT TRIGGER')]
+        self.assertEqual(len(triggers), 2)
+        for sql in triggers:
+            self.assertIn('DEFERRABLE INITIALLY DEFERRED', sql)
+        self.assertIn('ON "reservations_reservation"', triggers[1])
+
+    @skipUnless(connection.vendor != 'postgresql', "Message d'erreur des bases sans partitionnement")
+    def test_command_needs_postgresql(self):
+        self.assertFalse(partitioning_supported(connection))
+        with self.assertRaises(CommandError):
+            call_command('create_partitions')
+
+
+@skipUnless(connection.vendor == 'postgresql', "Partitionnement déclaratif: PostgreSQL uniquement")
+class PartitioningTests(TestCase):
+    """Tables converted by create_partitions --convert (DDL is rolled back with the test transaction)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        partition_all(months_ahead=2)
+        cls.user = User.objects.create_superuser('manager', 'manager@example.org', password=None)
+        cls.this_month = month_start(timezone.localdate())
+        cls.next_month = add_months(cls.this_month, 1)
+        with reservation_signals_muted():
+            cls.reservations = [
+                Reservation.objects.create(
+                    customer_name=f"Client {index}", customer_phone=f"06{index:08d}",
+                    date=day, time=time(20, 0), number_of_guests=2,
+                )
+                for index, day in enumerate([cls.this_month, cls.this_month + timedelta(days=10), cls.next_month])
+            ]
+        cls.notification = Notification.objects.create(
+            user=cls.user, title="Nouvelle réservation", message="Client 0", related_reservation=cls.reservations[0]
+        )
+
+    def assertDeferredViolation(self, write):
+        """Foreign keys are deferred (like Django's): checked at commit, here forced with check_constraints()"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            write()
+            connection.check_constraints()
+
+    def test_tables_are_partitioned_by_month(self):
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                self.assertTrue(is_partitioned(cursor, table))
+                partitions = list_partitions(cursor, table)
+                self.assertIn(partition_name(table, self.this_month), partitions)
+                self.assertIn(partition_name(table, add_months(self.this_month, 2)), partitions)
+                self.assertIn(f"{table}_default", partitions)
+        self.assertEqual(ensure_partitions('reservations_reservation', months_ahead=2), [])
+
+    def test_month_queries_read_one_partition(self):
+        reservations = Reservation.objects.filter(date__gte=self.this_month, date__lt=self.next_month)
+        self.assertEqual(explain_partitions(reservations), [partition_name('reservations_reservation', self.this_month)])
+        self.assertEqual(reservations.count(), 2)
+
+        start = datetime.combine(self.this_month, time(12, 0), tzinfo=dt_timezone.utc)
+        notifications = Notification.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+        self.assertEqual(explain_partitions(notifications), [partition_name('reservations_notification', self.this_month)])
+
+    def test_tracking_token_stays_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notification.objects.create(
+                user=self.user, title="Doublon", message="Même token", tracking_token=self.notification.tracking_token
+            )
+
+    def test_primary_key_stays_unique(self):
+        duplicate = Reservation.objects.values().get(pk=self.reservations[0].pk)
+        duplicate.update(date=self.next_month)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.bulk_create([Reservation(**duplicate)])
+
+    def test_foreign_keys_to_partitioned_tables(self):
+        missing = Reservation.objects.order_by('-pk').first().pk + 1000
+        self.assertDeferredViolation(lambda: Notification.objects.create(
+            user=self.user, title="Orpheline", message="Pas de réservation", related_reservation_id=missing
+        ))
+        self.assertDeferredViolation(
+            lambda: NotificationReceipt.objects.create(user=self.user, notification_id=self.notification.pk + 1000)
+        )
+        # Deleting a referenced reservation without its notifications (the ORM deletes them first)
+        self.assertDeferredViolation(
+            lambda: Reservation.objects.filter(pk=self.reservations[0].pk)._raw_delete(connection.alias)
+        )
+
+    def test_orm_delete_still_cascades(self):
+        NotificationReceipt.objects.create(user=self.user, notification=self.notification)
+        with transaction.atomic():
+            self.reservations[0].delete()
+            connection.check_constraints()
+        self.assertFalse(Notification.objects.filter(pk=self.notification.pk).exists())
+        self.assertFalse(NotificationReceipt.objects.exists())
+
+    def test_managers_unchanged(self):
+        rows, _ = Notification.objects.page(user=self.user)
+        self.assertEqual([row['customer_name'] for row in rows], ["Client 0"])
+        self.assertEqual(Notification.get_unread_count(user=self.user), 1)
+        self.assertEqual(Reservation.objects.pending().count(), 3)
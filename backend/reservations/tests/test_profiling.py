@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from reservations.utils.profiling import CProfiler, ProfilerBusy
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """?profile=cprofile (staff): one cProfile per process, the others get the stack sampler"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', password=None)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def profile(self):
+        response = self.client.get(reverse('notification_list'), {'profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        return response['X-Profile']
+
+    def test_cprofile(self):
+        self.assertTrue(self.profile().endswith('.prof'))
+
+    def test_busy_cprofile_falls_back_to_sampler(self):
+        running = CProfiler()
+        running.start()
+        try:
+            with self.assertRaises(ProfilerBusy):
+                CProfiler().start()
+            self.assertTrue(self.profile().endswith('.collapsed'))
+        finally:
+            running.stop()
+        # Released: the next request gets cProfile again
+        self.assertTrue(self.profile().endswith('.prof'))
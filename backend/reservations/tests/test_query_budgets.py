@@ -0,0 +1,297 @@
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from datetime import time, timedelta
+import itertools
+import json
+
+from reservations.models import Notification, Reservation, SpecialDate, TimeSlot, get_restaurant_info
+from reservations.signals import reservation_signals_muted
+from reservations.utils.availability import MAX_HORIZON_DAYS, find_available_slots
+from reservations.utils.bulk_import import link_customers
+from reservations.utils.occupancy import clear_occupancy_cache, default_duration
+from reservations.utils.opening_calendar import reset_opening_calendar
+
+# Seeded rows per scale unit (the check runs at two scales and expects the same counts)
+RESERVATIONS_PER_SCALE = 120
+NOTIFICATIONS_PER_SCALE = 40
+SPECIAL_DATES_PER_SCALE = 2
+
+STATUSES = ['En attente', 'Confirmée', 'Annulée', 'Terminée']
+SEED_NAME = "Client Budget"
+SEED_MESSAGE = "Jeu de données du contrôle des requêtes"
+
+# SQL queries of each route (URL name, or the pattern of unnamed routes), cold
+# in-process caches, the same at both scales. A staff request includes 2 queries
+# for the session and the user.
+QUERY_BUDGETS = {
+    # Public API
+    'api-test': 1,
+    'restaurant-detail': 2,
+    'restaurant-info': 2,
+    'timeslot-list': 2,
+    'reservation-list': 1,
+    'reservation-create': 18,
+    'reservation-detail': 1,
+    'check-availability-by-date': 5,
+    'next-available-slots': 5,
+    'check-availability': 5,
+    'special-dates-list': 1,
+    'verify-email-exists': 0,
+    'verify-email-lightweight': 0,
+    'verify-emails-bulk': 0,
+    'email_tracking': 2,
+    'email_tracking_action': 1,
+    'timezone-debug': 0,
+    # Staff API
+    'reservation-export': 3,
+    'reservation-import': 15,
+    'customer-lookup': 3,
+    'update-reservation-status': 14,
+    'email_tracking_stats': 2,
+    'notification_list': 4,
+    'mark_notification_read': 7,
+    'mark_all_notifications_read': 4,
+    'email_analytics_summary': 22,
+    'email_tracking_details': 4,
+    'dashboard-stats': 10,
+    'prometheus-metrics': 2,
+    'profiles-list': 2,
+    'profile-download': 2,
+    'dashboard_api_metrics': 10,
+    'dashboard_api_recent': 4,
+    'test_email_tracking': 8,
+    'cleanup_old_data': 3,
+    'archived_months': 2,
+    'archived_reservations': 2,
+    # Email debug endpoints
+    'test_gmail_basic': 0,
+    'test_email_utils': 0,
+    'test_tracking_url': 4,
+    'test_full_email_flow': 0,
+    'debug_email_settings': 0,
+    'check_failed_emails': 1,
+    'quick_gmail_test': 0,
+    # Redirects
+    'dashboard/': 0,
+    'tableau-de-bord/': 0,
+    '': 0,
+    # Admin (index + every changelist)
+    'admin:index': 33,
+    'admin:reservations_reservation_changelist': 10,
+    'admin:reservations_timeslot_changelist': 7,
+    'admin:reservations_specialdate_changelist': 9,
+    'admin:reservations_restaurantinfo_changelist': 3,
+    'admin:reservations_notification_changelist': 7,
+    'admin:reservations_customer_changelist': 7,
+    'admin:auth_user_changelist': 8,
+    'admin:auth_group_changelist': 7,
+}
+
+
+
+def clear_process_caches():
+    """Cold caches before each request: budgets cover the first request of a worker"""
+    reset_opening_calendar()
+    clear_occupancy_cache()
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every route of urls.py and every admin changelist, on a dataset seeded by the
+    test at two sizes: a new query, or a query per row (N+1), fails the test.
+    """
+
+    SCALES = (1, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('query-budget', 'budget@example.org', password=None)
+
+    def setUp(self):
+        self.anonymous = Client(SERVER_NAME='localhost')
+        self.staff_client = Client(SERVER_NAME='localhost')
+        self.staff_client.force_login(self.staff)
+        self.addCleanup(clear_process_caches)
+
+    def test_routes_within_budget(self):
+        seeded = 0
+        for scale in self.SCALES:
+            self.seed(scale - seeded)
+            seeded = scale
+            for key, method, path, data, is_staff in self.route_specs():
+                with self.subTest(route=key, scale=scale):
+                    self.assertIn(key, QUERY_BUDGETS, "Route sans budget de requêtes")
+                    self.assertRoute(QUERY_BUDGETS[key], method, path, data, is_staff)
+
+    def assertRoute(self, budget, method, path, data, is_staff):
+        client = self.staff_client if is_staff else self.anonymous
+        clear_process_caches()
+        # Savepoint: each request sees the same seeded data
+        sid = transaction.savepoint()
+        try:
+            # Work deferred to the commit (messages, emails) counts too
+            with self.assertNumQueries(budget), self.captureOnCommitCallbacks(execute=True):
+                response = self.request(client, method, path, data)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)  # streamed rows are queried while sending
+        finally:
+            transaction.savepoint_rollback(sid)
+        self.assertLess(response.status_code, 500)
+
+    # ===== DATASET =====
+
+    def seed(self, scale):
+        """Reservations over -30..+14 days, notifications, special dates (no signals, no email)"""
+        restaurant = get_restaurant_info()
+        slots = list(TimeSlot.objects.filter(is_active=True).order_by('time'))
+        if not slots:
+            slots = TimeSlot.objects.bulk_create([
+                TimeSlot(time=time(hour, 0), max_covers=restaurant.capacity) for hour in (12, 13, 19, 20, 21)
+            ])
+
+        today = timezone.localdate()
+        offset = Reservation.objects.count()
+        reservations = []
+        for index in range(offset, offset + RESERVATIONS_PER_SCALE * scale):
+            guests = index % 6 + 1
+            reservation = Reservation(
+                customer_name=f"{SEED_NAME} {index % 97}",
+                customer_email=f"client{index % 97}@example.org",
+                customer_phone=f"06{index % 97:08d}",
+                date=today + timedelta(days=index % 45 - 30),
+                time=slots[index % len(slots)].time,
+                number_of_guests=guests,
+                duration=default_duration(guests),
+                status=STATUSES[index % len(STATUSES)],
+            )
+            reservation.set_phone_search_keys()  # bulk_create skips save()
+            reservations.append(reservation)
+
+        with reservation_signals_muted():
+            link_customers(reservations)
+            reservations = Reservation.objects.bulk_create(reservations)
+
+        user = User.objects.filter(is_superuser=True).first()
+        Notification.objects.bulk_create([
+            Notification(
+                title=f"Réservation {reservation.customer_name}",
+                message=SEED_MESSAGE,
+                related_reservation=reservation,
+                user=user,
+                email_sent=True,
+                email_sent_at=timezone.now(),
+                email_opened_by_client=index % 3 == 0,
+            )
+            for index, reservation in zip(range(NOTIFICATIONS_PER_SCALE * scale), itertools.cycle(reservations))
+        ])
+
+        first_day = today + timedelta(days=60 + SpecialDate.objects.count())
+        SpecialDate.objects.bulk_create([
+            SpecialDate(date=first_day + timedelta(days=index), is_open=index % 2 == 1, reason="Contrôle des requêtes")
+            for index in range(SPECIAL_DATES_PER_SCALE * scale)
+        ])
+
+    # ===== ROUTES =====
+
+    def route_specs(self):
+        """(key, method, path, data, staff) for every route of urls.py and every admin changelist"""
+        today = timezone.localdate()
+        # Seeded rows only: the measure must not depend on what the database held before
+        reservation = Reservation.objects.filter(
+            customer_name__startswith=SEED_NAME, date__gte=today, status='En attente'
+        ).order_by('pk').first()
+        notification = Notification.objects.filter(message=SEED_MESSAGE).order_by('pk').first()
+        token = notification.tracking_token
+        free = find_available_slots(party_size=2, days=MAX_HORIZON_DAYS, limit=1, start=today + timedelta(days=1))
+        if not free:
+            self.fail("Aucun créneau libre pour mesurer la création de réservation")
+        day, slot_time = free[0]['date'], free[0]['time']
+
+        upload = SimpleUploadedFile(
+            'reservations.csv',
+            b"customer_name,customer_phone,date,time,number_of_guests\n"
+            + f"Client Import,0611223344,{day.isoformat()},{slot_time.strftime('%H:%M')},2\n".encode(),
+            content_type='text/csv',
+        )
+        specs = {
+            'api-test': ('get', {}, None, False),
+            'restaurant-detail': ('get', {}, None, False),
+            'restaurant-info': ('get', {}, None, False),
+            'timeslot-list': ('get', {}, None, False),
+            'reservation-list': ('get', {}, None, False),
+            'reservation-create': ('post', {}, {
+                'customer_name': 'Client Budget', 'customer_email': 'budget@example.org',
+                'customer_phone': '0600000000', 'date': day.isoformat(),
+                'time': slot_time.strftime('%H:%M'), 'number_of_guests': 2,
+            }, False),
+            'reservation-detail': ('get', {'pk': reservation.pk}, None, False),
+            'check-availability-by-date': ('get', {}, {'date': day.isoformat()}, False),
+            'next-available-slots': ('get', {}, {'guests': 2, 'days': 14, 'limit': 5}, False),
+            'check-availability': ('get', {}, {'date': day.isoformat(), 'time': slot_time.strftime('%H:%M'), 'guests': 2}, False),
+            'special-dates-list': ('get', {}, None, False),
+            'verify-email-exists': ('post', {}, {'email': 'client@gmail.com'}, False),
+            'verify-email-lightweight': ('post', {}, {'email': 'client@gmail.com'}, False),
+            'verify-emails-bulk': ('post', {}, {'emails': ['a@gmail.com', 'b@gmail.com']}, False),
+            'email_tracking': ('get', {'token': token}, None, False),
+            'email_tracking_action': ('get', {'token': token, 'action': 'pixel'}, None, False),
+            'timezone-debug': ('get', {}, None, False),
+            'reservation-export': ('get', {}, {'format': 'csv'}, True),
+            'reservation-import': ('multipart', {}, {'file': upload, 'format': 'csv'}, True),
+            'customer-lookup': ('get', {}, {'phone': reservation.customer_phone}, True),
+            'update-reservation-status': ('post', {'reservation_id': reservation.pk}, {'status': 'Confirmée'}, True),
+            'email_tracking_stats': ('get', {}, None, True),
+            'notification_list': ('get', {}, None, True),
+            'mark_notification_read': ('post', {'notification_id': notification.pk}, {}, True),
+            'mark_all_notifications_read': ('post', {}, {}, True),
+            'email_analytics_summary': ('get', {}, None, True),
+            'email_tracking_details': ('get', {'notification_id': notification.pk}, None, True),
+            'dashboard-stats': ('get', {}, None, True),
+            'prometheus-metrics': ('get', {}, None, True),
+            'profiles-list': ('get', {}, None, True),
+            'profile-download': ('get', {'name': 'missing.collapsed'}, None, True),
+            'dashboard_api_metrics': ('get', {}, None, True),
+            'dashboard_api_recent': ('get', {}, None, True),
+            'test_email_tracking': ('post', {}, {'reservation_id': reservation.pk}, True),
+            'cleanup_old_data': ('post', {}, {'days': 3650}, True),
+            'archived_months': ('get', {}, None, True),
+            'archived_reservations': ('get', {'year': today.year - 5, 'month': 1}, None, True),
+            'test_gmail_basic': ('post', {}, {}, False),
+            'test_email_utils': ('post', {}, {}, False),
+            'test_tracking_url': ('post', {}, {}, False),
+            'test_full_email_flow': ('post', {}, {}, False),
+            'debug_email_settings': ('get', {}, None, False),
+            'check_failed_emails': ('get', {}, None, False),
+            'quick_gmail_test': ('post', {}, {}, False),
+        }
+
+        routes = []
+        for pattern in get_resolver().url_patterns:
+            if isinstance(pattern, URLResolver):
+                continue  # admin: index and changelists below
+            key = pattern.name or str(pattern.pattern)
+            if key not in specs:
+                if pattern.name:
+                    self.fail(f"Route sans scénario de mesure: {key} (ajouter à route_specs et QUERY_BUDGETS)")
+                routes.append((key, 'get', '/' + str(pattern.pattern), None, False))
+                continue
+            method, kwargs, data, staff = specs[key]
+            routes.append((key, method, reverse(key, kwargs=kwargs), data, staff))
+
+        routes.append(('admin:index', 'get', reverse('admin:index'), None, True))
+        for model in admin.site._registry:
+            key = f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            routes.append((key, 'get', reverse(key), None, True))
+        return routes
+
+    def request(self, client, method, path, data):
+        if method == 'get':
+            return client.get(path, data or {})
+        if method == 'multipart':
+            data['file'].seek(0)
+            return client.post(path, data)
+        return client.post(path, json.dumps(data or {}), content_type='application/json')
@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+
+from reservations.models import Notification
+from reservations.tests.test_notification_queries import seed_notifications
+from reservations.utils.retention import run_retention
+
+
+class RetentionEligibilityTests(TestCase):
+    """Notifications read through the inbox (watermark / receipts) age out like the shared flag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', password=None)
+        seed_notifications(4, cls.staff)
+
+    def age(self, days, **filters):
+        """Move created_at (and the email activity) days back"""
+        past = timezone.now() - timedelta(days=days)
+        Notification.objects.filter(**filters).update(
+            created_at=past, email_sent_at=past, email_opened_at=None
+        )
+
+    def test_marked_read_in_the_inbox(self):
+        self.age(60)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.post(reverse('mark_all_notifications_read')).status_code, 200)
+        recent = Notification.objects.create(user=self.staff, title="Récente", message="Moins de 30 jours")
+        Notification.mark_all_as_read(user=self.staff)
+
+        stats = run_retention('notifications', days=30, pause=0)
+        self.assertEqual(stats['deleted'], 4)
+        self.assertEqual(list(Notification.objects.all()), [recent])
+
+    def test_unread_notifications_are_kept(self):
+        self.age(60)
+        self.assertEqual(run_retention('notifications', days=30, pause=0)['deleted'], 0)
+        self.assertEqual(run_retention('tracking', days=30, pause=0)['deleted'], 0)
+
+    def test_receipt_read_time_counts(self):
+        self.age(200)
+        old, recent = Notification.objects.order_by('pk')[:2]
+        old.mark_as_read(user=self.staff)
+        recent.mark_as_read(user=self.staff)
+        old.receipts.update(read_at=timezone.now() - timedelta(days=100))
+
+        stats = run_retention('tracking', days=90, pause=0)
+        self.assertEqual(stats['deleted'], 1)
+        self.assertFalse(Notification.objects.filter(pk=old.pk).exists())
+
+    def test_shared_flag_still_counts(self):
+        self.age(60)
+        Notification.objects.update(is_read=True, read_at=timezone.now() - timedelta(days=40))
+        self.assertEqual(Notification.cleanup_old_messages(days=30), 4)
@@ -0,0 +1,34 @@
+from django.test import TestCase
+from datetime import date, time
+
+from reservations.models import Reservation
+from reservations.signals import reservation_signals_muted
+from reservations.utils.search import customer_search_q
+
+
+class CustomerSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with reservation_signals_muted():
+            for name, phone in (("Karim Alaoui", "06 12 34 56 78"), ("Sara Bennani", "+212 700000000")):
+                Reservation.objects.create(
+                    customer_name=name, customer_phone=phone, date=date(2026, 1, 9), time=time(20, 0), number_of_guests=2
+                )
+
+    def search(self, term):
+        return sorted(Reservation.objects.filter(customer_search_q(term)).values_list('customer_name', flat=True))
+
+    def test_phone_prefix_and_suffix(self):
+        self.assertEqual(self.search("0612"), ["Karim Alaoui"])
+        self.assertEqual(self.search("+212 612345678"), ["Karim Alaoui"])
+        self.assertEqual(self.search("5678"), ["Karim Alaoui"])
+
+    def test_phone_term_without_significant_digits(self):
+        # Nothing left once the leading zeros are dropped: no clause matching every row
+        self.assertEqual(self.search("000"), [])
+        self.assertEqual(self.search("+000"), [])
+        self.assertEqual(self.search("0000"), ["Sara Bennani"])  # number ending in 0000
+
+    def test_name_words(self):
+        self.assertEqual(self.search("sara benn"), ["Sara Bennani"])
@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from io import StringIO
+from pathlib import Path
+import json
+import tempfile
+import uuid
+
+from reservations.utils.traffic import anonymize_path, has_pseudonymous_token
+
+
+class ReplayTrackingTests(SimpleTestCase):
+    """Tracking URLs carry pseudonymous tokens: skipped by replay_traffic unless asked for"""
+
+    def setUp(self):
+        self.capture = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'traffic.jsonl'
+        token_path = anonymize_path(f"/track/{uuid.uuid4()}/pixel/")
+        self.assertTrue(has_pseudonymous_token(token_path))
+        self.assertFalse(has_pseudonymous_token('/api/timeslots/'))
+        self.capture.write_text('\n'.join(json.dumps({
+            't': index, 'method': 'GET', 'path': path, 'route': None, 'query': {}, 'status': 200,
+        }) for index, path in enumerate(['/api/timeslots/', token_path])))
+
+    def replay(self, *args):
+        output = StringIO()
+        # Nothing listens on port 9: each request fails at once (status 0)
+        call_command('replay_traffic', str(self.capture), '--url', 'http://127.0.0.1:9', '--speed', '0', *args, stdout=output)
+        return output.getvalue()
+
+    def test_tracking_requests_skipped(self):
+        output = self.replay()
+        self.assertIn("1 requêtes de suivi ignorées", output)
+        self.assertIn("📊 1 requêtes", output)
+
+    def test_include_tracking(self):
+        output = self.replay('--include-tracking')
+        self.assertNotIn("ignorées", output)
+        self.assertIn("📊 2 requêtes", output)
@@ -0,0 +1,186 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+import gzip
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+DEFAULT_BATCH_SIZE = 500
+
+MONTH_FILE_RE = re.compile(r'^(\d{4})-(\d{2})\.jsonl\.gz$')
+
+
+def get_archive_setting(key, default):
+    """Read a value from settings.RESERVATION_ARCHIVE_SETTINGS with a fallback"""
+    return getattr(settings, 'RESERVATION_ARCHIVE_SETTINGS', {}).get(key, default)
+
+
+def get_archive_dir():
+    """Folder holding the monthly reservation archives"""
+    base = get_archive_setting('ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archives')
+    return Path(base) / 'reservations'
+
+
+def archive_path(year, month):
+    """Archive file of a month: <ARCHIVE_DIR>/reservations/YYYY-MM.jsonl.gz"""
+    return get_archive_dir() / f"{year:04d}-{month:02d}.jsonl.gz"
+
+
+# ===== WRITE =====
+
+def serialize_reservation(reservation, notifications):
+    """One archive line: the reservation columns plus its notifications"""
+    record = {field.attname: getattr(reservation, field.attname) for field in reservation._meta.concrete_fields}
+    record['notifications'] = notifications
+    return record
+
+
+def append_records(year, month, records):
+    """Append records to the month file (new gzip member, fsync'ed before returning)"""
+    path = archive_path(year, month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+            for record in records:
+                line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+                archive.write((line + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_reservations(days=None, before=None, batch_size=None, dry_run=False, progress=None):
+    """
+    Move reservations dated before the horizon (and their notifications) to the archives.
+
+    Works in primary-key-ordered chunks: a chunk is written to its month files first,
+    then deleted from the database in one transaction with the reservation signals
+    muted (no cancellation emails). If a run stops between the two steps the rows are
+    archived again next time; readers skip the duplicated ids.
+    """
+    from ..models import Reservation, Notification
+    from ..signals import reservation_signals_muted
+
+    if before is None:
+        if days is None:
+            days = get_archive_setting('ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+        before = timezone.localdate() - timedelta(days=int(days))
+    batch_size = batch_size or get_archive_setting('BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    queryset = Reservation.objects.filter(date__lt=before).order_by('pk')
+    stats = {
+        'before': before.isoformat(),
+        'reservations': 0,
+        'notifications': 0,
+        'batches': 0,
+        'months': set(),
+    }
+    last_pk = 0
+
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        ids = [reservation.pk for reservation in batch]
+        last_pk = ids[-1]
+
+        # All notifications of the chunk in one query
+        notifications = defaultdict(list)
+        for row in Notification.objects.filter(related_reservation_id__in=ids).order_by('pk').values():
+            notifications[row['related_reservation_id']].append(row)
+
+        by_month = defaultdict(list)
+        for reservation in batch:
+            by_month[(reservation.date.year, reservation.date.month)].append(
+                serialize_reservation(reservation, notifications.get(reservation.pk, []))
+            )
+
+        if not dry_run:
+            for (year, month), records in by_month.items():
+                append_records(year, month, records)
+
+            with transaction.atomic(), reservation_signals_muted():
+                Notification.objects.filter(related_reservation_id__in=ids).delete()
+                Reservation.objects.filter(pk__in=ids).delete()
+
+        stats['reservations'] += len(batch)
+        stats['notifications'] += sum(len(rows) for rows in notifications.values())
+        stats['batches'] += 1
+        stats['months'].update(f"{year:04d}-{month:02d}" for year, month in by_month)
+
+        logger.info(
+            f"Archive: batch {stats['batches']} moved {len(batch)} reservations "
+            f"(total {stats['reservations']}, last_pk {last_pk})"
+        )
+        if progress:
+            progress(stats)
+
+    stats['months'] = sorted(stats['months'])
+    return stats
+
+
+# ===== READ =====
+
+def list_archived_months():
+    """Archived months, most recent first"""
+    archive_dir = get_archive_dir()
+    if not archive_dir.exists():
+        return []
+
+    months = []
+    for path in archive_dir.iterdir():
+        match = MONTH_FILE_RE.match(path.name)
+        if match:
+            months.append({
+                'year': int(match.group(1)),
+                'month': int(match.group(2)),
+                'size_bytes': path.stat().st_size,
+            })
+    return sorted(months, key=lambda m: (m['year'], m['month']), reverse=True)
+
+
+def iter_archived_month(year, month):
+    """Stream the archived reservations of a month (duplicated ids are skipped)"""
+    path = archive_path(year, month)
+    if not path.exists():
+        raise FileNotFoundError(f"No archive for {year:04d}-{month:02d}")
+
+    seen = set()
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            record = json.loads(line)
+            if record['id'] in seen:
+                continue
+            seen.add(record['id'])
+            yield record
+
+
+def search_archived_month(year, month, status=None, search='', notifications=False):
+    """Archived reservations of a month matching status / search (lazy, one line at a time)"""
+    search = (search or '').strip().lower()
+    for record in iter_archived_month(year, month):
+        if status and record['status'] != status:
+            continue
+        if search and not any(
+            search in (record.get(field) or '').lower()
+            for field in ('customer_name', 'customer_email', 'customer_phone')
+        ):
+            continue
+        if not notifications:
+            record.pop('notifications', None)
+        yield record
+
+
+def stream_archived_month(records):
+    """JSON lines of records, for a StreamingHttpResponse"""
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -0,0 +1,75 @@
+from django.utils import timezone
+from datetime import datetime, timedelta
+import logging
+
+from .occupancy import default_duration, get_occupancy
+from .opening_calendar import get_opening_calendar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZON_DAYS = 7
+MAX_HORIZON_DAYS = 366
+MAX_RESULTS = 50
+
+
+def find_available_slots(party_size=1, days=DEFAULT_HORIZON_DAYS, limit=1, start=None, lead_minutes=0):
+    """
+    First `limit` slots that can take a party of `party_size` within `days` days.
+
+    Opening days/slots come from the compiled calendar, bookings from the
+    precomputed occupancy (one query over the window when it is not cached). A slot
+    is free when its covers (max_covers, optional max_reservations) take the party
+    and a table and enough seats stay free for its whole stay - parties seated
+    earlier and still at the table count (see occupancy.DayOccupancy).
+    Today's slots starting within `lead_minutes` are skipped.
+    """
+    from ..models import get_restaurant_info
+
+    now = timezone.localtime(timezone.now())
+    start = start or now.date()
+    end = start + timedelta(days=days - 1)
+    earliest = (now + timedelta(minutes=lead_minutes)).replace(tzinfo=None)
+
+    calendar = get_opening_calendar()
+    restaurant = get_restaurant_info()
+    duration = default_duration(party_size)
+    occupancy = get_occupancy(start, end)
+
+    results = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for slot in calendar.open_slots(day):
+            if datetime.combine(day, slot.time) <= earliest:
+                continue
+            available_covers = occupancy[day].slot_available_covers(
+                slot, party_size, restaurant.capacity, restaurant.number_of_tables, duration
+            )
+            if available_covers < party_size:
+                continue
+            results.append({
+                'date': day,
+                'time': slot.time,
+                'time_id': slot.pk,
+                'available_spots': available_covers,
+            })
+            if len(results) >= limit:
+                return results
+    return results
+
+
+def describe_slot(day, slot_time, today=None):
+    """Short label for the dashboard: 'Aujourd'hui 19:00', 'Demain 12:00', '24/10 à 20:00'"""
+    today = today or timezone.localdate()
+    if day == today:
+        return f"Aujourd'hui {slot_time.strftime('%H:%M')}"
+    if day == today + timedelta(days=1):
+        return f"Demain {slot_time.strftime('%H:%M')}"
+    return f"{day.strftime('%d/%m')} à {slot_time.strftime('%H:%M')}"
+
+
+def next_available_label(lead_minutes=0, days=DEFAULT_HORIZON_DAYS):
+    """Dashboard text of the next free slot (3 queries at most)"""
+    slots = find_available_slots(days=days, limit=1, lead_minutes=lead_minutes)
+    if not slots:
+        return "Aucun créneau disponible cette semaine"
+    return describe_slot(slots[0]['date'], slots[0]['time'])
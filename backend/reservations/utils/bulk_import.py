@@ -0,0 +1,285 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from datetime import datetime
+import csv
+import json
+import logging
+import time
+
+from .occupancy import ACTIVE_STATUSES, default_duration, load_days, lock_day
+from .opening_calendar import OpeningCalendar, get_opening_calendar
+from .content_versions import bump_version
+from .customers import HistoryAccumulator, save_history
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+NOTIFY_MODES = ('none', 'summary', 'each')
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+REQUIRED_FIELDS = ['customer_name', 'customer_phone', 'date', 'time', 'number_of_guests']
+
+
+# ===== PARSING =====
+
+def detect_format(filename, default='csv'):
+    """csv or jsonl from the file extension"""
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format='csv'):
+    """(line number, dict) pairs from a text stream - CSV (',' or ';') or JSON Lines"""
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, {'__error__': f"JSON invalide: {e}"}
+                continue
+            yield line_number, row if isinstance(row, dict) else {'__error__': "Objet JSON attendu"}
+        return
+
+    header = stream.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    fieldnames = next(csv.reader([header], delimiter=delimiter))
+    fieldnames = [name.strip().lstrip('\ufeff') for name in fieldnames]
+    for line_number, row in enumerate(csv.DictReader(stream, fieldnames=fieldnames, delimiter=delimiter), start=2):
+        yield line_number, row
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ===== VALIDATION =====
+
+def clean_row(row, valid_statuses):
+    """Parse one raw row - returns (values, errors)"""
+    if '__error__' in row:
+        return None, [row['__error__']]
+
+    row = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+    errors = [f"{field} is required" for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+    if errors:
+        return None, errors
+
+    values = {
+        'customer_name': str(row['customer_name'])[:100],
+        'customer_phone': str(row['customer_phone']),
+        'customer_email': row.get('customer_email') or None,
+        'special_requests': row.get('special_requests') or '',
+        'status': row.get('status') or 'En attente',
+    }
+
+    try:
+        values['date'] = datetime.strptime(str(row['date']), '%Y-%m-%d').date()
+    except ValueError:
+        errors.append("date must be YYYY-MM-DD")
+    try:
+        values['time'] = datetime.strptime(str(row['time'])[:5], '%H:%M').time()
+    except ValueError:
+        errors.append("time must be HH:MM")
+    try:
+        values['number_of_guests'] = int(row['number_of_guests'])
+        if not 1 <= values['number_of_guests'] <= 20:
+            errors.append("number_of_guests must be between 1 and 20")
+    except (TypeError, ValueError):
+        errors.append("number_of_guests must be an integer")
+
+    if len(values['customer_phone']) > 20:
+        errors.append("customer_phone is too long (20 max)")
+    if values['customer_email']:
+        try:
+            validate_email(values['customer_email'])
+        except ValidationError:
+            errors.append(f"invalid email: {values['customer_email']}")
+    if values['status'] not in valid_statuses:
+        errors.append(f"invalid status: {values['status']}")
+    if row.get('table_number') not in (None, ''):
+        try:
+            values['table_number'] = int(row['table_number'])
+        except (TypeError, ValueError):
+            errors.append("table_number must be an integer")
+
+    return values, errors
+
+
+class CapacityTracker:
+    """
+    Opening rules (closed weekdays, closures, special hours) from the opening calendar,
+    capacity like the booking form: slot limits plus seats and tables over the whole
+    stay (DayOccupancy), updated as rows are accepted.
+    """
+
+    def __init__(self):
+        self.calendar = get_opening_calendar()
+        self.occupancy = {}
+
+    def load(self, dates):
+        """Restaurant and bookings of the batch dates (one query each) - read under lock_day"""
+        from ..models import get_restaurant_info
+        dates = set(dates)
+        if not dates:
+            return
+        if min(dates) < self.calendar.start:
+            # History imports: the shared calendar only knows special dates from today on
+            self.calendar = OpeningCalendar.build(start=min(dates))
+
+        self.restaurant = get_restaurant_info()
+        self.occupancy = load_days(dates)
+
+    def check(self, values):
+        """Error message if the row does not fit, else None (and the seats are taken)"""
+        if not self.calendar.is_open(values['date']):
+            return "Restaurant fermé ce jour-là"
+        slot = self.calendar.get_slot(values['date'], values['time'])
+        if slot is None:
+            return "Selected time slot is not available"
+
+        if values['status'] in ACTIVE_STATUSES:
+            occupancy = self.occupancy[values['date']]
+            guests = values['number_of_guests']
+            duration = default_duration(guests)
+            if not slot.accepts(*occupancy.slot_usage(values['time']), guests=guests):
+                return "This time slot is fully booked"
+            if not occupancy.fits(values['time'], guests, self.restaurant.capacity,
+                                  self.restaurant.number_of_tables, duration):
+                return "Not enough seats left at this time"
+            occupancy.add(values['time'], duration, guests)
+        return None
+
+
+# ===== IMPORT =====
+
+def import_reservations(stream, file_format='csv', notify='none', dry_run=False,
+                        batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Validate and insert reservations in batches with bulk_create.
+
+    bulk_create does not fire the model signals, so no per-row message or email is
+    produced. notify='summary' writes one admin message at the end, notify='each'
+    replays the usual new-reservation message (and pending email) after the commit.
+    Returns a report with per-row errors (line numbers of the source file).
+    """
+    from ..models import Reservation, Notification
+
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {file_format}")
+    if notify not in NOTIFY_MODES:
+        raise ValueError(f"notify must be one of {', '.join(NOTIFY_MODES)}")
+
+    started = time.monotonic()
+    valid_statuses = {value for value, _ in Reservation.STATUS_CHOICES}
+    capacity = CapacityTracker()
+    report = {'total': 0, 'created': 0, 'rejected': 0, 'errors': [], 'dry_run': dry_run, 'notify': notify}
+    created_ids = []
+
+    for batch in batched(iter_rows(stream, file_format), batch_size):
+        cleaned = []
+        for line_number, row in batch:
+            values, errors = clean_row(row, valid_statuses)
+            cleaned.append((line_number, values, errors))
+
+        dates = sorted({values['date'] for _, values, errors in cleaned if not errors})
+        to_create = []
+        with transaction.atomic():
+            if not dry_run:
+                # Same lock as the booking form, taken in date order: no overbooking
+                # against reservations made while the import runs
+                for day in dates:
+                    lock_day(day)
+            capacity.load(dates)
+
+            for line_number, values, errors in cleaned:
+                if not errors:
+                    capacity_error = capacity.check(values)
+                    if capacity_error:
+                        errors = [capacity_error]
+                if errors:
+                    report['errors'].append({'line': line_number, 'errors': errors})
+                    continue
+                reservation = Reservation(**values)
+                reservation.set_phone_search_keys()  # bulk_create skips save()
+                reservation.duration = reservation.duration or default_duration(reservation.number_of_guests)
+                to_create.append(reservation)
+
+            if to_create and not dry_run:
+                link_customers(to_create)
+                objs = Reservation.objects.bulk_create(to_create)
+                bump_version('reservations')  # bulk_create sends no post_save
+                if notify == 'each':
+                    created_ids.extend(obj.pk for obj in objs)
+
+        report['total'] += len(batch)
+        report['rejected'] = len(report['errors'])
+        report['created'] += len(to_create)
+
+        if progress:
+            progress(report)
+
+    report['elapsed'] = round(time.monotonic() - started, 3)
+    if dry_run or not report['created']:
+        return report
+
+    if notify == 'summary':
+        Notification.create_simple_message(
+            title=f"📥 Import - {report['created']} réservations",
+            message=(
+                f"{report['created']} réservations importées, {report['rejected']} lignes rejetées "
+                f"sur {report['total']}."
+            ),
+            message_type='info',
+            priority='urgent' if report['rejected'] else 'info',
+        )
+    elif notify == 'each':
+        send_deferred_messages(created_ids)
+
+    logger.info(
+        f"Import: {report['created']} created, {report['rejected']} rejected "
+        f"of {report['total']} rows in {report['elapsed']}s"
+    )
+    return report
+
+
+def link_customers(reservations):
+    """Attach the batch to its clients and add it to their history (bulk_create skips save())"""
+    history = HistoryAccumulator()
+    keys = [
+        history.add(r.customer_name, r.customer_phone, r.customer_email, r.status, r.date)
+        for r in reservations
+    ]
+    customer_ids = save_history(history, absolute=False)
+    for reservation, key in zip(reservations, keys):
+        if key is not None:
+            reservation.customer_id = customer_ids.get(key)
+
+
+def send_deferred_messages(reservation_ids, chunk_size=500):
+    """Usual new-reservation message + pending email for imported rows, after the insert"""
+    from ..models import Reservation
+    from ..signals import handle_new_reservation_message
+
+    admin_user = User.objects.filter(is_superuser=True).first()
+    if not admin_user:
+        logger.warning("No admin user found for import messages")
+        return
+
+    for start in range(0, len(reservation_ids), chunk_size):
+        for reservation in Reservation.objects.filter(pk__in=reservation_ids[start:start + chunk_size]):
+            handle_new_reservation_message(reservation, admin_user)
@@ -0,0 +1,98 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.views.decorators.http import condition
+from datetime import datetime, time, timezone as dt_timezone
+from functools import wraps
+import hashlib
+import uuid
+
+# Content whose version backs the ETag / Last-Modified of the public read endpoints
+VERSIONED_CONTENT = ('restaurant', 'timeslots', 'special_dates', 'reservations')
+
+VERSION_KEY_PREFIX = 'content_version'
+
+
+def get_version_cache():
+    """Cache holding the versions - must be shared by every worker (settings.CONTENT_VERSION_CACHE)"""
+    return caches[getattr(settings, 'CONTENT_VERSION_CACHE', 'default')]
+
+
+def new_version():
+    return {'token': uuid.uuid4().hex, 'modified': timezone.now().timestamp()}
+
+
+def get_version(name):
+    """Current {'token', 'modified'} of a content - created on first use (cache lookup only)"""
+    cache = get_version_cache()
+    key = f"{VERSION_KEY_PREFIX}:{name}"
+    version = cache.get(key)
+    if version is None:
+        # Unknown (cold or evicted cache): start a new version, clients simply refetch once
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key) or new_version()
+    return version
+
+
+def bump_version(*names):
+    """New version for the given contents, applied once the current transaction commits"""
+    def apply():
+        get_version_cache().set_many(
+            {f"{VERSION_KEY_PREFIX}:{name}": new_version() for name in names}, timeout=None
+        )
+    transaction.on_commit(apply)
+
+
+# ===== CONDITIONAL GET =====
+
+def conditional_content(names, daily=False):
+    """
+    ETag + Last-Modified for a read view built only from versioned content.
+
+    names is a tuple of VERSIONED_CONTENT entries (or a callable(request) returning
+    one). daily=True for views that depend on today's date (occupancy, upcoming
+    dates): the date is part of the ETag and midnight counts as a modification.
+    Repeat requests get a 304 from the cache alone, the view is not called.
+    Async views read the versions (file cache) in a thread, off the event loop.
+    """
+    def content_names(request):
+        return names(request) if callable(names) else names
+
+    def validators(request):
+        """(etag, last modified) from one read of each version"""
+        versions = {name: get_version(name) for name in content_names(request)}
+        parts = [f"{name}:{version['token']}" for name, version in versions.items()]
+        modified = max(version['modified'] for version in versions.values())
+        if daily:
+            parts.append(timezone.localdate().isoformat())
+            midnight = datetime.combine(timezone.localdate(), time.min, tzinfo=timezone.get_current_timezone())
+            modified = max(modified, midnight.timestamp())
+        etag = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+        return etag, datetime.fromtimestamp(int(modified), tz=dt_timezone.utc)
+
+    def request_validators(request):
+        if not hasattr(request, '_content_validators'):
+            request._content_validators = validators(request)
+        return request._content_validators
+
+    def etag_func(request, *args, **kwargs):
+        return request_validators(request)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return request_validators(request)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+        if not iscoroutinefunction(view):
+            return conditional_view
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            request._content_validators = await sync_to_async(validators)(request)
+            return await conditional_view(request, *args, **kwargs)
+        return inner
+
+    return decorator
+
@@ -0,0 +1,160 @@
+from django.conf import settings
+from collections import defaultdict
+import logging
+
+from .phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def get_customer_setting(key, default):
+    """Read a value from settings.CUSTOMER_HISTORY_SETTINGS with a fallback"""
+    return getattr(settings, 'CUSTOMER_HISTORY_SETTINGS', {}).get(key, default)
+
+
+def customer_key(phone, email):
+    """Identity of a client: normalized phone, or the email when there is no usable phone"""
+    phone_key = normalize_phone(phone)
+    if phone_key:
+        return ('phone', phone_key)
+    email = (email or '').strip().lower()
+    if email:
+        return ('email', email)
+    return None
+
+
+class HistoryAccumulator:
+    """Per-client counters built in memory from a stream of reservations"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, name, phone, email, status, day):
+        key = customer_key(phone, email)
+        if key is None:
+            return None
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = {
+                'name': name, 'phone': phone or '', 'email': (email or '').strip().lower() or None,
+                'total': 0, 'cancelled': 0, 'completed': 0, 'last_date': None, 'last_visit': None,
+            }
+        # Latest contact details win
+        entry['name'] = name or entry['name']
+        entry['email'] = (email or '').strip().lower() or entry['email']
+        entry['total'] += 1
+        entry['cancelled'] += status == 'Annulée'
+        entry['completed'] += status == 'Terminée'
+        if entry['last_date'] is None or day > entry['last_date']:
+            entry['last_date'] = day
+        if status == 'Terminée' and (entry['last_visit'] is None or day > entry['last_visit']):
+            entry['last_visit'] = day
+        return key
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def chunks(items, size=LOOKUP_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def find_existing_customers(keys):
+    """key -> Customer for the keys already in the database (chunked IN lookups)"""
+    from ..models import Customer
+
+    phone_keys = [value for kind, value in keys if kind == 'phone']
+    emails = [value for kind, value in keys if kind == 'email']
+    found = {}
+    for chunk in chunks(phone_keys):
+        for customer in Customer.objects.filter(phone_key__in=chunk):
+            found[('phone', customer.phone_key)] = customer
+    for chunk in chunks(emails):
+        for customer in Customer.objects.filter(email__in=chunk).order_by('-pk'):
+            found[('email', customer.email)] = customer
+    return found
+
+
+def save_history(accumulator, absolute=False):
+    """
+    Write accumulated counters - returns key -> customer id.
+
+    New clients are created with bulk_create. Existing clients either get their
+    counters replaced (absolute=True, full rebuild) or incremented (absolute=False,
+    e.g. an import batch, a single UPDATE per chunk of clients).
+    """
+    from ..models import Customer
+
+    existing = find_existing_customers(accumulator.entries.keys())
+    to_create = []
+    to_update = []
+    increments = {}
+    for key, entry in accumulator.entries.items():
+        customer = existing.get(key)
+        if customer is None:
+            to_create.append((key, Customer(
+                phone_key=key[1] if key[0] == 'phone' else None,
+                phone=entry['phone'], email=entry['email'], name=entry['name'],
+                total_reservations=entry['total'],
+                cancelled_reservations=entry['cancelled'],
+                completed_reservations=entry['completed'],
+                last_reservation_date=entry['last_date'],
+                last_visit=entry['last_visit'],
+            )))
+        elif absolute:
+            customer.name = entry['name']
+            customer.email = entry['email'] or customer.email
+            customer.total_reservations = entry['total']
+            customer.cancelled_reservations = entry['cancelled']
+            customer.completed_reservations = entry['completed']
+            customer.last_reservation_date = entry['last_date']
+            customer.last_visit = entry['last_visit']
+            to_update.append(customer)
+        else:
+            increments[customer.pk] = {
+                'total': entry['total'], 'cancelled': entry['cancelled'], 'completed': entry['completed'],
+                'last_date': entry['last_date'], 'last_visit': entry['last_visit'],
+            }
+
+    created = Customer.objects.bulk_create([customer for _, customer in to_create], batch_size=LOOKUP_CHUNK_SIZE)
+    if to_update:
+        Customer.objects.bulk_update(to_update, [
+            'name', 'email', 'total_reservations', 'cancelled_reservations', 'completed_reservations',
+            'last_reservation_date', 'last_visit',
+        ], batch_size=LOOKUP_CHUNK_SIZE)
+    Customer.increment_many(increments)
+
+    ids = {key: customer.pk for key, customer in existing.items()}
+    if created and created[0].pk is None:
+        # Backends without RETURNING: read the new ids back
+        ids.update({key: customer.pk for key, customer in find_existing_customers(
+            [key for key, _ in to_create]).items()})
+    else:
+        ids.update({key: customer.pk for (key, _), customer in zip(to_create, created)})
+    return ids
+
+
+def record_bulk_status_change(queryset, new_status):
+    """Customer counters for queryset.update(status=...) paths (admin actions) - call before the update"""
+    from ..models import Customer
+
+    deltas = defaultdict(lambda: [0, 0, None])
+    rows = queryset.exclude(status=new_status).exclude(customer__isnull=True).values_list('customer_id', 'status', 'date')
+    for customer_id, old_status, day in rows.iterator():
+        cancelled, completed = Customer.status_deltas(old_status, new_status)
+        delta = deltas[customer_id]
+        delta[0] += cancelled
+        delta[1] += completed
+        if new_status == 'Terminée' and (delta[2] is None or day > delta[2]):
+            delta[2] = day
+
+    Customer.increment_many({
+        customer_id: {'cancelled': cancelled, 'completed': completed, 'last_visit': last_visit}
+        for customer_id, (cancelled, completed, last_visit) in deltas.items()
+    })
+    return len(deltas)
@@ -0,0 +1,81 @@
+from django.conf import settings
+import logging
+import threading
+import time
+
+from .metrics import inc, observe
+
+try:
+    import dns.asyncresolver
+    import dns.resolver
+    DNS_AVAILABLE = True
+except ImportError:
+    DNS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600  # Domain with MX records
+DEFAULT_NEGATIVE_TTL_SECONDS = 300  # NXDOMAIN / no MX answer
+DEFAULT_LIFETIME_SECONDS = 5.0  # Total time allowed for one lookup (all nameservers / retries)
+MAX_CACHED_DOMAINS = 5000
+
+
+def get_dns_setting(key, default):
+    """Read a value from settings.EMAIL_DNS_CACHE with a fallback"""
+    return getattr(settings, 'EMAIL_DNS_CACHE', {}).get(key, default)
+
+
+_mx_cache = {}  # domain -> (accepts email, expires at)
+_mx_lock = threading.Lock()
+
+
+def cached_answer(domain):
+    """(found, accepts) from the in-memory cache, counted as a hit or a miss"""
+    with _mx_lock:
+        entry = _mx_cache.get(domain)
+    if entry and entry[1] > time.monotonic():
+        inc('reservations_dns_lookups_total', result='hit')
+        return True, entry[0]
+    inc('reservations_dns_lookups_total', result='miss')
+    return False, None
+
+
+def store_answer(domain, accepts):
+    if accepts:
+        ttl = get_dns_setting('TTL_SECONDS', DEFAULT_TTL_SECONDS)
+    else:
+        ttl = get_dns_setting('NEGATIVE_TTL_SECONDS', DEFAULT_NEGATIVE_TTL_SECONDS)
+    with _mx_lock:
+        if len(_mx_cache) >= MAX_CACHED_DOMAINS:
+            _mx_cache.clear()
+        _mx_cache[domain] = (accepts, time.monotonic() + ttl)
+
+
+async def adomain_accepts_email(domain):
+    """
+    True if the domain has MX records, False on NXDOMAIN / no answer.
+
+    Answers are kept in memory (TTL in EMAIL_DNS_CACHE) so the verification
+    endpoints do not resolve the same domain on every keystroke. Other DNS errors
+    (timeouts...) are raised and not cached. Async (dns.asyncresolver): the worker
+    keeps serving while lookups are in flight; a cancelled lookup (client gone)
+    raises CancelledError and caches nothing.
+    """
+    domain = domain.lower()
+    found, accepts = cached_answer(domain)
+    if found:
+        return accepts
+
+    started = time.perf_counter()
+    try:
+        await dns.asyncresolver.resolve(
+            domain, 'MX', lifetime=get_dns_setting('LIFETIME_SECONDS', DEFAULT_LIFETIME_SECONDS)
+        )
+        accepts = True
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        accepts = False
+    finally:
+        observe('reservations_dns_lookup_duration_seconds', time.perf_counter() - started)
+
+    store_answer(domain, accepts)
+    return accepts
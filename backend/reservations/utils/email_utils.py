@@ -6,6 +6,9 @@ from django.core.validators import validate_email
 import logging
 import re
 
+from .metrics import inc
+from .request_metrics import timed
+
 logger = logging.getLogger(__name__)
 
 def check_email_blacklist(email):
@@ -60,8 +63,14 @@ def validate_email_address_properly(email):
     except Exception as e:
         return False, f"Email validation error: {str(e)}"
 
+@timed('email')
 def send_mail_with_proper_error_handling(subject, message, from_email, recipient_list):
     """Send mail with basic validation only"""
+    success, detail = _send_validated_mail(subject, message, from_email, recipient_list)
+    inc('reservations_emails_total', result='success' if success else 'failure')
+    return success, detail
+
+def _send_validated_mail(subject, message, from_email, recipient_list):
     try:
         # Basic validation for all recipients
         for email in recipient_list:
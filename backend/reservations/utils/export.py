@@ -0,0 +1,190 @@
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime, date, time
+from xml.sax.saxutils import escape
+import csv
+import re
+import zipfile
+
+# (header, field) - exported through values_list(), no model instances are built
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Client', 'customer_name'),
+    ('Email', 'customer_email'),
+    ('Téléphone', 'customer_phone'),
+    ('Date', 'date'),
+    ('Heure', 'time'),
+    ('Personnes', 'number_of_guests'),
+    ('Statut', 'status'),
+    ('Table', 'table_number'),
+    ('Demandes spéciales', 'special_requests'),
+    ('Créée le', 'created_at'),
+    ('Confirmée le', 'confirmed_at'),
+    ('Annulée le', 'cancelled_at'),
+]
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# A text cell starting with one of these is read as a formula by spreadsheets (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Characters not allowed in XML 1.0 (control chars from copy/pasted special requests)
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Rows as plain tuples, read from the database in chunks (server-side cursor on PostgreSQL)"""
+    fields = [field for _, field in EXPORT_COLUMNS]
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def format_cell(value):
+    """Text value of a cell (dates in local time, None as empty)"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%d/%m/%Y %H:%M') if timezone.is_aware(value) else value.strftime('%d/%m/%Y %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%d/%m/%Y')
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    return str(value)
+
+
+# ===== CSV =====
+
+class Echo:
+    """File-like object that hands back what is written (csv.writer -> generator)"""
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    """format_cell() for CSV: customer text starting like a formula is quoted with a leading '"""
+    text = format_cell(value)
+    if isinstance(value, str) and text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo(), delimiter=';')
+    # BOM so Excel opens the accents correctly
+    yield '\ufeff' + writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+# ===== XLSX =====
+
+class StreamBuffer:
+    """Unseekable output for zipfile: written bytes are collected then handed to the response"""
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Réservations" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_row(values):
+    """One <row>: numbers as numeric cells, everything else as inline strings (never read as formulas)"""
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(INVALID_XML_CHARS.sub('', format_cell(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return '<row>' + ''.join(cells) + '</row>'
+
+
+def stream_xlsx(rows, rows_per_chunk=500):
+    """
+    Minimal XLSX workbook written as a zip stream.
+
+    The sheet uses inline strings (no shared string table), so nothing has to be kept
+    in memory: each batch of rows is compressed and sent as soon as it is produced.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_STATIC_PARTS.items():
+            workbook.writestr(name, content)
+        yield buffer.pop()
+
+        with workbook.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + xlsx_row([header for header, _ in EXPORT_COLUMNS])
+            ).encode('utf-8'))
+
+            pending = []
+            for row in rows:
+                pending.append(xlsx_row(row))
+                if len(pending) >= rows_per_chunk:
+                    sheet.write(''.join(pending).encode('utf-8'))
+                    pending = []
+                    yield buffer.pop()
+            sheet.write((''.join(pending) + '</sheetData></worksheet>').encode('utf-8'))
+        yield buffer.pop()
+    yield buffer.pop()
+
+
+def export_reservations_response(queryset, export_format='csv', filename=None):
+    """StreamingHttpResponse exporting the reservations of a queryset (csv or xlsx)"""
+    if export_format not in EXPORT_CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    rows = iter_export_rows(queryset)
+    content = stream_xlsx(rows) if export_format == 'xlsx' else stream_csv(rows)
+    filename = filename or f"reservations_{timezone.localdate().strftime('%Y%m%d')}"
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
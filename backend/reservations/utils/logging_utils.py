@@ -0,0 +1,131 @@
+from logging.handlers import QueueHandler, QueueListener
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+DEFAULT_QUEUE_SIZE = 10000
+
+EXCEPTION_FORMATTER = logging.Formatter()
+
+# Attributes of every LogRecord - anything else was passed with extra={...}
+STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Asynchronous sink: the request thread only puts the record on a queue, a
+    QueueListener thread writes it to the `targets` handlers - workers no longer
+    wait on stdout/files while serving. Declared with '()' in LOGGING (the 'class'
+    form of QueueHandler subclasses is handled specially by dictConfig on Python
+    3.12+), targets given as 'cfg://handlers.<name>' references. dictConfig builds
+    the handlers in name order: the targets' names must sort before this one's.
+
+    The listener starts on the first record of each process (gunicorn workers are
+    forked after settings are loaded, threads do not survive a fork). When the
+    queue is full, records are dropped and counted instead of blocking the request.
+    """
+
+    def __init__(self, targets=(), queue_size=DEFAULT_QUEUE_SIZE):
+        super().__init__(queue.Queue(queue_size))
+        # Indexing resolves the cfg:// references (iterating a dictConfig list does not)
+        targets = [targets[index] for index in range(len(targets))]
+        invalid = [target for target in targets if not isinstance(target, logging.Handler)]
+        if invalid:
+            raise ValueError(f"Targets {invalid} are not configured handlers (cfg://handlers.<name>, sorted before this one)")
+        self.targets = targets
+        self.listener = None
+        self.listener_pid = None
+        self.start_lock = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        Copy put on the queue: message merged with its args, exception formatted to
+        exc_text (QueueHandler.prepare() would format the whole record with this
+        handler's formatter and drop the exception, so JsonFormatter lost it).
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None  # the traceback keeps every frame alive while queued
+        return record
+
+    def start_listener(self):
+        with self.start_lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue.maxsize)  # the parent's queue may hold stale records
+            self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self.listener.start()
+            self.listener_pid = os.getpid()
+
+    def emit(self, record):
+        if self.listener_pid != os.getpid():
+            self.start_listener()
+        super().emit(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Called by logging.shutdown() at exit: drain the queue first
+        if self.listener is not None and self.listener_pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self.listener_pid = None
+        super().close()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep `rates[prefix]` (0..1) of the DEBUG records of the loggers under each
+    prefix (longest prefix wins), `default_rate` for the others.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.prefixes = sorted(self.rates, key=len, reverse=True)
+
+    def rate_for(self, name):
+        for prefix in self.prefixes:
+            if name == prefix or name.startswith(prefix + '.'):
+                return self.rates[prefix]
+        return self.default_rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """{"time", "level", "logger", "message", <extra fields>, "exception"} on one line"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
@@ -0,0 +1,278 @@
+from django.conf import settings
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows (runserver): single process, nothing to serialize
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_FLUSH_SECONDS = 5
+
+# Totals of the workers that exited (their <pid>.json files are folded into it)
+RETIRED_FILE = 'retired.json'
+
+METRIC_HELP = {
+    'reservations_http_requests_total': 'HTTP requests by view, method and status',
+    'reservations_http_request_duration_seconds': 'HTTP request latency by view',
+    'reservations_signals_duration_seconds': 'Signal receiver latency',
+    'reservations_email_duration_seconds': 'Email sending latency',
+    'reservations_emails_total': 'Emails sent, by result',
+    'reservations_dns_lookups_total': 'MX lookups of email verification, by cache result',
+    'reservations_dns_lookup_duration_seconds': 'MX lookup latency (cache misses)',
+    'reservations_email_tracking_total': 'Tracked email opens/clicks, by action',
+}
+
+
+def get_metrics_export_setting(key, default):
+    """Read a value from settings.METRICS with a fallback"""
+    return getattr(settings, 'METRICS', {}).get(key, default)
+
+
+def scrape_token_is_valid(request):
+    """Authorization: Bearer <METRICS['TOKEN']> of a Prometheus scrape (never valid when no token is set)"""
+    token = get_metrics_export_setting('TOKEN', '')
+    scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(value.strip(), token)
+
+
+def metric_key(name, labels):
+    """Hashable key of a series: (name, ((label, value), ...)) sorted by label"""
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of this process.
+
+    Recording is a dict update under a lock. Each gunicorn worker writes its
+    totals to its own file (<METRICS['DIR']>/<pid>.json, at most every
+    FLUSH_SECONDS, from the request middleware) and the metrics endpoint adds
+    up the files of all workers, so a scrape sees the whole server.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = defaultdict(float)
+        self.histograms = {}  # key -> [count per bucket..., +Inf count, sum]
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def inc(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, seconds, **labels):
+        key = metric_key(name, labels)
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            values = self.histograms.get(key)
+            if values is None:
+                values = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += seconds
+
+    def snapshot(self):
+        """JSON-friendly copy: {'counters': [[name, labels, value]], 'histograms': [[name, labels, values]]}"""
+        with self.lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        """Write this process' totals for the other workers' endpoint (throttled)"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < get_metrics_export_setting('FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS):
+            return
+        self.last_flush = now
+
+        directory = metrics_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{os.getpid()}.json"
+            temp_path = path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(self.snapshot()))
+            os.replace(temp_path, path)  # atomic: readers never see half a file
+        except OSError as e:
+            logger.error(f"Metrics flush error: {e}")
+
+
+registry = MetricsRegistry()
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    registry.observe(name, seconds, **labels)
+
+
+def metrics_dir():
+    return Path(get_metrics_export_setting('DIR', Path(settings.BASE_DIR) / 'cache' / 'metrics'))
+
+
+# ===== AGGREGATION & EXPOSITION =====
+
+def read_snapshot(path):
+    """Snapshot written by flush() (or the retired totals), None if unreadable"""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        logger.error(f"Unreadable metrics file {path.name}: {e}")
+        return None
+
+
+def add_snapshot(counters, histograms, buckets, snapshot):
+    """Add one snapshot to the running totals (histograms of other buckets are skipped)"""
+    for name, labels, value in snapshot['counters']:
+        counters[name, tuple(map(tuple, labels))] += value
+    if snapshot['buckets'] != buckets:
+        return  # written before a bucket change
+    for name, labels, values in snapshot['histograms']:
+        key = name, tuple(map(tuple, labels))
+        total = histograms.setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+            total[index] += value
+
+
+def pid_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, owned by another user
+    return True
+
+
+@contextmanager
+def files_lock(directory, exclusive=False):
+    """Lock between workers: folding (exclusive) vs reading all the files (shared)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'retired.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def prune_dead_workers(directory=None):
+    """
+    Fold the files of exited workers into RETIRED_FILE and delete them.
+
+    Counters stay monotonic for Prometheus (the totals of a dead worker are kept)
+    while the number of files no longer grows with every worker restart.
+    Serialized between workers with a lock file. Returns the number of files folded.
+    """
+    if os.name != 'posix':
+        return 0  # os.kill(pid, 0) is not a liveness probe on Windows
+    directory = directory or metrics_dir()
+    dead = [
+        path for path in directory.glob('*.json')
+        if path.stem.isdigit() and int(path.stem) != os.getpid() and not pid_is_alive(int(path.stem))
+    ]
+    if not dead:
+        return 0
+
+    try:
+        with files_lock(directory, exclusive=True):
+            retired_path = directory / RETIRED_FILE
+            counters = defaultdict(float)
+            histograms = {}
+            buckets = list(registry.buckets)
+            folded = [path for path in dead if path.exists()]  # another worker may have folded them
+            for path in [retired_path] + folded:
+                snapshot = read_snapshot(path) if path.exists() else None
+                if snapshot:
+                    add_snapshot(counters, histograms, buckets, snapshot)
+            if not folded:
+                return 0
+
+            temp_path = retired_path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps({
+                'buckets': buckets,
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            }))
+            os.replace(temp_path, retired_path)
+            for path in folded:
+                path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.error(f"Metrics prune error: {e}")
+        return 0
+
+    logger.info(f"Metrics of {len(folded)} exited worker(s) folded into {RETIRED_FILE}")
+    return len(folded)
+
+
+def collect_all():
+    """Totals of every worker (their last flush, this process up to now, exited workers)"""
+    registry.flush(force=True)
+    prune_dead_workers()
+
+    counters = defaultdict(float)
+    histograms = {}
+    buckets = list(registry.buckets)
+    directory = metrics_dir()
+    with files_lock(directory):
+        for path in sorted(directory.glob('*.json')):
+            snapshot = read_snapshot(path)
+            if snapshot:
+                add_snapshot(counters, histograms, buckets, snapshot)
+    return buckets, counters, histograms
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render_prometheus():
+    """All workers' metrics in the Prometheus text format (version 0.0.4)"""
+    buckets, counters, histograms = collect_all()
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f"{name}{format_labels(labels)} {int(value) if value.is_integer() else value}")
+
+    for (name, labels), values in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(buckets, values):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+        cumulative += values[len(buckets)]
+        lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {values[-1]:.6f}")
+        lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,237 @@
+from django.conf import settings
+from django.db import connection
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+import logging
+import threading
+
+from .content_versions import get_version
+
+logger = logging.getLogger(__name__)
+
+# Reservations that hold seats - French + legacy English values (queryset.update() skips
+# the migration done in Reservation.save()). Shared by every availability/occupancy count.
+ACTIVE_STATUSES = ['En attente', 'Confirmée', 'pending', 'confirmed']
+
+DEFAULT_DURATION_MINUTES = 120
+# (largest party, minutes) - the first bucket that fits the party is used
+DEFAULT_DURATION_BY_PARTY_SIZE = [(2, 90), (4, 105), (8, 120)]
+
+# Days kept in memory per process (see get_occupancy)
+OCCUPANCY_CACHE_DAYS = 400
+
+
+def get_duration_setting(key, default):
+    """Read a value from settings.RESERVATION_DURATION_SETTINGS with a fallback"""
+    return getattr(settings, 'RESERVATION_DURATION_SETTINGS', {}).get(key, default)
+
+
+def default_duration(party_size):
+    """Table turn time (minutes) of a party size, from RESERVATION_DURATION_SETTINGS"""
+    for max_size, minutes in get_duration_setting('BY_PARTY_SIZE', DEFAULT_DURATION_BY_PARTY_SIZE):
+        if party_size <= max_size:
+            return minutes
+    return get_duration_setting('DEFAULT_MINUTES', DEFAULT_DURATION_MINUTES)
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class DayOccupancy:
+    """
+    Seats and tables in use over a day, as a step function.
+
+    Built by a sweep over the interval ends of the day's bookings (sorted once,
+    O(n log n)), so the peak over any [start, end) window is a bisect plus a scan
+    of the breakpoints inside the window - no per-minute table, no query.
+    A party leaving at 20:30 frees its seats for a party arriving at 20:30.
+    """
+
+    def __init__(self, bookings=()):
+        # bookings: (time, duration in minutes, guests)
+        events = []
+        self.slot_counts = defaultdict(int)
+        self.slot_guests = defaultdict(int)
+        for start_time, duration, guests in bookings:
+            start = to_minutes(start_time)
+            end = start + (duration or default_duration(guests))
+            events.append((start, guests, 1))
+            events.append((end, -guests, -1))
+            self.slot_counts[start_time] += 1
+            self.slot_guests[start_time] += guests
+        events.sort()
+
+        self.points, self.covers, self.parties = [], [], []
+        covers = parties = 0
+        for minute, guests, party in events:
+            covers += guests
+            parties += party
+            if self.points and self.points[-1] == minute:
+                self.covers[-1], self.parties[-1] = covers, parties
+            else:
+                self.points.append(minute)
+                self.covers.append(covers)
+                self.parties.append(parties)
+
+    def add(self, slot_time, duration, guests):
+        """Seat one more party (rows accepted by a bulk import before their insert)"""
+        start = to_minutes(slot_time)
+        end = start + duration
+        for minute in (start, end):
+            index = bisect_left(self.points, minute)
+            if index == len(self.points) or self.points[index] != minute:
+                # New breakpoint, at the level in force just before it
+                self.points.insert(index, minute)
+                self.covers.insert(index, self.covers[index - 1] if index else 0)
+                self.parties.insert(index, self.parties[index - 1] if index else 0)
+        for index in range(bisect_left(self.points, start), bisect_left(self.points, end)):
+            self.covers[index] += guests
+            self.parties[index] += 1
+        self.slot_counts[slot_time] += 1
+        self.slot_guests[slot_time] += guests
+
+    def peak(self, start, end):
+        """(max covers, max parties) seated at some point of [start, end) - minutes"""
+        first = bisect_right(self.points, start) - 1  # level in force at start
+        last = bisect_left(self.points, end)
+        max_covers = max_parties = 0
+        for index in range(max(first, 0), last):
+            max_covers = max(max_covers, self.covers[index])
+            max_parties = max(max_parties, self.parties[index])
+        return max_covers, max_parties
+
+    def remaining(self, slot_time, duration, capacity, tables):
+        """(covers, tables) still free during a stay starting at slot_time"""
+        start = to_minutes(slot_time)
+        covers, parties = self.peak(start, start + duration)
+        return capacity - covers, tables - parties
+
+    def fits(self, slot_time, guests, capacity, tables, duration=None):
+        """A new party of `guests` can sit for its whole stay"""
+        covers, free_tables = self.remaining(slot_time, duration or default_duration(guests), capacity, tables)
+        return covers >= guests and free_tables >= 1
+
+    def slot_count(self, slot_time):
+        """Reservations starting exactly at slot_time (TimeSlot.max_reservations rule)"""
+        return self.slot_counts.get(slot_time, 0)
+
+    def slot_usage(self, slot_time):
+        """(reservations, guests) arriving at slot_time (TimeSlot.max_covers rule)"""
+        return self.slot_counts.get(slot_time, 0), self.slot_guests.get(slot_time, 0)
+
+    def slot_available_covers(self, slot, guests, capacity, tables, duration=None):
+        """
+        Covers a new party can still use in a slot: the slot's own limits (covers,
+        optional reservation cap) and the seats/tables left during the whole stay.
+        """
+        slot_covers = slot.remaining_covers(*self.slot_usage(slot.time))
+        covers, free_tables = self.remaining(slot.time, duration or default_duration(guests), capacity, tables)
+        if free_tables < 1:
+            return 0
+        return max(0, min(slot_covers, covers))
+
+    @property
+    def total_reservations(self):
+        return sum(self.slot_counts.values())
+
+    @property
+    def total_guests(self):
+        return sum(self.slot_guests.values())
+
+    def busiest_slot(self, by_guests=True):
+        """Start time with the most guests (or reservations), None on an empty day"""
+        totals = self.slot_guests if by_guests else self.slot_counts
+        if not totals:
+            return None
+        return max(totals, key=lambda slot_time: (totals[slot_time], -to_minutes(slot_time)))
+
+
+def load_occupancy(start, end=None):
+    """date -> DayOccupancy for a date range, from one query"""
+    end = end or start
+    return occupancy_of(date__range=(start, end))
+
+
+def load_days(days):
+    """date -> DayOccupancy for scattered dates (bulk import batch), from one query"""
+    return occupancy_of(date__in=list(days))
+
+
+def occupancy_of(**filters):
+    from ..models import Reservation
+
+    rows = Reservation.objects.filter(
+        status__in=ACTIVE_STATUSES, **filters
+    ).values_list('date', 'time', 'duration', 'number_of_guests').order_by()
+
+    bookings = defaultdict(list)
+    for day, start_time, duration, guests in rows.iterator():
+        bookings[day].append((start_time, duration, guests))
+    return defaultdict(DayOccupancy, {day: DayOccupancy(items) for day, items in bookings.items()})
+
+
+def lock_day(day):
+    """
+    Serialize the bookings of one day until the end of the transaction (create path).
+
+    A stay covers several slots, so a lock on one TimeSlot row does not keep two
+    overlapping bookings apart: PostgreSQL takes an advisory lock per date, other
+    backends lock the single RestaurantInfo row.
+    """
+    from ..models import RestaurantInfo
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", [f"reservations_day:{day.isoformat()}"])
+    else:
+        RestaurantInfo.objects.select_for_update().order_by('pk').first()
+
+
+def day_occupancy(day):
+    """Fresh occupancy of a day (create path, under lock_day)"""
+    return load_occupancy(day)[day]
+
+
+# ===== PRECOMPUTED (availability reads, dashboard) =====
+
+_occupancy_cache = {}
+_occupancy_lock = threading.Lock()
+
+
+def get_occupancy(start, end=None):
+    """
+    date -> DayOccupancy, served from memory while the 'reservations' content
+    version is unchanged (bumped after every reservation write, see
+    content_versions.py). Missing days are loaded together in one query.
+    """
+    end = end or start
+    # Token read before loading: a write committed meanwhile bumps it again
+    token = get_version('reservations')['token']
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    with _occupancy_lock:
+        cached = {day: _occupancy_cache.get(day) for day in days}
+    missing = [day for day, entry in cached.items() if entry is None or entry[0] != token]
+
+    result = {day: entry[1] for day, entry in cached.items() if entry is not None and entry[0] == token}
+    if missing:
+        loaded = load_occupancy(min(missing), max(missing))
+        with _occupancy_lock:
+            if len(_occupancy_cache) + len(missing) > OCCUPANCY_CACHE_DAYS:
+                _occupancy_cache.clear()
+            for day in missing:
+                result[day] = loaded[day]
+                _occupancy_cache[day] = (token, loaded[day])
+    return defaultdict(DayOccupancy, result)
+
+
+def get_day_occupancy(day):
+    return get_occupancy(day)[day]
+
+
+def clear_occupancy_cache():
+    """Forget the precomputed days of this process (query budget checks)"""
+    with _occupancy_lock:
+        _occupancy_cache.clear()
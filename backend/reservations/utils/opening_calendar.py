@@ -0,0 +1,258 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import copy
+import logging
+import threading
+import time
+
+from .content_versions import get_version
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_DAYS = 366  # today + the next 12 months
+
+# The calendar is rebuilt when one of these contents changes in another process
+CALENDAR_CONTENT = ('restaurant', 'timeslots', 'special_dates')
+
+# Content versions (shared cache reads) are checked at most this often per process;
+# changes made by this process are applied right away (apply_change)
+DEFAULT_VERSION_CHECK_SECONDS = 2
+
+CLOSED_DAY_NAMES = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+
+
+def special_date_entry(special_date):
+    """Plain copy of a SpecialDate (kept in memory for messages and special hours)"""
+    return {
+        'pk': special_date.pk,
+        'date': special_date.date,
+        'is_open': special_date.is_open,
+        'opening_time': special_date.special_opening_time,
+        'closing_time': special_date.special_closing_time,
+        'reason': special_date.reason,
+        'special_hours': special_date.special_hours,
+    }
+
+
+class OpeningCalendar:
+    """
+    Bookable slots per day, compiled from RestaurantInfo, TimeSlot and SpecialDate.
+
+    masks[i] is a bitmap of the bookable slots of start + i days (bit n = n-th active
+    slot by time), so "is this date/slot open" is a list index and a bit test.
+    The rules themselves stay in memory too: dates outside the window are computed
+    on the fly, and a change of one model only recomputes what it affects.
+    """
+
+    def __init__(self, start, closed_weekdays, slots, special_dates, versions=None):
+        self.start = start
+        self.closed_weekdays = frozenset(closed_weekdays)
+        self.versions = versions or {}
+        self.special_by_pk = {entry['pk']: entry for entry in special_dates}
+        self.set_slots(slots)
+
+    @classmethod
+    def build(cls, start=None):
+        """Three queries: restaurant, active slots, special dates from start on"""
+        from ..models import TimeSlot, SpecialDate, get_restaurant_info
+
+        # Versions read first: a change during the build makes the next lookup rebuild
+        versions = {name: get_version(name)['token'] for name in CALENDAR_CONTENT}
+        start = start or timezone.localdate()
+        restaurant = get_restaurant_info()
+        closed_weekdays = [day for day in range(7) if restaurant.is_closed_on_day(day)]
+        slots = list(TimeSlot.objects.filter(is_active=True).order_by('time'))
+        special_dates = [special_date_entry(sd) for sd in SpecialDate.objects.filter(date__gte=start)]
+        return cls(start, closed_weekdays, slots, special_dates, versions)
+
+    # ===== COMPILATION =====
+
+    def set_slots(self, slots):
+        self.slots = sorted(slots, key=lambda slot: slot.time)
+        self.slot_index = {slot.time: index for index, slot in enumerate(self.slots)}
+        self.full_mask = (1 << len(self.slots)) - 1
+        self.compile()
+
+    def compile(self):
+        self.special_by_date = {}
+        for entry in self.special_by_pk.values():
+            self.special_by_date.setdefault(entry['date'], []).append(entry)
+        self.masks = [self.compute_mask(self.start + timedelta(days=i)) for i in range(CALENDAR_DAYS)]
+
+    def compute_mask(self, day):
+        if day.weekday() in self.closed_weekdays:
+            return 0
+        mask = self.full_mask
+        for entry in self.special_by_date.get(day, ()):
+            if not entry['is_open']:
+                return 0
+            if entry['opening_time'] and entry['closing_time']:
+                mask &= self.hours_mask(entry['opening_time'], entry['closing_time'])
+        return mask
+
+    def hours_mask(self, opening_time, closing_time):
+        """Slots starting inside special hours [opening, closing)"""
+        mask = 0
+        for index, slot in enumerate(self.slots):
+            if opening_time <= slot.time < closing_time:
+                mask |= 1 << index
+        return mask
+
+    def recompute_day(self, day):
+        offset = (day - self.start).days
+        if 0 <= offset < CALENDAR_DAYS:
+            self.masks[offset] = self.compute_mask(day)
+
+    # ===== INCREMENTAL UPDATES (process that made the change) =====
+
+    def copy(self):
+        """Copy that can be updated while readers keep using this calendar (apply_change)"""
+        calendar = copy.copy(self)
+        calendar.versions = dict(self.versions)
+        calendar.special_by_pk = dict(self.special_by_pk)
+        calendar.special_by_date = dict(self.special_by_date)
+        calendar.masks = list(self.masks)
+        return calendar
+
+    def update_special_date(self, special_date, deleted=False):
+        previous = self.special_by_pk.pop(special_date.pk, None)
+        if not deleted:
+            entry = special_date_entry(special_date)
+            self.special_by_pk[entry['pk']] = entry
+        touched = {special_date.date} | ({previous['date']} if previous else set())
+        for day in touched:
+            entries = [e for e in self.special_by_pk.values() if e['date'] == day]
+            if entries:
+                self.special_by_date[day] = entries
+            else:
+                self.special_by_date.pop(day, None)
+            self.recompute_day(day)
+
+    def update_slot(self, slot, deleted=False):
+        slots = [s for s in self.slots if s.pk != slot.pk]
+        if not deleted and slot.is_active:
+            slots.append(slot)
+        self.set_slots(slots)
+
+    def update_restaurant(self, restaurant, deleted=False):
+        self.closed_weekdays = frozenset(day for day in range(7) if restaurant.is_closed_on_day(day))
+        self.compile()
+
+    # ===== LOOKUPS =====
+
+    def mask(self, day):
+        offset = (day - self.start).days
+        if 0 <= offset < CALENDAR_DAYS:
+            return self.masks[offset]
+        return self.compute_mask(day)
+
+    def is_open(self, day):
+        """At least one bookable slot that day"""
+        return self.mask(day) != 0
+
+    def get_slot(self, day, slot_time):
+        """Active TimeSlot at slot_time if it is bookable that day, else None"""
+        index = self.slot_index.get(slot_time)
+        if index is None or not self.mask(day) >> index & 1:
+            return None
+        return self.slots[index]
+
+    def open_slots(self, day):
+        """Bookable TimeSlots of a day, by time"""
+        mask = self.mask(day)
+        return [slot for index, slot in enumerate(self.slots) if mask >> index & 1]
+
+    def special_date(self, day):
+        """In-memory SpecialDate entry of a day (closure first), or None"""
+        entries = self.special_by_date.get(day)
+        if not entries:
+            return None
+        return min(entries, key=lambda entry: entry['is_open'])
+
+    def closure_reason(self, day):
+        """Why a day is closed (message for the frontend), None if it is open"""
+        if self.is_open(day):
+            return None
+        entry = self.special_date(day)
+        if entry and not entry['is_open']:
+            return f"Le restaurant est fermé ce jour: {entry['reason'] or 'Fermeture exceptionnelle'}"
+        if day.weekday() in self.closed_weekdays:
+            return f"Le restaurant est fermé le {CLOSED_DAY_NAMES[day.weekday()]}."
+        return "Aucun créneau disponible ce jour"
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+
+_calendar = None
+_calendar_lock = threading.Lock()
+_versions_checked_at = 0.0
+
+
+def current_versions():
+    return {name: get_version(name)['token'] for name in CALENDAR_CONTENT}
+
+
+def calendar_is_current(calendar, force=False):
+    """Same day and same content versions - the versions are only re-read every OPENING_CALENDAR_CHECK_SECONDS"""
+    global _versions_checked_at
+    if calendar is None or calendar.start != timezone.localdate():
+        return False
+    now = time.monotonic()
+    if not force and now - _versions_checked_at < getattr(settings, 'OPENING_CALENDAR_CHECK_SECONDS', DEFAULT_VERSION_CHECK_SECONDS):
+        return True
+    if calendar.versions != current_versions():
+        return False
+    _versions_checked_at = now
+    return True
+
+
+def get_opening_calendar():
+    """
+    Calendar of this process, rebuilt when the day changes or when another process
+    changed one of its models (content versions, see content_versions.py).
+    """
+    global _calendar, _versions_checked_at
+    calendar = _calendar
+    if not calendar_is_current(calendar):
+        with _calendar_lock:
+            calendar = _calendar
+            if not calendar_is_current(calendar, force=True):
+                calendar = OpeningCalendar.build()
+                _calendar = calendar
+                _versions_checked_at = time.monotonic()
+                logger.info(f"Opening calendar compiled: {len(calendar.slots)} slots, {CALENDAR_DAYS} days")
+    return calendar
+
+
+def apply_change(content, method, instance, deleted=False):
+    """
+    Patch the calendar of this process after a save/delete (after commit, once the
+    content version has been bumped). The change is applied to a copy which then
+    replaces the shared reference, so lookups running meanwhile (without the lock)
+    never see a half-updated calendar. If another content changed meanwhile the
+    calendar is dropped instead; other processes rebuild on their next lookup.
+    """
+    def apply():
+        global _calendar
+        with _calendar_lock:
+            calendar = _calendar
+            if calendar is None:
+                return
+            versions = current_versions()
+            if any(calendar.versions.get(name) != versions[name] for name in CALENDAR_CONTENT if name != content):
+                _calendar = None
+                return
+            updated = calendar.copy()
+            getattr(updated, method)(instance, deleted)
+            updated.versions = versions
+            _calendar = updated
+    transaction.on_commit(apply)
+
+
+def reset_opening_calendar():
+    """Drop the calendar of this process - the next lookup rebuilds it"""
+    global _calendar
+    with _calendar_lock:
+        _calendar = None
@@ -0,0 +1,357 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+from datetime import date
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# table -> partition key (monthly RANGE partitions)
+PARTITIONED_TABLES = {
+    'reservations_reservation': 'date',
+    'reservations_notification': 'created_at',
+}
+
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def get_partitioning_setting(key, default):
+    """Read a value from settings.DATABASE_PARTITIONING with a fallback"""
+    return getattr(settings, 'DATABASE_PARTITIONING', {}).get(key, default)
+
+
+def partitioning_supported(connection=None):
+    """Declarative partitioning needs PostgreSQL"""
+    connection = connection or default_connection
+    return connection.vendor == 'postgresql'
+
+
+def partitioned_tables(connection=None):
+    """Tables of PARTITIONED_TABLES already converted (manage.py create_partitions --convert)"""
+    connection = connection or default_connection
+    if not partitioning_supported(connection):
+        return []
+    with connection.cursor() as cursor:
+        return [table for table in PARTITIONED_TABLES if is_partitioned(cursor, table)]
+
+
+# ===== MONTH HELPERS =====
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_bounds(table, month):
+    """FROM/TO literals of a month partition (timestamps are UTC month boundaries)"""
+    start, end = month, add_months(month, 1)
+    if PARTITIONED_TABLES[table] == 'created_at':
+        return f"'{start.isoformat()} 00:00:00+00'", f"'{end.isoformat()} 00:00:00+00'"
+    return f"'{start.isoformat()}'", f"'{end.isoformat()}'"
+
+
+# ===== INTROSPECTION =====
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+        [table]
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table):
+    """Names of the partitions attached to a partitioned table"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s ORDER BY c.relname",
+        [table]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+# ===== PARTITION MANAGEMENT =====
+
+def ensure_partitions(table, start=None, months_ahead=None, connection=None):
+    """
+    Create the missing monthly partitions from start up to months_ahead after today.
+
+    Future partitions must exist before rows arrive: a row outside every month goes
+    to the DEFAULT partition, and a month that already has rows there cannot be
+    created any more without moving them. Returns the created partition names.
+    """
+    connection = connection or default_connection
+    if months_ahead is None:
+        months_ahead = get_partitioning_setting('MONTHS_AHEAD', DEFAULT_MONTHS_AHEAD)
+
+    current = month_start(start or timezone.localdate())
+    last = add_months(month_start(timezone.localdate()), months_ahead)
+    created = []
+
+    with connection.cursor() as cursor:
+        existing = set(list_partitions(cursor, table))
+        while current <= last:
+            name = partition_name(table, current)
+            if name not in existing:
+                lower, upper = partition_bounds(table, current)
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                    f'FOR VALUES FROM ({lower}) TO ({upper})'
+                )
+                created.append(name)
+            current = add_months(current, 1)
+
+        default_name = f"{table}_default"
+        if default_name not in existing:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS "{default_name}" PARTITION OF "{table}" DEFAULT')
+            created.append(default_name)
+
+    for name in created:
+        logger.info(f"Partition created: {name}")
+    return created
+
+
+# ===== CONSTRAINTS =====
+#
+# PostgreSQL only accepts unique constraints (primary key included) that contain the
+# partition key, and foreign keys can only reference such a constraint. What Django
+# created (and what its migration state describes) is enforced by triggers instead:
+# - unique (col): composite unique (col, key) + a check that col alone is unique
+# - FK child.col -> partitioned parent.id: NO ACTION, deferred (like Django's FKs),
+#   checked on the child insert/update and on the parent delete/update
+
+
+def trigger_name(*parts):
+    """Identifier of at most 63 characters (PostgreSQL truncates longer names)"""
+    name = '_'.join(parts)
+    if len(name) <= 63:
+        return name
+    return f"{name[:54]}_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+
+
+def add_unique_check(cursor, table, columns, constraint):
+    """Uniqueness of columns without the partition key: advisory lock per value, then count"""
+    function = trigger_name(constraint, 'uniq')
+    values = ", ".join(f'NEW."{column}"::text' for column in columns)
+    not_null = " AND ".join(f'NEW."{column}" IS NOT NULL' for column in columns)
+    matches = " AND ".join(f'"{column}" = NEW."{column}"' for column in columns)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION "{function}"() RETURNS trigger AS $$
+        BEGIN
+            IF {not_null} THEN
+                -- Serializes the writers of one value: the second sees the first once committed
+                PERFORM pg_advisory_xact_lock(hashtextextended(concat_ws(',', '{table}', {values}), 0));
+                IF (SELECT count(*) FROM "{table}" WHERE {matches}) > 1 THEN
+                    RAISE EXCEPTION 'duplicate key value violates unique constraint "{constraint}"'
+                        USING ERRCODE = 'unique_violation';
+                END IF;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    columns_sql = ", ".join(f'"{column}"' for column in columns)
+    cursor.execute(f'DROP TRIGGER IF EXISTS "{function}" ON "{table}"')
+    cursor.execute(
+        f'CREATE TRIGGER "{function}" AFTER INSERT OR UPDATE OF {columns_sql} ON "{table}" '
+        f'FOR EACH ROW EXECUTE FUNCTION "{function}"()'
+    )
+
+
+def rebuild_unique_constraints(cursor, table, unique_constraints):
+    """Unique constraints of the old table as (columns..., key) + a check on the columns alone"""
+    key = PARTITIONED_TABLES[table]
+    cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "{key}")')
+    add_unique_check(cursor, table, ['id'], f"{table}_pkey")
+    for name, columns in unique_constraints:
+        composite = columns if key in columns else columns + [key]
+        columns_sql = ", ".join(f'"{column}"' for column in composite)
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" UNIQUE ({columns_sql})')
+        if key not in columns:
+            add_unique_check(cursor, table, columns, name)
+
+
+def partitioned_relations():
+    """(child table, child pk, column, parent table, parent column) of the FKs to a partitioned table (models)"""
+    relations = []
+    for model in apps.get_models(include_auto_created=True):
+        for field in model._meta.concrete_fields:
+            if not field.is_relation or not getattr(field, 'db_constraint', False):
+                continue
+            parent = field.related_model._meta.db_table
+            if parent in PARTITIONED_TABLES:
+                relations.append((model._meta.db_table, model._meta.pk.column, field.column, parent, field.target_field.column))
+    return relations
+
+
+def add_relation_check(cursor, child, child_pk, column, parent, parent_column):
+    """Foreign key child.column -> parent.parent_column emulated by two deferred constraint triggers"""
+    child_check = trigger_name(child, column, 'fk')
+    parent_check = trigger_name(child, column, 'fk_parent')
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION "{child_check}"() RETURNS trigger AS $$
+        BEGIN
+            -- Deferred: skip rows deleted or changed since (like PostgreSQL's own FK triggers)
+            IF NEW."{column}" IS NOT NULL AND EXISTS (
+                    SELECT 1 FROM "{child}" WHERE "{child_pk}" = NEW."{child_pk}" AND "{column}" = NEW."{column}") THEN
+                PERFORM 1 FROM "{parent}" WHERE "{parent_column}" = NEW."{column}" FOR KEY SHARE;
+                IF NOT FOUND THEN
+                    RAISE EXCEPTION 'insert or update on table "{child}" violates foreign key "{child_check}"'
+                        USING ERRCODE = 'foreign_key_violation',
+                              DETAIL = format('Key ({column})=(%s) is not present in table "{parent}".', NEW."{column}");
+                END IF;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION "{parent_check}"() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW."{parent_column}" = OLD."{parent_column}" THEN
+                RETURN NULL;
+            END IF;
+            -- The parent may have been re-inserted with the same id since (deferred check)
+            IF EXISTS (SELECT 1 FROM "{child}" WHERE "{column}" = OLD."{parent_column}")
+                    AND NOT EXISTS (SELECT 1 FROM "{parent}" WHERE "{parent_column}" = OLD."{parent_column}") THEN
+                RAISE EXCEPTION 'update or delete on table "{parent}" violates foreign key "{child_check}" on table "{child}"'
+                    USING ERRCODE = 'foreign_key_violation',
+                          DETAIL = format('Key ({parent_column})=(%s) is still referenced from table "{child}".', OLD."{parent_column}");
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql
+    """)
+    for table, name, events in ((child, child_check, f'INSERT OR UPDATE OF "{column}"'),
+                                (parent, parent_check, f'DELETE OR UPDATE OF "{parent_column}"')):
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{name}" ON "{table}"')
+        cursor.execute(
+            f'CREATE CONSTRAINT TRIGGER "{name}" AFTER {events} ON "{table}" '
+            f'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION "{name}"()'
+        )
+
+
+def install_relation_checks(cursor):
+    """(Re)create the trigger FKs of every relation whose parent is partitioned (idempotent)"""
+    for child, child_pk, column, parent, parent_column in partitioned_relations():
+        if is_partitioned(cursor, parent):
+            add_relation_check(cursor, child, child_pk, column, parent, parent_column)
+
+
+# ===== CONVERSION =====
+
+def convert_to_partitioned(table, connection=None, months_ahead=None):
+    """
+    Rebuild a table as a monthly RANGE partitioned table (same name, same columns).
+
+    Every constraint Django created stays enforced: unique constraints become
+    (columns..., key) plus a uniqueness trigger on the columns alone, foreign keys
+    pointing to the table become constraint triggers (see CONSTRAINTS above), the
+    other indexes and outgoing foreign keys are recreated as they were.
+    Run by `manage.py create_partitions --convert`. Does nothing if the table is
+    already partitioned; refuses unique indexes it cannot rebuild (expressions, WHERE).
+    """
+    connection = connection or default_connection
+    column = PARTITIONED_TABLES[table]
+    legacy = f"{table}_legacy"
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return False
+
+        # Unique constraints and indexes (read before the rename, so their
+        # definitions already name the new table)
+        cursor.execute(
+            "SELECT c.conname, array_agg(a.attname ORDER BY k.ordinality) FROM pg_constraint c "
+            "CROSS JOIN unnest(c.conkey) WITH ORDINALITY AS k(attnum, ordinality) "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum "
+            "WHERE c.conrelid = %s::regclass AND c.contype = 'u' GROUP BY c.conname ORDER BY c.conname",
+            [table]
+        )
+        unique_constraints = [(name, list(columns)) for name, columns in cursor.fetchall()]
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid), i.indisunique FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisprimary "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+            [table]
+        )
+        indexes = cursor.fetchall()
+        if any(unique for _, unique in indexes):
+            raise ValueError(f"{table}: unique index without constraint (expression / partial), cannot be partitioned")
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid), confrelid::regclass::text FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        referencing = cursor.fetchall()
+        cursor.execute(f'SELECT MIN("{column}") FROM "{table}"')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS INCLUDING GENERATED) PARTITION BY RANGE ("{column}")'
+        )
+        if oldest is not None and hasattr(oldest, 'date'):
+            oldest = oldest.date()
+        ensure_partitions(table, start=oldest, months_ahead=months_ahead, connection=connection)
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f'COALESCE((SELECT MAX("id") FROM "{table}"), 0) + 1, false)'
+        )
+
+        # Foreign keys to the old table are replaced by triggers below; no CASCADE,
+        # so anything else depending on the old table stops the conversion
+        for name, child in referencing:
+            cursor.execute(f'ALTER TABLE {child} DROP CONSTRAINT "{name}"')
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # Constraint and index names are free again once the old table is gone
+        rebuild_unique_constraints(cursor, table, unique_constraints)
+        for definition, _ in indexes:
+            cursor.execute(definition)
+
+        for name, definition, target in foreign_keys:
+            # Partitioned targets have no unique (id): install_relation_checks() covers them
+            if not is_partitioned(cursor, target.strip('"')):
+                cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        install_relation_checks(cursor)
+
+    logger.info(f"Table {table} converted to monthly partitions on {column}")
+    return True
+
+
+def partition_all(connection=None, months_ahead=None):
+    """Convert every table of PARTITIONED_TABLES (reservations first), returns the converted ones"""
+    return [
+        table for table in PARTITIONED_TABLES
+        if convert_to_partitioned(table, connection=connection, months_ahead=months_ahead)
+    ]
+
+
+def explain_partitions(queryset):
+    """Partitions the planner actually scans for a queryset (partition pruning check)"""
+    sql, params = queryset.query.sql_with_params()
+    table = queryset.model._meta.db_table
+    with default_connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        partitions = list_partitions(cursor, table)
+    return [name for name in partitions if name in plan]
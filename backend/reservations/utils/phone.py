@@ -0,0 +1,35 @@
+import re
+
+# Morocco - numbers are written 06..., +212 6... or 00212 6...
+DEFAULT_COUNTRY_CODE = '212'
+
+NON_DIGITS = re.compile(r'\D')
+PHONE_SEARCH_RE = re.compile(r'^[\d\s+().\-/]+$')
+
+
+def phone_digits(value):
+    """Only the digits of a phone number ('+212 6-12' -> '212612')"""
+    return NON_DIGITS.sub('', value or '')
+
+
+def normalize_phone(value, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    National significant number, so every way of writing a number gives the same key:
+    '06 12 34 56 78', '+212 612345678' and '00212612345678' -> '612345678'.
+    """
+    digits = phone_digits(value)
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if country_code and digits.startswith(country_code) and len(digits) > len(country_code) + 6:
+        digits = digits[len(country_code):]
+    return digits.lstrip('0')
+
+
+def reversed_phone_digits(value):
+    """Digits in reverse order - a suffix search becomes an indexable prefix search"""
+    return phone_digits(value)[::-1]
+
+
+def looks_like_phone(term, min_digits=3):
+    """A search term made of phone characters only (at least min_digits digits)"""
+    return bool(term) and bool(PHONE_SEARCH_RE.match(term)) and len(phone_digits(term)) >= min_digits
@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.utils import timezone
+from collections import Counter
+from pathlib import Path
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PROFILES = 50
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+MAX_STACK_DEPTH = 100
+
+PROFILE_SUFFIXES = {'.collapsed': 'sampling', '.prof': 'cprofile'}
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.(collapsed|prof)$')
+
+
+def get_profiling_setting(key, default):
+    """Read a value from settings.PROFILING with a fallback"""
+    return getattr(settings, 'PROFILING', {}).get(key, default)
+
+
+def profiles_dir():
+    return Path(get_profiling_setting('DIR', Path(settings.BASE_DIR) / 'cache' / 'profiles'))
+
+
+# ===== PROFILERS =====
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler of one thread: a background thread reads the
+    thread's stack every `interval` seconds (sys._current_frames) and counts the
+    stacks. The request itself runs untouched. Output is the collapsed-stack
+    format read by flamegraph.pl, speedscope, etc.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.target = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def output(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilerBusy(Exception):
+    """cProfile cannot start: another profile is active in this process"""
+
+
+# Python 3.12+: cProfile uses sys.monitoring, one active profile per process
+_cprofile_lock = threading.Lock()
+
+
+class CProfiler:
+    """Deterministic profile of the request (cProfile, heavier) - saved as pstats data"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.enabled = False
+
+    def start(self):
+        """Raises ProfilerBusy when another request (or tool) is already being profiled"""
+        if not _cprofile_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another cProfile run is active in this process")
+        try:
+            self.profile.enable()
+        except ValueError as e:  # "Another profiling tool is already active"
+            _cprofile_lock.release()
+            raise ProfilerBusy(str(e)) from e
+        self.enabled = True
+
+    def stop(self):
+        if self.enabled:
+            self.profile.disable()
+            self.enabled = False
+            _cprofile_lock.release()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+# ===== RING BUFFER =====
+
+def profile_filename(request, duration_ms, suffix):
+    slug = re.sub(r'[^A-Za-z0-9-]+', '-', request.path).strip('-')[:60] or 'root'
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S-%f')
+    return f"{stamp}_{request.method}_{slug}_{int(duration_ms)}ms{suffix}"
+
+
+def save_profile(profiler, request, duration_ms):
+    """Write a profile and drop the oldest ones beyond PROFILING['MAX_PROFILES'] - returns the file name"""
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if isinstance(profiler, StackSampler):
+        name = profile_filename(request, duration_ms, '.collapsed')
+        (directory / name).write_text(profiler.output())
+    else:
+        name = profile_filename(request, duration_ms, '.prof')
+        profiler.save(directory / name)
+
+    max_profiles = get_profiling_setting('MAX_PROFILES', DEFAULT_MAX_PROFILES)
+    for old in list_profile_paths()[max_profiles:]:
+        try:
+            old.unlink()
+        except FileNotFoundError:
+            pass  # removed by another worker
+    return name
+
+
+def list_profile_paths():
+    """Profile files, newest first"""
+    directory = profiles_dir()
+    if not directory.exists():
+        return []
+    paths = [path for path in directory.iterdir() if PROFILE_NAME_RE.match(path.name)]
+    return sorted(paths, key=lambda path: path.name, reverse=True)
+
+
+def list_profiles():
+    profiles = []
+    for path in list_profile_paths():
+        stamp, method, slug, duration = path.stem.split('_', 3)
+        profiles.append({
+            'name': path.name,
+            'kind': PROFILE_SUFFIXES[path.suffix],
+            'method': method,
+            'path': slug,
+            'duration_ms': int(duration.rstrip('ms')),
+            'size': path.stat().st_size,
+            'created': stamp,
+        })
+    return profiles
+
+
+def get_profile_path(name):
+    """Path of a stored profile, None for an unknown or invalid name"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profiles_dir() / name
+    return path if path.exists() else None
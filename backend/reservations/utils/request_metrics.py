@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import time
+
+from .metrics import observe
+
+# Metrics of the request being served (None outside a request: commands, shell)
+_current = ContextVar('request_metrics', default=None)
+
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_REPEATED_QUERY_THRESHOLD = 10
+
+
+def get_metrics_setting(key, default):
+    """Read a value from settings.REQUEST_METRICS with a fallback"""
+    return getattr(settings, 'REQUEST_METRICS', {}).get(key, default)
+
+
+class RequestMetrics:
+    """Counters of one request: SQL queries, DB time and timed sections (signals, email)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.sections = Counter()  # category -> seconds
+        self.statements = Counter()  # SQL template -> executions (N+1 detection)
+        self._depth = Counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.statements[sql] += 1
+
+    def most_repeated(self):
+        """(sql, count) of the statement run the most often, or (None, 0)"""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+def current_metrics():
+    return _current.get()
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection: counts the query in the metrics of the
+    current request - params stay out, the SQL template is the key. Looked up
+    through the context variable, so queries run by sync_to_async() threads
+    (async views, their own thread-local connections) count too.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_wrapper(connection, **kwargs):
+    """connection_created receiver (also called for connections opened before it was connected)"""
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+connection_created.connect(install_query_wrapper)
+
+
+@contextmanager
+def collect_metrics():
+    """Collect the metrics of the block (the middleware wraps each request with it)"""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_section(category):
+    """Add the time of the block to a category; nested blocks of the same category count once"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    metrics._depth[category] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._depth[category] -= 1
+        if not metrics._depth[category]:
+            metrics.sections[category] += time.perf_counter() - started
+
+
+def timed(category):
+    """
+    Decorator version of timed_section() (signal receivers, email sending), also
+    recorded in the reservations_<category>_duration_seconds histogram.
+    """
+    def decorator(func):
+        metric = f"reservations_{category}_duration_seconds"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with timed_section(category):
+                    return func(*args, **kwargs)
+            finally:
+                observe(metric, time.perf_counter() - started, function=func.__name__)
+        return wrapper
+    return decorator
+
+
+def query_budget(path):
+    """Max queries allowed for a path: longest REQUEST_METRICS['MAX_QUERIES'] prefix, else the default"""
+    budgets = get_metrics_setting('MAX_QUERIES', {})
+    matches = [prefix for prefix in budgets if path.startswith(prefix)]
+    if matches:
+        return budgets[max(matches, key=len)]
+    return get_metrics_setting('DEFAULT_MAX_QUERIES', DEFAULT_MAX_QUERIES)
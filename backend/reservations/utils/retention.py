@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when NOTIFICATION_SETTINGS does not define the key
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_PAUSE = 0.1  # seconds between two chunks, lets other writers take the locks
+
+
+def get_retention_setting(key, default):
+    """Read a value from settings.NOTIFICATION_SETTINGS with a fallback"""
+    return getattr(settings, 'NOTIFICATION_SETTINGS', {}).get(key, default)
+
+
+# ===== RETENTION POLICIES =====
+
+def read_notifications_before(cutoff):
+    """Notifications read (by anyone) before cutoff, without recent email activity (last 7 days)"""
+    from ..models import Notification
+    return Notification.objects.read_before(cutoff).exclude(
+        email_opened_at__gte=timezone.now() - timedelta(days=7)
+    )
+
+
+def tracking_data_before(cutoff):
+    """Read notifications whose email tracking is older than cutoff (not opened in the last 30 days)"""
+    from ..models import Notification
+    return Notification.objects.read_before(cutoff).filter(
+        email_sent_at__lt=cutoff
+    ).exclude(
+        email_opened_at__gte=timezone.now() - timedelta(days=30)
+    )
+
+
+# name -> (settings key for the retention days, default days, queryset builder)
+RETENTION_POLICIES = {
+    'notifications': ('NOTIFICATION_RETENTION_DAYS', 30, read_notifications_before),
+    'tracking': ('TRACKING_DATA_RETENTION_DAYS', 90, tracking_data_before),
+}
+
+
+# ===== CHUNKED DELETE ENGINE =====
+
+def delete_in_chunks(queryset, batch_size=None, pause=None, start_after=0,
+                     max_batches=None, dry_run=False, progress=None):
+    """
+    Delete the rows of queryset in primary-key-ordered chunks.
+
+    Each chunk is its own short transaction, so locks are held for one batch only
+    and an interrupted run keeps what it already deleted. Running it again simply
+    continues; start_after (the last_pk of a previous run) skips the scanned range.
+    Returns the progress stats dict (deleted, batches, last_pk, elapsed, rate).
+    """
+    batch_size = batch_size or get_retention_setting('RETENTION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    if pause is None:
+        pause = get_retention_setting('RETENTION_BATCH_PAUSE', DEFAULT_BATCH_PAUSE)
+
+    stats = {
+        'model': queryset.model._meta.label,
+        'deleted': 0,
+        'batches': 0,
+        'last_pk': start_after or 0,
+        'elapsed': 0.0,
+        'rate': 0.0,
+        'finished': False,
+    }
+    started = time.monotonic()
+
+    while max_batches is None or stats['batches'] < max_batches:
+        pks = list(
+            queryset.filter(pk__gt=stats['last_pk'])
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            stats['finished'] = True
+            break
+
+        if dry_run:
+            deleted = len(pks)
+        else:
+            with transaction.atomic():
+                # Re-apply the policy filter: a row may have changed since it was selected
+                _, per_model = queryset.filter(pk__in=pks).delete()
+            deleted = per_model.get(stats['model'], 0)
+
+        stats['deleted'] += deleted
+        stats['batches'] += 1
+        stats['last_pk'] = pks[-1]
+        stats['elapsed'] = round(time.monotonic() - started, 3)
+        stats['rate'] = round(stats['deleted'] / stats['elapsed'], 1) if stats['elapsed'] else 0.0
+
+        logger.info(
+            f"Retention {stats['model']}: batch {stats['batches']} deleted {deleted} "
+            f"(total {stats['deleted']}, last_pk {stats['last_pk']}, {stats['rate']} rows/s)"
+        )
+        if progress:
+            progress(stats)
+
+        if len(pks) < batch_size:
+            stats['finished'] = True
+            break
+        if pause:
+            time.sleep(pause)
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def run_retention(policy, days=None, **options):
+    """Apply a retention policy ('notifications' or 'tracking') with the chunked engine"""
+    if policy not in RETENTION_POLICIES:
+        raise ValueError(f"Unknown retention policy: {policy}")
+
+    setting_key, default_days, build_queryset = RETENTION_POLICIES[policy]
+    if days is None:
+        days = get_retention_setting(setting_key, default_days)
+
+    # The cutoff is fixed once so every chunk applies the same rule
+    cutoff = timezone.now() - timedelta(days=int(days))
+    stats = delete_in_chunks(build_queryset(cutoff), **options)
+    stats.update({'policy': policy, 'days': int(days), 'cutoff': cutoff.isoformat()})
+    return stats
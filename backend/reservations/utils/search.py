@@ -0,0 +1,38 @@
+from django.db.models import Q
+from functools import reduce
+import operator
+
+from .phone import looks_like_phone, normalize_phone, reversed_phone_digits
+
+MIN_PHONE_SUFFIX = 4  # shorter endings match too many numbers
+
+
+def customer_search_q(search_term, prefix=''):
+    """
+    Q object for a customer search, shaped for the indexes:
+    - phone-like term: normalized digits prefix or last digits (reversed prefix), btree indexes
+    - anything else: every word in the name or the email (icontains, pg_trgm indexes on PostgreSQL)
+    prefix targets a relation, e.g. 'related_reservation__' from Notification.
+    """
+    term = (search_term or '').strip()
+    if not term:
+        return Q()
+
+    if looks_like_phone(term):
+        clauses = []
+        digits = normalize_phone(term)
+        if digits:  # '000', '+000': nothing left, startswith('') would match every row
+            clauses.append(Q(**{f'{prefix}customer_phone_digits__startswith': digits}))
+        suffix = reversed_phone_digits(term)
+        if len(suffix) >= MIN_PHONE_SUFFIX:
+            clauses.append(Q(**{f'{prefix}customer_phone_reversed__startswith': suffix}))
+        if clauses:
+            return reduce(operator.or_, clauses)
+
+    if '@' in term:
+        return Q(**{f'{prefix}customer_email__icontains': term})
+
+    return reduce(operator.and_, (
+        Q(**{f'{prefix}customer_name__icontains': word}) | Q(**{f'{prefix}customer_email__icontains': word})
+        for word in term.split()
+    ))
@@ -0,0 +1,151 @@
+from django.conf import settings
+from urllib.parse import parse_qs
+import hashlib
+import hmac
+import json
+import logging
+import re
+import uuid
+
+logger = logging.getLogger('reservations.traffic')
+
+DEFAULT_PATHS = ['/api/', '/track/']
+DEFAULT_MAX_BODY_BYTES = 64 * 1024
+
+# Values kept as they are: they drive availability and capacity, not identity
+KEPT_FIELDS = {
+    'date', 'time', 'number_of_guests', 'guests', 'party_size', 'days', 'limit',
+    'start', 'status', 'format', 'action', 'page', 'page_size', 'notify', 'dry_run',
+}
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+$')
+PHONE_RE = re.compile(r'^\+?[\d\s().-]{8,20}$')
+UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+MAX_STRING_LENGTH = 1000
+PHONE_PREFIX_DIGITS = 4
+
+
+def get_capture_setting(key, default):
+    """Read a value from settings.TRAFFIC_CAPTURE with a fallback"""
+    return getattr(settings, 'TRAFFIC_CAPTURE', {}).get(key, default)
+
+
+def should_capture(request, user):
+    """Public traffic under TRAFFIC_CAPTURE['PATHS'] (staff sessions cannot be replayed)"""
+    path = request.path
+    if not path.startswith(tuple(get_capture_setting('PATHS', DEFAULT_PATHS))):
+        return False
+    if path.startswith(tuple(get_capture_setting('EXCLUDE_PATHS', []))):
+        return False
+    return not (user and user.is_authenticated)
+
+
+# ===== ANONYMIZATION =====
+
+def pseudonym(value):
+    """Stable keyed hash: the same customer gets the same pseudonym, which cannot be reversed"""
+    return hmac.new(settings.SECRET_KEY.encode(), str(value).encode(), hashlib.sha256).hexdigest()
+
+
+def anonymize_string(value):
+    digest = pseudonym(value)
+    if EMAIL_RE.match(value):
+        return f"client-{digest[:10]}@example.com"
+    if PHONE_RE.match(value) and sum(char.isdigit() for char in value) >= 8:
+        # Country / operator prefix kept (first digits), the rest from the hash
+        digits = iter(str(int(digest, 16)))
+        result, seen = [], 0
+        for char in value:
+            if char.isdigit():
+                seen += 1
+                char = char if seen <= PHONE_PREFIX_DIGITS else next(digits)
+            result.append(char)
+        return ''.join(result)
+    # Same length (shape of free text: names, special requests)
+    length = min(len(value), MAX_STRING_LENGTH)
+    return (digest * (length // len(digest) + 1))[:length]
+
+
+def anonymize_value(key, value):
+    if isinstance(value, dict):
+        return {name: anonymize_value(name, item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [anonymize_value(key, item) for item in value]
+    if not isinstance(value, str) or key in KEPT_FIELDS:
+        return value  # numbers, booleans, null, dates/times
+    return anonymize_string(value)
+
+
+def anonymize_path(path):
+    """Tracking tokens (UUIDs) replaced by a stable pseudonymous UUID"""
+    return UUID_RE.sub(lambda match: str(uuid.UUID(pseudonym(match.group(0).lower())[:32])), path)
+
+
+def has_pseudonymous_token(path):
+    """Captured path with an anonymized token (/track/<uuid>/...): unknown to any database, replays get a 404"""
+    return bool(UUID_RE.search(path))
+
+
+def anonymize_query(query_string):
+    params = parse_qs(query_string, keep_blank_values=True)
+    return {key: [anonymize_value(key, value) for value in values] for key, values in params.items()}
+
+
+def read_body(request):
+    """Request body as JSON / form fields, before the view consumes the stream - None when not captured"""
+    content_type = request.content_type or ''
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not length:
+        return None
+    if content_type.startswith('multipart/') or length > get_capture_setting('MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES):
+        return {'_omitted': content_type, '_bytes': length}
+    body = request.body  # cached on the request, the view reads it again
+    if content_type == 'application/json':
+        try:
+            return json.loads(body)
+        except ValueError:
+            return {'_invalid_json': len(body)}
+    if content_type == 'application/x-www-form-urlencoded':
+        return {key: values[0] if len(values) == 1 else values
+                for key, values in parse_qs(body.decode('utf-8', 'replace'), keep_blank_values=True).items()}
+    return {'_omitted': content_type, '_bytes': length}
+
+
+# ===== TRACE =====
+
+def trace_entry(request, body, response, started_at, duration):
+    """One replayable line: what was asked (anonymized), how it went"""
+    match = getattr(request, 'resolver_match', None)
+    return {
+        't': round(started_at, 4),
+        'method': request.method,
+        'path': anonymize_path(request.path),
+        'route': match.view_name if match else None,
+        'query': anonymize_query(request.META.get('QUERY_STRING', '')),
+        'content_type': request.content_type if body is not None else None,
+        'body': anonymize_value('', body) if body is not None else None,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'response_bytes': len(response.content) if not response.streaming else None,
+    }
+
+
+def write_trace(entry):
+    """Through the queued 'reservations.traffic' logger (rotating file, see LOGGING)"""
+    logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def load_traces(paths):
+    """Trace entries of capture files (oldest file first), sorted by start time"""
+    entries = []
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # line cut by a crash / rotation
+    entries.sort(key=lambda entry: entry['t'])
+    return entries
@@ -2,28 +2,40 @@
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
+from django.db import transaction
 from datetime import datetime, timedelta
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, CreateView
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.utils.decorators import method_decorator
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework.views import APIView
-from .models import RestaurantInfo, Reservation, TimeSlot, SpecialDate, Notification, get_restaurant_info
+from .models import RestaurantInfo, Reservation, TimeSlot, SpecialDate, Notification, Customer, get_restaurant_info
 from .serializers import ReservationSerializer, TimeSlotSerializer, RestaurantSerializer
+from .utils.archive import archive_path, list_archived_months, search_archived_month, stream_archived_month
+from .utils.export import EXPORT_CONTENT_TYPES, export_reservations_response
+from .utils.bulk_import import NOTIFY_MODES, detect_format, import_reservations
+from .utils.content_versions import conditional_content
+from .utils.opening_calendar import get_opening_calendar
+from .utils.occupancy import day_occupancy, get_day_occupancy, lock_day
+from .utils.availability import MAX_HORIZON_DAYS, MAX_RESULTS, find_available_slots, next_available_label
+from .utils.metrics import inc, render_prometheus, scrape_token_is_valid
+from .utils.profiling import get_profile_path, list_profiles
+from asgiref.sync import sync_to_async
+import asyncio
+import io
+import itertools
 import json
 import logging
 import re
 
-# EMAIL VERIFICATION IMPORTS
-try:
-    import dns.resolver
-    DNS_AVAILABLE = True
-except ImportError:
-    DNS_AVAILABLE = False
+# EMAIL VERIFICATION IMPORTS (MX lookups are cached in utils/email_domains.py)
+from .utils.email_domains import DNS_AVAILABLE, adomain_accepts_email
+if not DNS_AVAILABLE:
     print("⚠️ WARNING: dnspython not installed. Email verification will be limited.")
 
 logger = logging.getLogger(__name__)
@@ -254,19 +266,19 @@ def debug_email_settings(request):
 def check_notifications_with_failed_emails(request):
     """Step 6: Check for failed email notifications"""
     try:
-        failed_notifications = Notification.objects.filter(
+        failed_notifications = Notification.objects.feed().filter(
             message_type='email_failed'
         ).order_by('-created_at')[:10]
         
         failed_data = []
         for notification in failed_notifications:
             failed_data.append({
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'customer_name': notification.customer_name,
-                'customer_email': notification.customer_email,
+                'id': notification['id'],
+                'title': notification['title'],
+                'message': notification['message'],
+                'created_at': notification['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                'customer_name': notification['customer_name'] or 'N/A',
+                'customer_email': notification['customer_email'] or 'N/A',
             })
         
         return JsonResponse({
@@ -310,13 +322,16 @@ def email_tracking_view(request, token, action="view"):
         # Find notification by tracking token
         notification = get_object_or_404(Notification, tracking_token=token)
         
+        tracked_action = action if action in ('view', 'confirm') else 'pixel'  # bounded label values
+        inc('reservations_email_tracking_total', action=tracked_action, first_open=not notification.email_opened_by_client)
+
         # Mark email as opened by client
         if not notification.email_opened_by_client:
             notification.mark_email_as_opened(request)
             
             # Log the tracking event
             logger.info(f"Email opened: {notification.title} by IP {notification.get_client_ip(request)}")
-            print(f"📧 Email tracking: {notification.title} opened by client")
+            logger.debug(f"📧 Email tracking: {notification.title} opened by client")
         
         # Handle different actions
         if action == "view":
@@ -358,29 +373,24 @@ def email_tracking_stats(request):
         # Get stats for last 30 days
         thirty_days_ago = timezone.now() - timedelta(days=30)
         
-        notifications = Notification.objects.filter(
-            created_at__gte=thirty_days_ago,
-            email_sent=True
-        )
-        
-        total_sent = notifications.count()
-        total_opened = notifications.filter(email_opened_by_client=True).count()
-        open_rate = (total_opened / total_sent * 100) if total_sent > 0 else 0
+        email_stats = Notification.get_email_stats(days=30)
         
-        # Recent openings
-        recent_openings = notifications.filter(
+        # Recent openings (reservation columns joined in the same query)
+        recent_openings = Notification.objects.feed().filter(
+            created_at__gte=thirty_days_ago,
+            email_sent=True,
             email_opened_by_client=True
         ).order_by('-email_opened_at')[:10]
         
         stats = {
-            'total_sent': total_sent,
-            'total_opened': total_opened,
-            'open_rate': round(open_rate, 1),
+            'total_sent': email_stats['total_sent'],
+            'total_opened': email_stats['total_opened'],
+            'open_rate': email_stats['open_rate'],
             'recent_openings': [
                 {
-                    'customer_name': n.related_reservation.customer_name if n.related_reservation else 'N/A',
-                    'opened_at': n.email_opened_at.strftime('%d/%m/%Y %H:%M') if n.email_opened_at else 'N/A',
-                    'title': n.title
+                    'customer_name': n['customer_name'] or 'N/A',
+                    'opened_at': n['email_opened_at'].strftime('%d/%m/%Y %H:%M') if n['email_opened_at'] else 'N/A',
+                    'title': n['title']
                 }
                 for n in recent_openings
             ]
@@ -396,9 +406,10 @@ def email_tracking_stats(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def verify_email_exists(request):
+async def verify_email_exists(request):
     """
     Comprehensive email verification: Format + Domain + Typos + Disposable blocking
+    (async: the MX lookup does not hold a worker thread)
     """
     try:
         data = json.loads(request.body)
@@ -554,15 +565,12 @@ def verify_email_exists(request):
             })
         
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            
-            # Domain has MX records, email format is valid
-            return JsonResponse({
-                'exists': True,
-                'message': 'Email format is valid and domain accepts emails'
-            })
-            
-        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            if await adomain_accepts_email(domain):
+                # Domain has MX records, email format is valid
+                return JsonResponse({
+                    'exists': True,
+                    'message': 'Email format is valid and domain accepts emails'
+                })
             return JsonResponse({
                 'exists': False,
                 'error': 'Domain does not exist or cannot receive emails'
@@ -590,7 +598,7 @@ def verify_email_exists(request):
 # Alternative lightweight verification (less accurate but faster)
 @csrf_exempt
 @require_http_methods(["POST"])
-def verify_email_lightweight(request):
+async def verify_email_lightweight(request):
     """
     Lightweight email verification - only checks domain validity
     """
@@ -614,13 +622,12 @@ def verify_email_lightweight(request):
         
         # Check if domain has MX record
         try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            return JsonResponse({
-                'exists': True,
-                'message': 'Domain can receive emails',
-                'verification_type': 'domain_only'
-            })
-        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            if await adomain_accepts_email(domain):
+                return JsonResponse({
+                    'exists': True,
+                    'message': 'Domain can receive emails',
+                    'verification_type': 'domain_only'
+                })
             return JsonResponse({
                 'exists': False,
                 'error': 'Domain does not accept emails'
@@ -647,7 +654,7 @@ def verify_email_lightweight(request):
 # For bulk email verification (if needed)
 @csrf_exempt
 @require_http_methods(["POST"])
-def verify_emails_bulk(request):
+async def verify_emails_bulk(request):
     """
     Verify multiple emails at once
     """
@@ -660,8 +667,7 @@ def verify_emails_bulk(request):
                 'error': 'Invalid email list (max 50 emails)'
             }, status=400)
         
-        results = []
-        for email in emails:
+        async def verify(email):
             # Use the main verification function
             mock_request = type('MockRequest', (), {
                 'method': 'POST',
@@ -669,14 +675,17 @@ def verify_emails_bulk(request):
             })()
             
             # Get verification result
-            result = verify_email_exists(mock_request)
+            result = await verify_email_exists(mock_request)
             result_data = json.loads(result.content)
             
-            results.append({
+            return {
                 'email': email,
                 'exists': result_data.get('exists'),
                 'message': result_data.get('message', result_data.get('error', ''))
-            })
+            }
+        
+        # ✅ All the lookups of the list are in flight together
+        results = await asyncio.gather(*(verify(email) for email in emails))
         
         return JsonResponse({
             'results': results,
@@ -698,6 +707,14 @@ def verify_emails_bulk(request):
 
 # ===== API VIEWS FOR FRONTEND (React) =====
 
+def timeslot_content(request):
+    """Slot list only depends on reservations when ?date= asks for availability"""
+    if 'date' in request.GET:
+        return ('timeslots', 'reservations')
+    return ('timeslots',)
+
+# ✅ Conditional GET: repeat fetches get a 304 (ETag / Last-Modified) without any query
+@method_decorator(conditional_content(('restaurant', 'reservations'), daily=True), name='get')
 class RestaurantDetailView(generics.RetrieveAPIView):
     """Get restaurant details - Single Restaurant"""
     serializer_class = RestaurantSerializer
@@ -706,6 +723,7 @@ class RestaurantDetailView(generics.RetrieveAPIView):
         # Always return the single restaurant instance
         return get_restaurant_info()
 
+@method_decorator(conditional_content(timeslot_content), name='get')
 class TimeSlotListView(generics.ListAPIView):
     """List all available time slots"""
     serializer_class = TimeSlotSerializer
@@ -754,7 +772,12 @@ class ReservationCreateView(generics.CreateAPIView):
             # Check availability before creating
             date_str = data['date']
             time_str = data['time']
-            guests = int(data['number_of_guests'])
+            guests = parse_guests(data['number_of_guests'])
+            if guests is None:
+                return Response(
+                    {'error': 'number_of_guests must be an integer between 1 and 20'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             try:
                 # Parse date without timezone conversion
@@ -767,47 +790,62 @@ class ReservationCreateView(generics.CreateAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # ✅ NEW: Check if date is a special date (closed)
-            special_date = SpecialDate.objects.filter(date=date).first()
-            if special_date and not special_date.is_open:
+            # ✅ Closures, closed weekdays and special hours: in-memory calendar lookup
+            calendar = get_opening_calendar()
+            if not calendar.is_open(date):
                 return Response(
                     {'error': 'Restaurant fermé ce jour-là'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
             # Check if time slot exists and has capacity
-            try:
-                time_slot = TimeSlot.objects.get(time=time_obj, is_active=True)
-            except TimeSlot.DoesNotExist:
+            time_slot = calendar.get_slot(date, time_obj)
+            if time_slot is None:
                 return Response(
                     {'error': 'Selected time slot is not available'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Count existing reservations
-            existing_reservations = Reservation.objects.filter(
-                date=date,
-                time=time_obj,
-                status__in=['En attente', 'Confirmée']
-            ).count()
-            
-            if existing_reservations >= time_slot.max_reservations:
+            # ✅ Client history: counters read from Customer (one indexed lookup)
+            refusal = Customer.objects.booking_refusal(data['customer_phone'], data['customer_email'])
+            if refusal:
                 return Response(
-                    {'error': 'This time slot is fully booked'}, 
+                    {'error': refusal}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Create the reservation
-            reservation = Reservation.objects.create(
-                customer_name=data['customer_name'],
-                customer_email=data['customer_email'],
-                customer_phone=data['customer_phone'],
-                date=date,
-                time=time_obj,
-                number_of_guests=guests,
-                special_requests=data.get('special_requests', ''),
-                status='En attente'
-            )
+            restaurant = get_restaurant_info()
+            
+            # ✅ Day locked: two bookings of the same day (overlapping stays) are checked one after the other
+            with transaction.atomic():
+                lock_day(date)
+                
+                # Bookings of the day (one query): slot covers + seats still taken by earlier parties
+                occupancy = day_occupancy(date)
+                
+                if not time_slot.accepts(*occupancy.slot_usage(time_obj), guests=guests):
+                    return Response(
+                        {'error': 'This time slot is fully booked'}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                if not occupancy.fits(time_obj, guests, restaurant.capacity, restaurant.number_of_tables):
+                    return Response(
+                        {'error': 'Not enough seats left at this time'}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                
+                # Create the reservation (admin message + email: on commit, after the lock)
+                reservation = Reservation.objects.create(
+                    customer_name=data['customer_name'],
+                    customer_email=data['customer_email'],
+                    customer_phone=data['customer_phone'],
+                    date=date,
+                    time=time_obj,
+                    number_of_guests=guests,
+                    special_requests=data.get('special_requests', ''),
+                    status='En attente'
+                )
 
             return Response({
                 'id': reservation.id,
@@ -837,17 +875,27 @@ class ReservationCreateView(generics.CreateAPIView):
             )
 
 # ===== SPECIAL DATES API ENDPOINT =====
-@api_view(['GET'])
-def special_dates_list(request):
-    """Get all special dates for frontend calendar"""
+@conditional_content(('special_dates',), daily=True)
+@require_http_methods(["GET"])
+async def special_dates_list(request):
+    """Get all special dates for frontend calendar (async view, async ORM)"""
     try:
         # Get future special dates only
         special_dates = SpecialDate.objects.filter(
             date__gte=timezone.now().date()
-        ).values('date', 'is_open', 'reason', 'special_hours')
+        )
         
+        # special_hours is a property, it cannot go through values()
         return JsonResponse({
-            'special_dates': list(special_dates)
+            'special_dates': [
+                {
+                    'date': special_date.date,
+                    'is_open': special_date.is_open,
+                    'reason': special_date.reason,
+                    'special_hours': special_date.special_hours,
+                }
+                async for special_date in special_dates
+            ]
         })
     except Exception as e:
         return JsonResponse({
@@ -855,9 +903,17 @@ def special_dates_list(request):
         }, status=500)
 
 # ===== AVAILABILITY ENDPOINT WITH SPECIAL DATES =====
+def parse_guests(value):
+    """Party size of a request (1 when missing), None unless an integer between 1 and 20"""
+    try:
+        guests = int(value or 1)
+    except (TypeError, ValueError):
+        return None
+    return guests if 1 <= guests <= 20 else None
+
 @csrf_exempt
-def check_availability_by_date(request):
-    """Check availability for a specific date with special dates integration"""
+async def check_availability_by_date(request):
+    """Check availability for a specific date with special dates integration (async view)"""
     if request.method == 'GET':
         try:
             date_str = request.GET.get('date')
@@ -870,82 +926,94 @@ def check_availability_by_date(request):
             except ValueError:
                 return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
             
-            # ✅ NEW: Check if date is a special date
-            special_date = SpecialDate.objects.filter(date=date).first()
-            if special_date and not special_date.is_open:
-                return JsonResponse({
-                    'date': date_str,
-                    'availability': [],
-                    'message': 'Restaurant fermé ce jour',
-                    'is_special_date': True,
-                    'reason': special_date.reason,
-                    'total_slots': 0
-                })
-            
-            # Get all active time slots
-            time_slots = TimeSlot.objects.filter(is_active=True).order_by('time')
-            
-            # If no time slots exist, create default ones
-            if not time_slots.exists():
-                default_slots = [
-                    {'time': '12:00', 'max_reservations': 10},
-                    {'time': '13:00', 'max_reservations': 12},
-                    {'time': '14:00', 'max_reservations': 10},
-                    {'time': '19:00', 'max_reservations': 8},
-                    {'time': '20:00', 'max_reservations': 10},
-                    {'time': '21:00', 'max_reservations': 8},
-                ]
-                for slot_data in default_slots:
-                    TimeSlot.objects.create(
-                        time=slot_data['time'],
-                        max_reservations=slot_data['max_reservations'],
-                        is_active=True
-                    )
-                time_slots = TimeSlot.objects.filter(is_active=True).order_by('time')
-            
-            availability_data = []
-            for slot in time_slots:
-                # Count existing reservations for this date and time
-                existing_reservations = Reservation.objects.filter(
-                    date=date,
-                    time=slot.time,
-                    status__in=['En attente', 'Confirmée']
-                ).count()
-                
-                available_spots = slot.max_reservations - existing_reservations
-                is_available = available_spots > 0
-                
-                availability_data.append({
-                    'time': slot.time.strftime('%H:%M'),
-                    'time_id': slot.id,
-                    'max_reservations': slot.max_reservations,
-                    'existing_reservations': existing_reservations,
-                    'available_spots': max(0, available_spots),
-                    'is_available': is_available
-                })
-            
-            response_data = {
-                'date': date_str,
-                'availability': availability_data,
-                'total_slots': len(availability_data),
-                'is_special_date': False
-            }
-            
-            # Add special date info if it exists but is open
-            if special_date and special_date.is_open:
-                response_data.update({
-                    'is_special_date': True,
-                    'reason': special_date.reason,
-                    'special_hours': special_date.special_hours
-                })
+            guests = parse_guests(request.GET.get('guests'))
+            if guests is None:
+                return JsonResponse({'error': 'guests must be an integer between 1 and 20'}, status=400)
             
-            return JsonResponse(response_data)
+            # Calendar / occupancy caches and their rebuilds are sync code (locks, ORM)
+            return await sync_to_async(availability_by_date_response)(date_str, date, guests)
             
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
     
     return JsonResponse({'error': 'GET method required'}, status=405)
 
+
+def availability_by_date_response(date_str, date, guests):
+    """Slots of one day with their free covers (compiled calendar + precomputed occupancy)"""
+    # ✅ Closures and special hours from the compiled calendar (no query)
+    calendar = get_opening_calendar()
+    special_date = calendar.special_date(date)
+    if not calendar.is_open(date):
+        return JsonResponse({
+            'date': date_str,
+            'availability': [],
+            'message': 'Restaurant fermé ce jour',
+            'is_special_date': special_date is not None,
+            'reason': special_date['reason'] if special_date else calendar.closure_reason(date),
+            'total_slots': 0
+        })
+
+    # Bookable time slots of the day
+    time_slots = calendar.open_slots(date)
+
+    # If no time slots exist, create default ones
+    if not calendar.slots:
+        default_slots = [
+            {'time': '12:00', 'max_reservations': 10},
+            {'time': '13:00', 'max_reservations': 12},
+            {'time': '14:00', 'max_reservations': 10},
+            {'time': '19:00', 'max_reservations': 8},
+            {'time': '20:00', 'max_reservations': 10},
+            {'time': '21:00', 'max_reservations': 8},
+        ]
+        for slot_data in default_slots:
+            TimeSlot.objects.create(
+                time=slot_data['time'],
+                max_reservations=slot_data['max_reservations'],
+                is_active=True
+            )
+        time_slots = get_opening_calendar().open_slots(date)
+
+    # Bookings of the day, precomputed (overlapping stays included)
+    occupancy = get_day_occupancy(date)
+    restaurant = get_restaurant_info()
+
+    availability_data = []
+    for slot in time_slots:
+        existing_reservations, booked_covers = occupancy.slot_usage(slot.time)
+        available_spots = occupancy.slot_available_covers(
+            slot, guests, restaurant.capacity, restaurant.number_of_tables
+        )
+
+        availability_data.append({
+            'time': slot.time.strftime('%H:%M'),
+            'time_id': slot.id,
+            'max_covers': slot.max_covers,
+            'booked_covers': booked_covers,
+            'max_reservations': slot.max_reservations,
+            'existing_reservations': existing_reservations,
+            'available_spots': available_spots,
+            'is_available': available_spots >= guests
+        })
+
+    response_data = {
+        'date': date_str,
+        'availability': availability_data,
+        'total_slots': len(availability_data),
+        'is_special_date': False
+    }
+
+    # Add special date info if it exists but is open
+    if special_date and special_date['is_open']:
+        response_data.update({
+            'is_special_date': True,
+            'reason': special_date['reason'],
+            'special_hours': special_date['special_hours']
+        })
+
+    return JsonResponse(response_data)
+
 @api_view(['GET'])
 def check_availability(request):
     """Check availability for a specific date and time - Legacy endpoint"""
@@ -967,38 +1035,89 @@ def check_availability(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Check if date is a special date (closed)
-    special_date = SpecialDate.objects.filter(date=date).first()
-    if special_date and not special_date.is_open:
+    guests = parse_guests(request.GET.get('guests'))
+    if guests is None:
+        return Response(
+            {'error': 'guests must be an integer between 1 and 20'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Closed days and special hours (compiled calendar)
+    calendar = get_opening_calendar()
+    if not calendar.is_open(date):
         return Response({
             'available': False, 
             'message': 'Restaurant fermé ce jour'
         }, status=status.HTTP_200_OK)
     
     # Get time slot
-    try:
-        time_slot = TimeSlot.objects.get(time=time, is_active=True)
-    except TimeSlot.DoesNotExist:
+    time_slot = calendar.get_slot(date, time)
+    if time_slot is None:
         return Response(
             {'available': False, 'message': 'Time slot not available'}, 
             status=status.HTTP_200_OK
         )
     
-    # Check reservations for this date and time
-    existing_reservations = Reservation.objects.filter(
-        date=date,
-        time=time,
-        status__in=['En attente', 'Confirmée']
-    ).count()
-    
-    available_spots = max(0, time_slot.max_reservations - existing_reservations)
+    # Covers of the slot + seats still taken by parties seated earlier (precomputed)
+    occupancy = get_day_occupancy(date)
+    restaurant = get_restaurant_info()
+    available_spots = occupancy.slot_available_covers(
+        time_slot, guests, restaurant.capacity, restaurant.number_of_tables
+    )
     
     return Response({
-        'available': available_spots > 0,
+        'available': available_spots >= guests,
         'available_spots': available_spots,
+        'max_covers': time_slot.max_covers,
         'max_reservations': time_slot.max_reservations
     })
 
+# ===== NEXT AVAILABLE SLOTS =====
+@api_view(['GET'])
+def next_available_slots(request):
+    """First free slots for a party size (?party_size=2&days=14&limit=5)"""
+    try:
+        party_size = int(request.GET.get('party_size', 1))
+        days = int(request.GET.get('days', 7))
+        limit = int(request.GET.get('limit', 1))
+    except ValueError:
+        return JsonResponse({'error': 'party_size, days and limit must be integers'}, status=400)
+    
+    if not 1 <= party_size <= 20:
+        return JsonResponse({'error': 'party_size must be between 1 and 20'}, status=400)
+    if not 1 <= days <= MAX_HORIZON_DAYS:
+        return JsonResponse({'error': f'days must be between 1 and {MAX_HORIZON_DAYS}'}, status=400)
+    if not 1 <= limit <= MAX_RESULTS:
+        return JsonResponse({'error': f'limit must be between 1 and {MAX_RESULTS}'}, status=400)
+    
+    start = None
+    if request.GET.get('from'):
+        try:
+            start = datetime.strptime(request.GET['from'], '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid from date. Use YYYY-MM-DD'}, status=400)
+        if start < timezone.localdate():
+            start = None
+    
+    try:
+        slots = find_available_slots(party_size=party_size, days=days, limit=limit, start=start)
+        return JsonResponse({
+            'party_size': party_size,
+            'days': days,
+            'slots': [
+                {
+                    'date': slot['date'].strftime('%Y-%m-%d'),
+                    'time': slot['time'].strftime('%H:%M'),
+                    'time_id': slot['time_id'],
+                    'available_spots': slot['available_spots'],
+                }
+                for slot in slots
+            ],
+            'count': len(slots)
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
 # ===== TEST ENDPOINT =====
 @csrf_exempt
 def api_test(request):
@@ -1031,6 +1150,125 @@ class ReservationDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
 
+@staff_member_required
+@require_http_methods(["GET"])
+def export_reservations(request):
+    """Streaming export (?format=csv|xlsx&date_from=&date_to=&status=&search=)"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': 'format must be csv or xlsx'}, status=400)
+    
+    queryset = Reservation.objects.all()
+    try:
+        if request.GET.get('date_from'):
+            queryset = queryset.filter(date__gte=datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date())
+        if request.GET.get('date_to'):
+            queryset = queryset.filter(date__lte=datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date())
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+    
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    search = (request.GET.get('search') or '').strip()
+    if search:
+        queryset = queryset.filter(
+            Q(customer_name__icontains=search) |
+            Q(customer_phone__icontains=search) |
+            Q(customer_email__icontains=search)
+        )
+    
+    return export_reservations_response(queryset.order_by('-date', '-time'), export_format)
+
+@require_http_methods(["GET"])
+def prometheus_metrics(request):
+    """Counters and latency histograms of all the workers, Prometheus text format (bearer token or staff)"""
+    if not (scrape_token_is_valid(request) or request.user.is_staff):
+        response = JsonResponse({'success': False, 'error': 'Authentification requise'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+@require_http_methods(["GET"])
+def profiles_list(request):
+    """Recent request profiles (newest first) - ?profile=1 on any page as staff to record one"""
+    profiles = list_profiles()
+    for profile in profiles:
+        profile['url'] = request.build_absolute_uri(f"/api/profiles/{profile['name']}")
+    return JsonResponse({'success': True, 'count': len(profiles), 'profiles': profiles})
+
+@staff_member_required
+@require_http_methods(["GET"])
+def profile_download(request, name):
+    """One stored profile: collapsed stacks (flamegraph.pl, speedscope) or pstats data"""
+    path = get_profile_path(name)
+    if path is None:
+        return JsonResponse({'success': False, 'error': 'Profil introuvable'}, status=404)
+    content_type = 'text/plain; charset=utf-8' if path.suffix == '.collapsed' else 'application/octet-stream'
+    response = HttpResponse(path.read_bytes(), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{path.name}"'
+    return response
+
+@api_view(['GET'])
+@staff_member_required
+def customer_lookup(request):
+    """Client history for a phone or email (?phone=&email=) - used when taking a booking"""
+    phone = request.GET.get('phone', '')
+    email = request.GET.get('email', '')
+    if not phone.strip() and not email.strip():
+        return JsonResponse({'error': 'phone or email is required'}, status=400)
+    
+    customer = Customer.objects.lookup(phone=phone, email=email)
+    if not customer:
+        return JsonResponse({'found': False})
+    
+    return JsonResponse({
+        'found': True,
+        'customer': {
+            'id': customer.id,
+            'name': customer.name,
+            'phone': customer.phone,
+            'email': customer.email,
+            'total_reservations': customer.total_reservations,
+            'cancelled_reservations': customer.cancelled_reservations,
+            'completed_reservations': customer.completed_reservations,
+            'cancellation_rate': customer.cancellation_rate,
+            'last_reservation_date': customer.last_reservation_date.strftime('%Y-%m-%d') if customer.last_reservation_date else None,
+            'last_visit': customer.last_visit.strftime('%Y-%m-%d') if customer.last_visit else None,
+            'history': customer.history_display
+        }
+    })
+
+IMPORT_MAX_ERRORS = 1000
+
+@api_view(['POST'])
+@staff_member_required
+def import_reservations_view(request):
+    """Bulk import from an uploaded CSV/JSONL file (fields: file, format, notify, dry_run)"""
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({'error': 'file is required'}, status=400)
+    
+    file_format = request.data.get('format') or detect_format(upload.name)
+    notify = request.data.get('notify', 'summary')
+    if notify not in NOTIFY_MODES:
+        return JsonResponse({'error': f"notify must be one of {', '.join(NOTIFY_MODES)}"}, status=400)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    
+    try:
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_reservations(stream, file_format=file_format, notify=notify, dry_run=dry_run)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Import error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    # Keep the response small on big files, the counts stay exact
+    report['errors_truncated'] = len(report['errors']) > IMPORT_MAX_ERRORS
+    report['errors'] = report['errors'][:IMPORT_MAX_ERRORS]
+    return JsonResponse(report, status=200 if dry_run else 201)
+
 @api_view(['GET'])
 @staff_member_required
 def dashboard_stats(request):
@@ -1040,6 +1278,7 @@ def dashboard_stats(request):
     
     # Get email tracking stats
     email_stats = Notification.get_email_stats(days=30)
+    notification_counts = Notification.get_counts(user=request.user)
     
     stats = {
         'restaurant_name': restaurant.name,
@@ -1057,8 +1296,8 @@ def dashboard_stats(request):
             'total_sent': email_stats['total_sent'],
             'total_opened': email_stats['total_opened'],
             'open_rate': email_stats['open_rate'],
-            'unread_notifications': Notification.get_unread_count(),
-            'urgent_notifications': Notification.get_urgent_count()
+            'unread_notifications': notification_counts['unread'],
+            'urgent_notifications': notification_counts['urgent']
         }
     }
     
@@ -1085,41 +1324,65 @@ def update_reservation_status(request, reservation_id):
 
 # ===== NOTIFICATION API VIEWS =====
 
+NOTIFICATION_PAGE_SIZE = 50
+NOTIFICATION_MAX_PAGE_SIZE = 200
+
+def serialize_notification_row(row):
+    """Build the notification API payload from a Notification.objects.feed() row"""
+    has_reservation = row['related_reservation_id'] is not None
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'message': row['message'],
+        'message_type': row['message_type'],
+        'priority': row['priority'],
+        'is_read': row['is_read'] or row.get('read_by_user', False),
+        'created_at': row['created_at'].strftime('%d/%m/%Y %H:%M'),
+        'time_ago': Notification.format_time_ago(row['created_at']),
+        'customer_name': row['customer_name'] if has_reservation else 'N/A',
+        'customer_phone': row['customer_phone'] if has_reservation else 'N/A',
+        'customer_email': row['customer_email'] if has_reservation else 'N/A',
+        'reservation_date': row['reservation_date'].strftime('%d/%m/%Y') if has_reservation else 'N/A',
+        'reservation_time': row['reservation_time'].strftime('%H:%M') if has_reservation else 'N/A',
+        
+        # Email tracking info
+        'email_sent': row['email_sent'],
+        'email_opened_by_client': row['email_opened_by_client'],
+        'email_status_display': Notification.format_email_status(
+            row['email_sent'], row['email_opened_by_client'],
+            row['email_sent_at'], row['email_opened_at']
+        ),
+        'tracking_token': str(row['tracking_token'])
+    }
+
+def parse_page_params(request, default_limit=NOTIFICATION_PAGE_SIZE, max_limit=NOTIFICATION_MAX_PAGE_SIZE):
+    """Read ?cursor=&limit= (cursor is the last id of the previous page)"""
+    try:
+        cursor = int(request.GET.get('cursor')) if request.GET.get('cursor') else None
+        limit = int(request.GET.get('limit', default_limit))
+    except (TypeError, ValueError):
+        raise ValueError('cursor and limit must be integers')
+    return cursor, max(1, min(limit, max_limit))
+
 @api_view(['GET'])
 @staff_member_required
 def notification_list(request):
-    """Get all notifications for admin dashboard"""
+    """Get notifications for admin dashboard - cursor paginated (?cursor=<id>&limit=<n>)"""
     try:
-        notifications = Notification.objects.all()[:50]  # Limit to 50 most recent
-        
-        notification_data = []
-        for notification in notifications:
-            notification_data.append({
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'message_type': notification.message_type,
-                'priority': notification.priority,
-                'is_read': notification.is_read,
-                'created_at': notification.created_at.strftime('%d/%m/%Y %H:%M'),
-                'time_ago': notification.time_ago,
-                'customer_name': notification.customer_name,
-                'customer_phone': notification.customer_phone,
-                'customer_email': notification.customer_email,
-                'reservation_date': notification.reservation_date,
-                'reservation_time': notification.reservation_time,
-                
-                # Email tracking info
-                'email_sent': notification.email_sent,
-                'email_opened_by_client': notification.email_opened_by_client,
-                'email_status_display': notification.email_status_display,
-                'tracking_token': str(notification.tracking_token)
-            })
+        try:
+            cursor, limit = parse_page_params(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        # One query for the page (reservation columns + read receipt), one for the counts
+        rows, next_cursor = Notification.objects.page(cursor=cursor, limit=limit, user=request.user)
+        counts = Notification.get_counts(user=request.user)
         
         return JsonResponse({
-            'notifications': notification_data,
-            'unread_count': Notification.get_unread_count(),
-            'urgent_count': Notification.get_urgent_count()
+            'notifications': [serialize_notification_row(row) for row in rows],
+            'next_cursor': next_cursor,
+            'unread_count': counts['unread'],
+            'urgent_count': counts['urgent']
         })
         
     except Exception as e:
@@ -1129,10 +1392,10 @@ def notification_list(request):
 @api_view(['POST'])
 @staff_member_required
 def mark_notification_read(request, notification_id):
-    """Mark a notification as read"""
+    """Mark a notification as read for the current user"""
     try:
         notification = get_object_or_404(Notification, id=notification_id)
-        notification.mark_as_read()
+        notification.mark_as_read(user=request.user)
         
         return JsonResponse({
             'success': True,
@@ -1145,9 +1408,9 @@ def mark_notification_read(request, notification_id):
 @api_view(['POST'])
 @staff_member_required
 def mark_all_notifications_read(request):
-    """Mark all notifications as read"""
+    """Mark all notifications as read for the current user"""
     try:
-        count = Notification.mark_all_as_read()
+        count = Notification.mark_all_as_read(user=request.user)
         
         return JsonResponse({
             'success': True,
@@ -1158,6 +1421,7 @@ def mark_all_notifications_read(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 # ===== RESTAURANT INFO API =====
+@conditional_content(('restaurant', 'reservations'), daily=True)
 @api_view(['GET'])
 def restaurant_info(request):
     """Get restaurant information"""
@@ -1209,67 +1473,21 @@ def get_available_tables_count(date, time):
     """Calculate available tables for given date and time"""
     restaurant = get_restaurant_info()
     
-    # Count reservations for today
-    reservations_count = Reservation.objects.filter(
-        date=date,
-        status__in=['Confirmée', 'En attente']
-    ).count()
+    # Reservations of the day from the precomputed occupancy
+    reservations_count = get_day_occupancy(date).total_reservations
     
     return max(0, restaurant.number_of_tables - reservations_count)
 
 def get_peak_hour_today(date):
     """Find the busiest hour for today"""
-    peak_hour = Reservation.objects.filter(
-        date=date,
-        status__in=['En attente', 'Confirmée']
-    ).values('time').annotate(
-        count=Count('id')
-    ).order_by('-count').first()
-    
-    if peak_hour and peak_hour['count'] > 0:
-        return peak_hour['time'].strftime('%H:%M')
+    peak_time = get_day_occupancy(date).busiest_slot(by_guests=False)
+    if peak_time:
+        return peak_time.strftime('%H:%M')
     return None
 
 def get_next_available_slot():
-    """Find next available time slot with special dates check"""
-    now = timezone.localtime(timezone.now())
-    current_date = now.date()
-    current_time = now.time()
-    
-    # Look for available slots in the next 7 days
-    for days_ahead in range(7):
-        check_date = current_date + timedelta(days=days_ahead)
-        
-        # Check if date is a special date (closed)
-        special_date = SpecialDate.objects.filter(date=check_date).first()
-        if special_date and not special_date.is_open:
-            continue
-        
-        # Get all time slots for this date
-        time_slots = TimeSlot.objects.filter(is_active=True).order_by('time')
-        
-        for slot in time_slots:
-            # If it's today, skip past time slots
-            if days_ahead == 0:
-                if slot.time <= current_time:
-                    continue
-            
-            reservations_count = Reservation.objects.filter(
-                date=check_date,
-                time=slot.time,
-                status__in=['Confirmée', 'En attente']
-            ).count()
-            
-            # Check against slot max reservations
-            if reservations_count < slot.max_reservations:
-                if days_ahead == 0:
-                    return f"Aujourd'hui {slot.time.strftime('%H:%M')}"
-                elif days_ahead == 1:
-                    return f"Demain {slot.time.strftime('%H:%M')}"
-                else:
-                    return f"{check_date.strftime('%d/%m')} à {slot.time.strftime('%H:%M')}"
-    
-    return "Aucun créneau disponible cette semaine"
+    """Find next available time slot - closures from the calendar, bookings in one grouped query"""
+    return next_available_label()
 
 # ===== DASHBOARD VIEWS (if needed) =====
 
@@ -1286,6 +1504,7 @@ def dashboard_view(request):
     
     # Get email tracking stats
     email_stats = Notification.get_email_stats(days=30)
+    notification_counts = Notification.get_counts(user=request.user)
     
     # Basic metrics
     metrics = {
@@ -1314,8 +1533,8 @@ def dashboard_view(request):
         'email_sent_count': email_stats['total_sent'],
         'email_opened_count': email_stats['total_opened'],
         'email_open_rate': email_stats['open_rate'],
-        'unread_notifications': Notification.get_unread_count(),
-        'urgent_notifications': Notification.get_urgent_count()
+        'unread_notifications': notification_counts['unread'],
+        'urgent_notifications': notification_counts['urgent']
     }
     
     # Recent reservations (last 24 hours)
@@ -1353,6 +1572,7 @@ def dashboard_api_metrics(request):
     
     # Get email stats
     email_stats = Notification.get_email_stats(days=30)
+    notification_counts = Notification.get_counts(user=request.user)
     
     metrics = {
         'restaurant_name': restaurant.name,
@@ -1375,8 +1595,8 @@ def dashboard_api_metrics(request):
             'total_sent': email_stats['total_sent'],
             'total_opened': email_stats['total_opened'],
             'open_rate': email_stats['open_rate'],
-            'unread_notifications': Notification.get_unread_count(),
-            'urgent_notifications': Notification.get_urgent_count()
+            'unread_notifications': notification_counts['unread'],
+            'urgent_notifications': notification_counts['urgent']
         }
     }
     
@@ -1390,8 +1610,8 @@ def dashboard_api_recent(request):
         created_at__gte=now - timedelta(hours=1)
     ).order_by('-created_at')[:5]
     
-    recent_notifications = Notification.objects.filter(
-        is_read=False
+    recent_notifications = Notification.objects.feed(user=request.user).filter(
+        is_read=False, read_by_user=False
     ).order_by('-created_at')[:5]
     
     reservations_data = []
@@ -1405,13 +1625,14 @@ def dashboard_api_recent(request):
     
     notifications_data = []
     for notification in recent_notifications:
+        message = notification['message']
         notifications_data.append({
-            'title': notification.title,
-            'message': notification.message[:100] + '...' if len(notification.message) > 100 else notification.message,
-            'priority': notification.priority,
-            'time_ago': notification.time_ago,
-            'email_opened': notification.email_opened_by_client,
-            'customer_name': notification.customer_name
+            'title': notification['title'],
+            'message': message[:100] + '...' if len(message) > 100 else message,
+            'priority': notification['priority'],
+            'time_ago': Notification.format_time_ago(notification['created_at']),
+            'email_opened': notification['email_opened_by_client'],
+            'customer_name': notification['customer_name'] or 'N/A'
         })
     
     return JsonResponse({
@@ -1573,7 +1794,7 @@ def test_email_tracking(request):
 def cleanup_old_data(request):
     """Cleanup old notifications and tracking data"""
     try:
-        days = request.data.get('days', 30)
+        days = request.data.get('days')  # None -> NOTIFICATION_RETENTION_DAYS
         
         # Import cleanup function
         from .signals import cleanup_old_notifications
@@ -1588,4 +1809,66 @@ def cleanup_old_data(request):
         
     except Exception as e:
         logger.error(f"Cleanup error: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+# ===== ARCHIVED RESERVATIONS (read-only) =====
+
+ARCHIVE_PAGE_SIZE = 100
+ARCHIVE_MAX_PAGE_SIZE = 500
+
+@api_view(['GET'])
+@staff_member_required
+def archived_months(request):
+    """List the archived months (reservations moved out by archive_reservations)"""
+    try:
+        return JsonResponse({'months': list_archived_months()})
+    except Exception as e:
+        logger.error(f"Archive listing error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@staff_member_required
+def archived_reservations(request, year, month):
+    """
+    Read archived reservations of a month (?status=&search=&offset=&limit=&notifications=1).
+    The gzip file is read line by line up to the requested page; ?stream=1 streams
+    every matching reservation instead of a page.
+    """
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+        limit = max(1, min(int(request.GET.get('limit', ARCHIVE_PAGE_SIZE)), ARCHIVE_MAX_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'offset and limit must be integers'}, status=400)
+    
+    label = f"{year:04d}-{month:02d}"
+    if not archive_path(year, month).exists():
+        return JsonResponse({'error': f'Aucune archive pour {label}'}, status=404)
+    
+    records = search_archived_month(
+        year, month,
+        status=request.GET.get('status'),
+        search=request.GET.get('search'),
+        notifications=request.GET.get('notifications') == '1',
+    )
+    
+    if request.GET.get('stream') == '1':
+        response = StreamingHttpResponse(stream_archived_month(records), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="reservations-{label}.jsonl"'
+        return response
+    
+    try:
+        # One extra record tells whether there is a next page, the rest of the file is not read
+        reservations = list(itertools.islice(records, offset, offset + limit + 1))
+        has_more = len(reservations) > limit
+        
+        return JsonResponse({
+            'month': label,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if has_more else None,
+            'reservations': reservations[:limit]
+        })
+        
+    except Exception as e:
+        logger.error(f"Archive read error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS en premier
+    'reservations.middleware.RequestMetricsMiddleware',  # Queries / DB time / Server-Timing
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'reservations.middleware.ProfilingMiddleware',  # ?profile=1 (staff) / sampling
+    'reservations.middleware.TrafficCaptureMiddleware',  # TRAFFIC_CAPTURE (off by default)
 ]
 
 ROOT_URLCONF = 'restaurant_booking.urls'
@@ -171,42 +174,132 @@ SERVER_EMAIL = 'Resto Pêcheur <simanjali8@gmail.com>'
 # Email timeout settings
 EMAIL_TIMEOUT = 30
 
+# Level per subsystem (logger name). Hot paths (signals, admin dashboard, tracking)
+# log their per-row/per-call details at DEBUG, sampled by LOG_SAMPLING.
+LOG_LEVELS = {
+    'reservations': 'INFO',
+    'reservations.admin': 'INFO',
+    'reservations.models': 'INFO',
+    'reservations.signals': 'INFO',
+    'reservations.views': 'INFO',
+    'reservations.utils.email_utils': 'INFO',
+    'django.core.mail': 'INFO',
+}
+
+# Share of the DEBUG records kept per subsystem (INFO and above are never sampled)
+LOG_SAMPLING = {
+    'reservations.admin': 0.01,
+    'reservations.signals': 0.1,
+    'reservations.models': 0.1,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'reservations.utils.logging_utils.JsonFormatter',
+        },
+        'raw': {
+            'format': '%(message)s',
+        },
+    },
+    'filters': {
+        'sampled': {
+            '()': 'reservations.utils.logging_utils.SamplingFilter',
+            'rates': LOG_SAMPLING,
+        },
+    },
     'handlers': {
+        # Sinks - written by the queue listener thread, never by the request thread.
+        # Their names sort before 'queued_*': dictConfig builds handlers in name order
         'console': {
             'class': 'logging.StreamHandler',
+            'formatter': 'json',
         },
         'file': {
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'email.log',
+            'formatter': 'json',
         },
-        'tracking_file': {
+        'file_tracking': {
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'email_tracking.log',
+            'formatter': 'json',
+        },
+        # Captured traffic (TRAFFIC_CAPTURE) - one JSON trace per line, rotated
+        'file_traffic': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'traffic.jsonl',
+            'maxBytes': 20 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'raw',
+        },
+        # Asynchronous handlers used by the loggers (QueueHandler + QueueListener)
+        'queued_console': {
+            '()': 'reservations.utils.logging_utils.AsyncQueueHandler',
+            'targets': ['cfg://handlers.console'],
+            'filters': ['sampled'],
+        },
+        'queued_email': {
+            '()': 'reservations.utils.logging_utils.AsyncQueueHandler',
+            'targets': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['sampled'],
+        },
+        'queued_tracking': {
+            '()': 'reservations.utils.logging_utils.AsyncQueueHandler',
+            'targets': ['cfg://handlers.console', 'cfg://handlers.file_tracking'],
+            'filters': ['sampled'],
+        },
+        'queued_traffic': {
+            '()': 'reservations.utils.logging_utils.AsyncQueueHandler',
+            'targets': ['cfg://handlers.file_traffic'],
         },
     },
     'loggers': {
         'django.core.mail': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queued_email'],
+            'level': LOG_LEVELS['django.core.mail'],
+            'propagate': False,
+        },
+        'reservations': {
+            'handlers': ['queued_console'],
+            'level': LOG_LEVELS['reservations'],
+            'propagate': False,
+        },
+        # Without handlers of their own: go to 'reservations' (queued console)
+        'reservations.admin': {
+            'level': LOG_LEVELS['reservations.admin'],
+        },
+        'reservations.models': {
+            'level': LOG_LEVELS['reservations.models'],
         },
         'reservations.utils.email_utils': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queued_email'],
+            'level': LOG_LEVELS['reservations.utils.email_utils'],
+            'propagate': False,
         },
         'reservations.signals': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queued_email'],
+            'level': LOG_LEVELS['reservations.signals'],
+            'propagate': False,
         },
         'reservations.views': {
-            'handlers': ['console', 'tracking_file'],
+            'handlers': ['queued_tracking'],
+            'level': LOG_LEVELS['reservations.views'],
+            'propagate': False,
+        },
+        # One JSON line per request (RequestMetricsMiddleware) - warnings for budget overruns
+        'reservations.metrics': {
+            'handlers': ['queued_console'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
+        },
+        'reservations.traffic': {
+            'handlers': ['queued_traffic'],
+            'level': 'INFO',
+            'propagate': False,
         },
     },
 }
@@ -293,6 +386,8 @@ NOTIFICATION_SETTINGS = {
     'AUTO_SEND_EMAILS': True,  # Set to False to disable automatic emails
     'EMAIL_RETRY_ATTEMPTS': 3,  # Number of retry attempts for failed emails
     'NOTIFICATION_RETENTION_DAYS': 30,  # How long to keep read notifications
+    'RETENTION_BATCH_SIZE': 500,  # Rows deleted per chunk by the retention engine
+    'RETENTION_BATCH_PAUSE': 0.1,  # Pause (seconds) between two chunks
     
     #  Email tracking settings
     'EMAIL_TRACKING_ENABLED': True,  # Enable email tracking
@@ -302,6 +397,86 @@ NOTIFICATION_SETTINGS = {
     'TRACKING_DATA_RETENTION_DAYS': 90,  # How long to keep tracking data
 }
 
+# Cold storage for past reservations (manage.py archive_reservations)
+RESERVATION_ARCHIVE_SETTINGS = {
+    'ARCHIVE_DIR': BASE_DIR / 'archives',  # gzip JSONL files, one per month
+    'ARCHIVE_AFTER_DAYS': 365,  # Reservations older than this leave the hot table
+    'BATCH_SIZE': 500,  # Reservations moved per chunk
+}
+
+# Per-request instrumentation (reservations.middleware.RequestMetricsMiddleware)
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': DEBUG,  # Server-Timing header for everyone (staff users always get it)
+    'SLOW_REQUEST_MS': 500,
+    'REPEATED_QUERY_THRESHOLD': 10,  # Same SQL run this many times in one request = N+1
+    'DEFAULT_MAX_QUERIES': 50,
+    # Query budget per path prefix (longest prefix wins)
+    'MAX_QUERIES': {
+        '/api/availability/': 20,
+        '/api/check-availability/': 10,
+        '/api/timeslots/': 10,
+        '/api/special-dates/': 5,
+        '/api/restaurant/': 10,
+        '/api/reservations/create/': 30,
+        '/api/notifications/': 10,
+        '/admin/': 100,
+    },
+}
+
+# Prometheus metrics (/api/metrics/, bearer TOKEN or staff session): each worker writes
+# its totals to DIR/<pid>.json at most every FLUSH_SECONDS and the endpoint adds them up.
+# Files of exited workers are folded into DIR/retired.json; empty DIR to start over.
+METRICS = {
+    'DIR': BASE_DIR / 'cache' / 'metrics',
+    'FLUSH_SECONDS': 5,
+    'TOKEN': '',  # Prometheus: authorization: {type: Bearer, credentials: <TOKEN>} (empty = staff only)
+}
+
+# Request profiling (staff: ?profile=1 or ?profile=cprofile), kept in a ring
+# buffer of MAX_PROFILES files listed at /api/profiles/
+PROFILING = {
+    'DIR': BASE_DIR / 'cache' / 'profiles',
+    'MAX_PROFILES': 50,
+    'SAMPLE_RATE': 0,  # e.g. 0.01 = 1% of the requests under PATHS, any user
+    'PATHS': ['/admin/', '/dashboard/'],
+    'SAMPLE_INTERVAL_MS': 5,
+}
+
+# Anonymized traces of the public traffic (logs/traffic.jsonl, rotated) for
+# `manage.py replay_traffic` - authenticated requests are never recorded
+TRAFFIC_CAPTURE = {
+    'ENABLED': False,
+    'PATHS': ['/api/', '/track/'],
+    'EXCLUDE_PATHS': ['/api/metrics/', '/api/profiles/', '/api/debug/', '/api/reservations/import/'],
+    'SAMPLE_RATE': 1.0,
+    'MAX_BODY_BYTES': 64 * 1024,  # larger bodies: only their size is recorded
+}
+
+# MX lookups of the email verification endpoints, kept in memory per worker
+EMAIL_DNS_CACHE = {
+    'TTL_SECONDS': 3600,
+    'NEGATIVE_TTL_SECONDS': 300,
+    'LIFETIME_SECONDS': 5.0,  # Max time of one lookup (timeouts are not cached)
+}
+
+# Table turn time used by availability (Reservation.duration when it is left empty)
+RESERVATION_DURATION_SETTINGS = {
+    'BY_PARTY_SIZE': [(2, 90), (4, 105), (8, 120)],  # (largest party, minutes)
+    'DEFAULT_MINUTES': 150,  # Larger parties
+}
+
+# Customer history (counters kept on Customer) used when validating online bookings
+CUSTOMER_HISTORY_SETTINGS = {
+    'MAX_CANCELLATIONS': None,  # e.g. 3 = online bookings refused after 3 cancellations (None = never)
+}
+
+# Optional PostgreSQL monthly range partitioning (Reservation.date, Notification.created_at):
+# tables converted once with `manage.py create_partitions --convert`
+DATABASE_PARTITIONING = {
+    'MONTHS_AHEAD': 3,  # Future partitions kept ready by manage.py create_partitions
+}
+
 #  Email tracking configuration
 EMAIL_TRACKING_SETTINGS = {
     'TRACKING_TOKEN_EXPIRY_DAYS': 365,  # How long tracking tokens are valid
@@ -376,9 +551,21 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 1000,
         }
+    },
+    # Content versions behind the ETags of the public API - shared by all the workers
+    # (a per-process locmem cache would let one worker answer 304 with stale data)
+    'content_versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'content_versions',
+        'TIMEOUT': None,
     }
 }
 
+CONTENT_VERSION_CACHE = 'content_versions'
+
+# Opening calendar of each worker: changes from other workers picked up within this delay
+OPENING_CALENDAR_CHECK_SECONDS = 2
+
 # ==========================================
 # DEVELOPMENT HELPERS
 # ==========================================
@@ -390,10 +577,7 @@ if DEBUG:
     # EMAIL_FILE_PATH = BASE_DIR / 'emails'  # Directory for email files
     pass
 
-# Console logging for development
+# Debug details in development (still sampled by LOG_SAMPLING)
 if DEBUG:
-    LOGGING['loggers']['reservations'] = {
-        'handlers': ['console'],
-        'level': 'DEBUG',
-        'propagate': False,
-    }
\ No newline at end of file
+    for name in ('reservations', 'reservations.admin', 'reservations.models', 'reservations.signals'):
+        LOGGING['loggers'][name]['level'] = 'DEBUG'
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Settings for the test suite: python manage.py test --settings=restaurant_booking.test_settings
+
+SQLite in memory (nothing left in the tree), no SMTP, and nothing written to the
+shared logs/ and cache/ directories of the project: files go to a temporary
+directory removed when the process exits.
+"""
+
+from .settings import *  # noqa: F401,F403
+import atexit
+import shutil
+import tempfile
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+CACHES['content_versions'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'content-versions-tests',
+    'TIMEOUT': None,
+}
+
+TEST_FILES_DIR = Path(tempfile.mkdtemp(prefix='resto-tests-'))
+atexit.register(shutil.rmtree, TEST_FILES_DIR, ignore_errors=True)
+METRICS['DIR'] = TEST_FILES_DIR / 'metrics'
+PROFILING['DIR'] = TEST_FILES_DIR / 'profiles'
+RESERVATION_ARCHIVE_SETTINGS['ARCHIVE_DIR'] = TEST_FILES_DIR / 'archives'
+
+# Log files of the project stay untouched (records still go through the queue handlers)
+for name in ('file', 'file_tracking', 'file_traffic'):
+    LOGGING['handlers'][name] = {'class': 'logging.NullHandler'}
+LOGGING['handlers']['console'] = {'class': 'logging.NullHandler'}
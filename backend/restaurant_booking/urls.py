@@ -20,11 +20,15 @@ urlpatterns = [
     # ===== RESERVATION ENDPOINTS =====
     path('api/reservations/', views.ReservationListView.as_view(), name='reservation-list'),
     path('api/reservations/create/', views.ReservationCreateView.as_view(), name='reservation-create'),
+    path('api/reservations/export/', views.export_reservations, name='reservation-export'),
+    path('api/reservations/import/', views.import_reservations_view, name='reservation-import'),
+    path('api/customers/lookup/', views.customer_lookup, name='customer-lookup'),
     path('api/reservations/<int:pk>/', views.ReservationDetailView.as_view(), name='reservation-detail'),
     path('api/reservations/<int:reservation_id>/update-status/', views.update_reservation_status, name='update-reservation-status'),
     
     # ===== AVAILABILITY CHECKING ENDPOINTS =====
     path('api/availability/', views.check_availability_by_date, name='check-availability-by-date'),
+    path('api/availability/next/', views.next_available_slots, name='next-available-slots'),
     path('api/check-availability/', views.check_availability, name='check-availability'),
     
     # ===== SPECIAL DATES API =====
@@ -51,12 +55,17 @@ urlpatterns = [
     
     # ===== DASHBOARD API ENDPOINTS =====
     path('api/dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('api/metrics/', views.prometheus_metrics, name='prometheus-metrics'),
+    path('api/profiles/', views.profiles_list, name='profiles-list'),
+    path('api/profiles/<str:name>', views.profile_download, name='profile-download'),
     path('dashboard/api/metrics/', views.dashboard_api_metrics, name='dashboard_api_metrics'),
     path('dashboard/api/recent/', views.dashboard_api_recent, name='dashboard_api_recent'),
     
     # ===== 🆕 UTILITY ENDPOINTS =====
     path('api/test-email/', views.test_email_tracking, name='test_email_tracking'),
     path('api/cleanup/', views.cleanup_old_data, name='cleanup_old_data'),
+    path('api/archives/reservations/', views.archived_months, name='archived_months'),
+    path('api/archives/reservations/<int:year>/<int:month>/', views.archived_reservations, name='archived_reservations'),
     
     # ===== 🆕 EMAIL DEBUG ENDPOINTS =====
     path('api/debug/gmail-basic/', views.test_gmail_basic, name='test_gmail_basic'),